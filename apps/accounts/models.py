@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
@@ -34,6 +35,12 @@ class User(AbstractUser):
     updated_at = models.DateTimeField(auto_now=True)
     last_activity = models.DateTimeField(auto_now=True)
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Channel name autocomplete (pg_trgm)
+            GinIndex(fields=['username'], opclasses=['gin_trgm_ops'], name='accounts_user_username_trgm'),
+        ]
+    
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
     
@@ -2,6 +2,8 @@ from django import template
 from django.utils.safestring import mark_safe
 from django.utils.html import escape
 
+from apps.core.thumbnails import avatar_preset, thumbnail_url
+
 register = template.Library()
 
 
@@ -17,9 +19,9 @@ def user_avatar(user, size=48, css_classes=""):
     try:
         size = int(size)  # サイズを整数に変換
         if hasattr(user, 'avatar') and user.avatar:
-            # ユーザーがアバター画像をアップロードしている場合
+            # ユーザーがアバター画像をアップロードしている場合（表示サイズに縮小した画像）
             return mark_safe(
-                f'<img src="{escape(user.avatar.url)}" '
+                f'<img src="{escape(thumbnail_url(user.avatar, avatar_preset(size)))}" '
                 f'alt="{escape(user.username)}" '
                 f'class="{escape(css_classes)}" '
                 f'style="width: {size}px; height: {size}px; object-fit: cover;">'
@@ -8,6 +8,7 @@ from django.contrib.auth.views import LoginView, LogoutView
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
+from apps.core.pagination import KeysetPaginator, cached_count
 from .models import User, UserProfile, Follow
 from django import forms
 
@@ -211,7 +212,7 @@ def user_channel(request, username):
         uploader=user,
         status='ready',
         privacy__in=['public', 'unlisted']
-    ).order_by('-published_at')
+    )
     
     # Get user's streams (if they can stream)
     streams = None
@@ -220,19 +221,17 @@ def user_channel(request, username):
             streamer=user
         ).order_by('-created_at')[:5]
     
-    # Pagination for videos
-    paginator = Paginator(videos, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination for videos (the total is a cached count)
+    page = KeysetPaginator(videos, ('-published_at', '-id'), 12).get_page(request.GET.get('cursor'))
     
     context = {
         'channel_user': user,
         'profile': profile,
         'is_following': is_following,
-        'videos': page_obj,
+        'videos': page,
         'recent_streams': streams,
         'stats': {
-            'total_videos': videos.count(),
+            'total_videos': cached_count(videos),
             'followers_count': profile.followers_count,
             'following_count': profile.following_count,
             'total_views': profile.total_views,
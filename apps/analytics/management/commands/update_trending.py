@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from apps.analytics.services import compute_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending scores into PopularContent (run periodically, e.g. every 10 minutes from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=str,
+            help='Tenant schema to update (default: all tenants)',
+        )
+
+    def handle(self, *args, **options):
+        Tenant = get_tenant_model()
+        tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+        if options['tenant']:
+            tenants = tenants.filter(schema_name=options['tenant'])
+
+        for tenant in tenants:
+            with schema_context(tenant.schema_name):
+                ranked = compute_trending_scores(tenant.schema_name)
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.schema_name}: ranked {ranked} trending videos'
+            ))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-19 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='popularcontent',
+            index=models.Index(fields=['content_type', '-score'], name='analytics_popular_score_idx'),
+        ),
+    ]
@@ -125,6 +125,9 @@ class PopularContent(models.Model):
     class Meta:
         unique_together = ('content_type', 'content_id')
         ordering = ['-score']
+        indexes = [
+            models.Index(fields=['content_type', '-score'], name='analytics_popular_score_idx'),
+        ]
 
 
 class RealtimeMetrics(models.Model):
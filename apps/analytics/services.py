@@ -0,0 +1,174 @@
+"""
+Analytics service helpers.
+Computes time-decayed trending scores and stores them in PopularContent.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField, Count, OuterRef, Subquery
+from django.db.models.functions import Cast, TruncHour
+from django.utils import timezone
+
+from apps.core.fragment_cache import invalidate_fragments
+
+TRENDING_WINDOW_HOURS = 7 * 24
+
+
+def get_analytics_setting(name, default=None):
+    """Get a value from ANALYTICS_SETTINGS."""
+    return getattr(settings, 'ANALYTICS_SETTINGS', {}).get(name, default)
+
+
+def _hourly_counts(queryset, since):
+    """{video_id: {hour_start: count}} for rows created since `since`."""
+    rows = (
+        queryset.filter(created_at__gte=since)
+        .annotate(hour=TruncHour('created_at'))
+        .values('video_id', 'hour')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    counts = defaultdict(dict)
+    for row in rows:
+        counts[row['video_id']][row['hour']] = row['total']
+    return counts
+
+
+def compute_trending_scores(schema_name=None):
+    """
+    直近1週間の視聴・高評価・コメントから時間減衰スコアを計算し PopularContent に一括 UPSERT
+    score = Σ (views + like_weight * likes + comment_weight * comments) * 0.5 ^ (経過時間 / 半減期)
+
+    Must be called inside the tenant schema. Returns the number of videos ranked.
+    """
+    from apps.content.models import Comment, Video, VideoLike
+    from apps.content.services import get_hourly_views
+    from .models import PopularContent
+
+    half_life = get_analytics_setting('TRENDING_HALF_LIFE_HOURS', 24)
+    like_weight = get_analytics_setting('TRENDING_LIKE_WEIGHT', 5.0)
+    comment_weight = get_analytics_setting('TRENDING_COMMENT_WEIGHT', 3.0)
+    size = get_analytics_setting('TRENDING_SIZE', 500)
+
+    now = timezone.now()
+    since = now - timedelta(hours=TRENDING_WINDOW_HOURS)
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+
+    def decay(age_hours):
+        return 0.5 ** (age_hours / half_life)
+
+    scores = defaultdict(float)
+    views_24h = defaultdict(int)
+    views_7d = defaultdict(int)
+    engagements = defaultdict(int)
+
+    # 視聴数は flush_video_views が Redis に記録する時間別バケットから取得
+    for age, bucket in enumerate(get_hourly_views(TRENDING_WINDOW_HOURS, schema_name)):
+        weight = decay(age)
+        for video_id, views in bucket.items():
+            scores[video_id] += views * weight
+            views_7d[video_id] += views
+            if age < 24:
+                views_24h[video_id] += views
+
+    for queryset, weight_factor in (
+        (VideoLike.objects.filter(is_like=True), like_weight),
+        (Comment.objects.filter(is_hidden=False), comment_weight),
+    ):
+        for video_id, hours in _hourly_counts(queryset, since).items():
+            for hour, total in hours.items():
+                age = (current_hour - hour).total_seconds() / 3600
+                scores[video_id] += weight_factor * total * decay(age)
+                engagements[video_id] += total
+
+    videos = dict(
+        Video.objects.filter(
+            id__in=list(scores),
+            status='ready',
+            privacy__in=['public', 'unlisted']
+        ).values_list('id', 'title')
+    )
+    ranked = sorted(
+        (video_id for video_id in scores if video_id in videos and scores[video_id] > 0),
+        key=lambda video_id: scores[video_id],
+        reverse=True,
+    )[:size]
+
+    rows = [
+        PopularContent(
+            content_type='video',
+            content_id=str(video_id),
+            title=videos[video_id][:200],
+            score=scores[video_id],
+            views_24h=views_24h[video_id],
+            views_7d=views_7d[video_id],
+            engagement_rate=engagements[video_id] / views_7d[video_id] if views_7d[video_id] else 0,
+        )
+        for video_id in ranked
+    ]
+
+    with transaction.atomic():
+        PopularContent.objects.filter(content_type='video').exclude(
+            content_id__in=[row.content_id for row in rows]
+        ).delete()
+        PopularContent.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['content_type', 'content_id'],
+            update_fields=['title', 'score', 'views_24h', 'views_7d', 'engagement_rate', 'last_updated'],
+        )
+    invalidate_fragments('home_trending', 'trending')
+    return len(rows)
+
+
+def get_trending_video_ids(limit=None):
+    """Video ids ordered by trending score (empty until update_trending has run)."""
+    from .models import PopularContent
+
+    limit = limit or get_analytics_setting('TRENDING_SIZE', 500)
+    return [
+        int(content_id)
+        for content_id in PopularContent.objects.filter(content_type='video')
+        .order_by('-score')
+        .values_list('content_id', flat=True)[:limit]
+    ]
+
+
+def order_by_trending(queryset, limit=None):
+    """
+    Order a Video queryset by the precomputed trending ranking.
+    PopularContent がまだ空の場合は従来どおり視聴回数順にする。
+    """
+    video_ids = get_trending_video_ids(limit)
+    if not video_ids:
+        videos = queryset.order_by('-view_count')
+        return videos[:limit] if limit else videos
+
+    position = {video_id: index for index, video_id in enumerate(video_ids)}
+    return sorted(queryset.filter(id__in=video_ids), key=lambda video: position[video.id])
+
+
+def with_trending_score(queryset):
+    """
+    キーセットページネーション用に ranking_score（PopularContent の減衰スコア）を付与する
+    trending.html が表示用に参照する video.trending_score（%）と衝突しない名前にする。
+    対象は上位 TRENDING_SIZE 件に限られるため、どのページも同じコストで取得できる。
+
+    Returns (queryset, ordering); orders by view count while PopularContent is empty.
+    """
+    from .models import PopularContent
+
+    video_ids = get_trending_video_ids()
+    if not video_ids:
+        return queryset, ('-view_count', '-id')
+
+    scores = PopularContent.objects.filter(
+        content_type='video',
+        content_id=Cast(OuterRef('pk'), CharField()),
+    ).values('score')[:1]
+    queryset = queryset.filter(id__in=video_ids).annotate(ranking_score=Subquery(scores))
+    return queryset, ('-ranking_score', '-id')
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class ChatConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.chat'
\ No newline at end of file
+    name = 'apps.chat'
+
+    def ready(self):
+        from . import signals  # noqa: F401
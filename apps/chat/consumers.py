@@ -152,6 +152,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 await self.close()
                 return
 
+            # リアクション保存用に配信の主キーを一度だけ解決
+            self.reaction_writer = await self.get_reaction_writer()
+
             # Join room group
             await self.channel_layer.group_add(
                 self.room_group_name,
@@ -166,6 +169,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def disconnect(self, close_code):
         try:
+            # Flush buffered reactions
+            if getattr(self, 'reaction_writer', None):
+                await self.flush_reactions()
+
             # Leave room group
             await self.channel_layer.group_discard(
                 self.room_group_name,
@@ -270,8 +277,6 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """Handle reaction to a message."""
         try:
             stamp_id = data.get('stamp_id')
-            stamp_name = data.get('stamp_name')
-            stamp_image_url = data.get('stamp_image_url')
             
             if not stamp_id:
                 await self.send(text_data=json.dumps({
@@ -279,17 +284,25 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 }))
                 return
             
+            # スタンプはテナント単位のキャッシュから取得
+            stamp = await self.get_stamp(stamp_id)
+            if not stamp:
+                await self.send(text_data=json.dumps({
+                    'error': 'スタンプが見つかりません'
+                }))
+                return
+            
             # データベースにリアクションを保存（統計用）
-            await self.save_stream_reaction(stamp_id)
+            await self.save_stream_reaction(stamp['id'])
             
             # 全チャット参加者にリアクションを配信
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
                     'type': 'reaction_broadcast',
-                    'stamp_id': stamp_id,
-                    'stamp_name': stamp_name,
-                    'stamp_image_url': stamp_image_url,
+                    'stamp_id': stamp['id'],
+                    'stamp_name': stamp['name'],
+                    'stamp_image_url': stamp['image_url'],
                     'username': self.authenticated_username
                 }
             )
@@ -310,61 +323,47 @@ class ChatConsumer(AsyncWebsocketConsumer):
             'username': event['username']
         }))
     
+    @database_sync_to_async
+    def get_reaction_writer(self):
+        """Resolve the stream primary key once and create a reaction writer."""
+        from apps.streaming.services import StreamReactionWriter, resolve_stream_pk
+
+        return StreamReactionWriter(resolve_stream_pk(self.room_name), self.scope.get('schema_name'))
+
+    @database_sync_to_async
+    def get_stamp(self, stamp_id):
+        """Get an active stamp from the per-tenant cache."""
+        from apps.chat.services import stamp_cache
+
+        return stamp_cache.get(stamp_id, self.scope.get('schema_name'))
+
     @database_sync_to_async
     def save_stream_reaction(self, stamp_id):
         """Save stream reaction to database for analytics."""
         try:
-            from apps.streaming.models import Stream, StreamReaction
-            from apps.chat.models import ChatStamp
-            
-            # Get stream from room name (assuming room name is stream_id)
-            try:
-                stream = Stream.objects.get(stream_id=self.room_name)
-                stamp = ChatStamp.objects.get(id=stamp_id)
-                user = self.scope["user"]
-                
-                # Create StreamReaction for analytics
-                StreamReaction.objects.create(
-                    stream=stream,
-                    user=user,
-                    stamp=stamp
-                )
-                print(f"✅ Saved stream reaction: {user.username} -> {stamp.name}")
-                
-            except (Stream.DoesNotExist, ChatStamp.DoesNotExist) as e:
-                print(f"❌ Failed to save stream reaction: {e}")
-                
+            # 接続時に解決済みの stream と scope のユーザーを使用（INSERTのみ）
+            self.reaction_writer.record(self.authenticated_user_id, stamp_id, self.authenticated_username)
         except Exception as e:
             print(f"❌ Error saving stream reaction: {e}")
+
+    @database_sync_to_async
+    def flush_reactions(self):
+        """Write buffered stream reactions."""
+        return self.reaction_writer.flush()
     
     @database_sync_to_async
     def toggle_reaction_db(self, message_id, stamp_id):
         """Toggle reaction in database."""
         try:
-            from .models import ChatMessage, ChatStamp, ChatReaction
-            from django.contrib.auth import get_user_model
+            from .services import stamp_cache, toggle_message_reaction
             
-            User = get_user_model()
-            
-            message = ChatMessage.objects.get(id=message_id)
-            stamp = ChatStamp.objects.get(id=stamp_id, is_active=True)
-            user = User.objects.get(id=self.authenticated_user_id)
-            
-            # Check if reaction exists
-            reaction, created = ChatReaction.objects.get_or_create(
-                message=message,
-                user=user,
-                stamp=stamp
-            )
-            
-            if created:
-                action = 'added'
-            else:
-                reaction.delete()
-                action = 'removed'
+            message = ChatMessage.objects.only('id').get(id=message_id)
+            stamp = stamp_cache.get(stamp_id, self.scope.get('schema_name'))
+            if not stamp:
+                raise ValueError('Stamp not found')
             
-            # Get updated count
-            count = ChatReaction.objects.filter(message=message, stamp=stamp).count()
+            # Toggle reaction and update the denormalized counter (no COUNT query)
+            action, count = toggle_message_reaction(message.id, self.authenticated_user_id, stamp['id'])
             
             return {
                 'success': True,
@@ -0,0 +1,42 @@
+"""
+Management command to pack active chat stamps into a sprite sheet
+"""
+from django.core.management.base import BaseCommand
+from django_tenants.utils import get_public_schema_name, get_tenant_model
+from apps.chat.services import invalidate_stamp_catalog, stamp_cache
+from apps.chat.sprites import build_stamp_sprite
+
+
+class Command(BaseCommand):
+    help = 'Build stamp sprite sheets and JSON atlases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=str,
+            help='Tenant schema to build (default: all tenants)',
+        )
+
+    def handle(self, *args, **options):
+        Tenant = get_tenant_model()
+        tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+        if options['tenant']:
+            tenants = tenants.filter(schema_name=options['tenant'])
+
+        if not tenants.exists():
+            self.stdout.write(self.style.ERROR('No tenant found. Please create a tenant first.'))
+            return
+
+        for tenant in tenants:
+            atlas = build_stamp_sprite(tenant.schema_name)
+            stamp_cache.invalidate(tenant.schema_name)
+            invalidate_stamp_catalog(tenant.schema_name)
+
+            if atlas:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{tenant.schema_name}: packed {len(atlas['frames'])} stamps -> {atlas['image_url']}"
+                ))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'{tenant.schema_name}: no raster stamps to pack (SVG stamps are served individually)'
+                ))
@@ -8,6 +8,8 @@ from django.conf import settings
 from django_tenants.utils import schema_context
 from apps.tenants.models import Tenant
 from apps.chat.models import ChatStamp
+from apps.chat.services import invalidate_stamp_catalog
+from apps.chat.sprites import build_stamp_sprite
 import requests
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
@@ -108,6 +110,10 @@ class Command(BaseCommand):
                     self.style.SUCCESS(f'Created stamp: {stamp.name}')
                 )
             
+            # スプライトシートは登録後にまとめて1回だけ生成する
+            build_stamp_sprite(tenant.schema_name)
+            invalidate_stamp_catalog(tenant.schema_name)
+
             total_stamps = ChatStamp.objects.count()
             self.stdout.write(
                 self.style.SUCCESS(f'Completed! Total stamps: {total_stamps}')
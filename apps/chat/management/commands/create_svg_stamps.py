@@ -7,6 +7,8 @@ from django.conf import settings
 from django_tenants.utils import schema_context
 from apps.tenants.models import Tenant
 from apps.chat.models import ChatStamp
+from apps.chat.services import invalidate_stamp_catalog
+from apps.chat.sprites import build_stamp_sprite
 
 
 class Command(BaseCommand):
@@ -70,6 +72,10 @@ class Command(BaseCommand):
                     self.style.SUCCESS(f'Created SVG stamp: {stamp.name} -> {stamp_data["filename"]}')
                 )
             
+            # スプライトシートは登録後にまとめて1回だけ生成する
+            build_stamp_sprite(tenant.schema_name)
+            invalidate_stamp_catalog(tenant.schema_name)
+
             self.stdout.write(
                 self.style.SUCCESS(f'Successfully created {created_count} SVG stamps')
             )
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Management command to rebuild denormalized chat reaction counters
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from django.utils import timezone
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from apps.chat.models import ChatReaction, ChatReactionCount
+
+
+class Command(BaseCommand):
+    help = 'Reconcile ChatReactionCount with ChatReaction rows (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=str,
+            help='Tenant schema to reconcile (default: all tenants)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Only reconcile messages posted within the last N days (default: all)',
+        )
+
+    def handle(self, *args, **options):
+        Tenant = get_tenant_model()
+        tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+        if options['tenant']:
+            tenants = tenants.filter(schema_name=options['tenant'])
+
+        for tenant in tenants:
+            with schema_context(tenant.schema_name):
+                updated, removed = self.reconcile(options['days'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.schema_name}: {updated} counters rebuilt, {removed} stale counters removed'
+            ))
+
+    def reconcile(self, days):
+        reactions = ChatReaction.objects.all()
+        counters = ChatReactionCount.objects.all()
+        if days:
+            since = timezone.now() - timedelta(days=days)
+            reactions = reactions.filter(message__timestamp__gte=since)
+            counters = counters.filter(message__timestamp__gte=since)
+
+        totals = reactions.values('message_id', 'stamp_id').annotate(total=Count('id')).order_by()
+
+        with transaction.atomic():
+            # リアクションが存在しないカウンタを削除
+            removed, _ = counters.filter(
+                ~Exists(ChatReaction.objects.filter(
+                    message_id=OuterRef('message_id'),
+                    stamp_id=OuterRef('stamp_id')
+                ))
+            ).delete()
+
+            # 集計結果で一括 upsert
+            rows = ChatReactionCount.objects.bulk_create(
+                [
+                    ChatReactionCount(message_id=row['message_id'], stamp_id=row['stamp_id'], count=row['total'])
+                    for row in totals
+                ],
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['message', 'stamp'],
+                update_fields=['count'],
+            )
+
+        return len(rows), removed
@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-19 03:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_reaction_counts(apps, schema_editor):
+    ChatReaction = apps.get_model('chat', 'ChatReaction')
+    ChatReactionCount = apps.get_model('chat', 'ChatReactionCount')
+
+    totals = (
+        ChatReaction.objects.values('message_id', 'stamp_id')
+        .annotate(total=models.Count('id'))
+        .order_by()
+    )
+    ChatReactionCount.objects.bulk_create(
+        [
+            ChatReactionCount(message_id=row['message_id'], stamp_id=row['stamp_id'], count=row['total'])
+            for row in totals
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatReactionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reaction_counts', to='chat.chatmessage')),
+                ('stamp', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='chat.chatstamp')),
+            ],
+            options={
+                'unique_together': {('message', 'stamp')},
+            },
+        ),
+        migrations.RunPython(backfill_reaction_counts, migrations.RunPython.noop),
+    ]
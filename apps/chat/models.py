@@ -68,6 +68,19 @@ class ChatReaction(models.Model):
         return f"{self.user.username} reacted with {self.stamp.name}"
 
 
+class ChatReactionCount(models.Model):
+    """Denormalized reaction counts per message and stamp."""
+    message = models.ForeignKey(ChatMessage, on_delete=models.CASCADE, related_name='reaction_counts')
+    stamp = models.ForeignKey(ChatStamp, on_delete=models.CASCADE)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('message', 'stamp')
+    
+    def __str__(self):
+        return f"{self.stamp.name} x{self.count} on message {self.message_id}"
+
+
 class ChatModerator(models.Model):
     """Chat moderators for rooms."""
     room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='moderators')
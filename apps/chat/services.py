@@ -0,0 +1,198 @@
+"""
+Chat service helpers.
+Caches frequently read chat data such as active stamps.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django_tenants.utils import schema_context
+
+
+def get_chat_setting(name, default=None):
+    """Get a value from CHAT_SETTINGS."""
+    return getattr(settings, 'CHAT_SETTINGS', {}).get(name, default)
+
+
+class StampCache:
+    """
+    テナント単位のアクティブスタンプキャッシュ（プロセス内メモリ）
+    リアクション毎の ChatStamp 取得クエリを不要にする。
+    ChatStamp の保存/削除時にシグナルで破棄され、
+    他プロセスでの変更は TTL 経過後に反映される。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # schema_name -> (loaded_at, {stamp_id: stamp_data})
+
+    def _load(self, schema_name):
+        """Load active stamps for a tenant schema."""
+        from .models import ChatStamp
+
+        with schema_context(schema_name):
+            stamps = ChatStamp.objects.filter(is_active=True).order_by('name')
+            return {
+                stamp.id: {
+                    'id': stamp.id,
+                    'name': stamp.name,
+                    'image_url': stamp.image.url if stamp.image else None,
+                }
+                for stamp in stamps
+            }
+
+    def get_stamps(self, schema_name=None):
+        """Get {stamp_id: stamp_data} for active stamps of a tenant."""
+        schema_name = schema_name or connection.schema_name
+        ttl = get_chat_setting('STAMP_CACHE_TTL', 60)
+
+        with self._lock:
+            entry = self._entries.get(schema_name)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+
+        stamps = self._load(schema_name)
+        with self._lock:
+            self._entries[schema_name] = (time.monotonic(), stamps)
+        return stamps
+
+    def get(self, stamp_id, schema_name=None):
+        """Get a single active stamp, or None if it does not exist."""
+        try:
+            stamp_id = int(stamp_id)
+        except (TypeError, ValueError):
+            return None
+        return self.get_stamps(schema_name).get(stamp_id)
+
+    def invalidate(self, schema_name=None):
+        """Drop cached stamps for a tenant."""
+        schema_name = schema_name or connection.schema_name
+        with self._lock:
+            self._entries.pop(schema_name, None)
+
+
+# Global instance
+stamp_cache = StampCache()
+
+
+def _stamp_catalog_key(schema_name):
+    return f'chat:stamp_catalog:{schema_name}'
+
+
+def build_stamp_catalog(schema_name=None):
+    """
+    スタンプカタログ（JSON）を生成してキャッシュに保存
+    ETag は内容のハッシュ値で、ChatStamp が変更されない限り変わらない。
+    """
+    from .models import ChatStamp
+    from .sprites import load_sprite_atlas, rebuild_sprite_if_dirty
+
+    schema_name = schema_name or connection.schema_name
+    # スタンプ変更後の最初の読み込みでスプライトシートを再生成する
+    sprite_ready = True
+    if get_chat_setting('STAMP_SPRITE_AUTO_BUILD', True):
+        sprite_ready = rebuild_sprite_if_dirty(schema_name)
+
+    with schema_context(schema_name):
+        stamps = [
+            {
+                'id': stamp.id,
+                'name': stamp.name,
+                'image_url': stamp.image.url if stamp.image else None,
+            }
+            for stamp in ChatStamp.objects.filter(is_active=True).order_by('name')
+        ]
+
+    # スプライトシートがあれば各スタンプに座標を付与（1リクエストで全画像を取得可能）
+    sprite = None
+    atlas = load_sprite_atlas(schema_name)
+    if atlas:
+        sprite = {
+            'image_url': atlas['image_url'],
+            'width': atlas['width'],
+            'height': atlas['height'],
+            'cell_size': atlas['cell_size'],
+        }
+        for stamp in stamps:
+            stamp['sprite'] = atlas['frames'].get(str(stamp['id']))
+
+    payload = {'stamps': stamps, 'sprite': sprite}
+    payload_json = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    version = hashlib.sha1(payload_json.encode('utf-8')).hexdigest()[:16]
+    catalog = {
+        'version': version,
+        'etag': f'"{version}"',
+        'body': json.dumps({'version': version, **payload}, ensure_ascii=False),
+    }
+    if sprite_ready:
+        # 再生成中は古いアトラスを含むカタログをキャッシュしない
+        cache.set(
+            _stamp_catalog_key(schema_name),
+            catalog,
+            get_chat_setting('STAMP_CATALOG_CACHE_TIMEOUT', 86400),
+        )
+    return catalog
+
+
+def get_stamp_catalog(schema_name=None):
+    """Get the cached stamp catalog for a tenant, rebuilding it on a miss."""
+    schema_name = schema_name or connection.schema_name
+    catalog = cache.get(_stamp_catalog_key(schema_name))
+    if catalog is None:
+        catalog = build_stamp_catalog(schema_name)
+    return catalog
+
+
+def invalidate_stamp_catalog(schema_name=None):
+    """Drop the cached stamp catalog for a tenant."""
+    schema_name = schema_name or connection.schema_name
+    cache.delete(_stamp_catalog_key(schema_name))
+
+
+def _apply_reaction_delta(message_id, stamp_id, delta):
+    """Atomically add delta to a message's stamp counter and return the new count."""
+    from .models import ChatReactionCount
+
+    counter = ChatReactionCount.objects.filter(message_id=message_id, stamp_id=stamp_id)
+    if not counter.update(count=Greatest(F('count') + delta, 0)) and delta > 0:
+        try:
+            with transaction.atomic():
+                ChatReactionCount.objects.create(message_id=message_id, stamp_id=stamp_id, count=delta)
+        except IntegrityError:
+            # 同時に作成された場合は加算に切り替える
+            counter.update(count=Greatest(F('count') + delta, 0))
+    return counter.values_list('count', flat=True).first() or 0
+
+
+def toggle_message_reaction(message_id, user_id, stamp_id):
+    """
+    メッセージへのリアクションを追加/削除し、集計カウンタを F() で更新する
+    COUNT(*) を使わずに最新のリアクション数を返す。
+
+    Returns (action, count) where action is 'added' or 'removed'.
+    """
+    from .models import ChatReaction
+
+    with transaction.atomic():
+        deleted, _ = ChatReaction.objects.filter(
+            message_id=message_id,
+            user_id=user_id,
+            stamp_id=stamp_id
+        ).delete()
+
+        if deleted:
+            return 'removed', _apply_reaction_delta(message_id, stamp_id, -1)
+
+        try:
+            with transaction.atomic():
+                ChatReaction.objects.create(message_id=message_id, user_id=user_id, stamp_id=stamp_id)
+        except IntegrityError:
+            # 同時リクエストで既に追加済み
+            return 'added', _apply_reaction_delta(message_id, stamp_id, 0)
+        return 'added', _apply_reaction_delta(message_id, stamp_id, 1)
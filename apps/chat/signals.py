@@ -0,0 +1,26 @@
+"""
+Signal handlers for chat models.
+"""
+
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ChatStamp
+from .services import get_chat_setting, invalidate_stamp_catalog, stamp_cache
+from .sprites import mark_sprite_dirty
+
+
+@receiver(post_save, sender=ChatStamp)
+@receiver(post_delete, sender=ChatStamp)
+def invalidate_stamp_cache(sender, instance, **kwargs):
+    """Invalidate cached stamps and flag the sprite sheet for rebuild when a stamp changes."""
+    schema_name = connection.schema_name
+
+    def invalidate():
+        if get_chat_setting('STAMP_SPRITE_AUTO_BUILD', True):
+            mark_sprite_dirty(schema_name)
+        stamp_cache.invalidate(schema_name)
+        invalidate_stamp_catalog(schema_name)
+
+    transaction.on_commit(invalidate)
@@ -0,0 +1,185 @@
+"""
+Stamp sprite-sheet generation.
+Packs all active raster stamps of a tenant into a single PNG plus a JSON atlas,
+so clients need one image request instead of one per stamp.
+"""
+
+import hashlib
+import json
+import logging
+import math
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django_tenants.utils import schema_context
+from PIL import Image, UnidentifiedImageError
+
+from .services import get_chat_setting
+
+logger = logging.getLogger(__name__)
+
+SPRITE_DIR = 'stamps/sprites'
+REBUILD_LOCK_TIMEOUT = 300  # seconds
+
+
+def _atlas_path(schema_name):
+    return f'{SPRITE_DIR}/{schema_name}.json'
+
+
+def _dirty_key(schema_name):
+    return f'chat:stamp_sprite:dirty:{schema_name}'
+
+
+def mark_sprite_dirty(schema_name=None):
+    """Flag a tenant's sprite sheet as outdated; it is rebuilt on the next catalog build."""
+    schema_name = schema_name or connection.schema_name
+    cache.set(_dirty_key(schema_name), 1, None)
+
+
+def rebuild_sprite_if_dirty(schema_name=None):
+    """
+    Rebuild the sprite sheet if a stamp changed since the last build.
+    スタンプの一括登録でも再生成は1回で済む（変更のたびにはフラグを立てるだけ）。
+
+    Returns False while another process is rebuilding it (the current atlas may be outdated).
+    """
+    schema_name = schema_name or connection.schema_name
+    if not cache.get(_dirty_key(schema_name)):
+        return True
+    lock_key = f'{_dirty_key(schema_name)}:lock'
+    if not cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+        return False
+    try:
+        build_stamp_sprite(schema_name)
+    except Exception as e:
+        logger.error(f"Failed to rebuild stamp sprite for {schema_name}: {e}")
+    finally:
+        cache.delete(lock_key)
+    return True
+
+
+def _open_stamp_image(stamp, cell_size):
+    """Open a stamp image and fit it into a cell. Returns None for non-raster (e.g. SVG) stamps."""
+    if not stamp.image or stamp.image.name.lower().endswith('.svg'):
+        return None
+    try:
+        with stamp.image.open('rb') as f:
+            image = Image.open(f)
+            image.load()
+    except (OSError, UnidentifiedImageError, ValueError) as e:
+        logger.warning(f"Skipping stamp {stamp.name} in sprite sheet: {e}")
+        return None
+
+    image = image.convert('RGBA')
+    image.thumbnail((cell_size, cell_size), Image.LANCZOS)
+    return image
+
+
+def load_sprite_atlas(schema_name=None):
+    """Load the sprite atlas for a tenant, or None if no sprite sheet exists."""
+    schema_name = schema_name or connection.schema_name
+    path = _atlas_path(schema_name)
+    try:
+        if not default_storage.exists(path):
+            return None
+        with default_storage.open(path, 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to load stamp sprite atlas for {schema_name}: {e}")
+        return None
+
+
+def build_stamp_sprite(schema_name=None):
+    """
+    アクティブなスタンプを1枚のスプライトシートに配置し、座標アトラスを保存する
+    SVG など Pillow で読めないスタンプは含めず、個別画像のまま配信する。
+
+    Returns the atlas dict, or None when there are no raster stamps.
+    """
+    from .models import ChatStamp
+
+    schema_name = schema_name or connection.schema_name
+    # 生成中の変更は再びフラグを立てるので、読み込み前に消しておく
+    cache.delete(_dirty_key(schema_name))
+    cell_size = get_chat_setting('STAMP_SPRITE_CELL_SIZE', 64)
+    columns = get_chat_setting('STAMP_SPRITE_COLUMNS', 8)
+
+    with schema_context(schema_name):
+        images = []
+        for stamp in ChatStamp.objects.filter(is_active=True).order_by('name'):
+            image = _open_stamp_image(stamp, cell_size)
+            if image is not None:
+                images.append((stamp, image))
+
+    previous = load_sprite_atlas(schema_name)
+
+    if not images:
+        _delete_sprite(previous, schema_name)
+        return None
+
+    columns = min(columns, len(images))
+    rows = math.ceil(len(images) / columns)
+    sheet = Image.new('RGBA', (columns * cell_size, rows * cell_size), (0, 0, 0, 0))
+
+    frames = {}
+    for index, (stamp, image) in enumerate(images):
+        cell_x = (index % columns) * cell_size
+        cell_y = (index // columns) * cell_size
+        # セル内で中央揃え
+        x = cell_x + (cell_size - image.width) // 2
+        y = cell_y + (cell_size - image.height) // 2
+        sheet.paste(image, (x, y), image)
+        frames[str(stamp.id)] = {
+            'x': cell_x,
+            'y': cell_y,
+            'w': cell_size,
+            'h': cell_size,
+        }
+
+    buffer = BytesIO()
+    sheet.save(buffer, format='PNG', optimize=True)
+    data = buffer.getvalue()
+    version = hashlib.sha1(data).hexdigest()[:16]
+
+    # ファイル名にバージョンを含め、長期キャッシュ可能にする
+    image_name = f'{SPRITE_DIR}/{schema_name}-{version}.png'
+    if not default_storage.exists(image_name):
+        image_name = default_storage.save(image_name, ContentFile(data))
+
+    atlas = {
+        'version': version,
+        'image_url': default_storage.url(image_name),
+        'image_name': image_name,
+        'width': sheet.width,
+        'height': sheet.height,
+        'cell_size': cell_size,
+        'frames': frames,
+    }
+
+    atlas_path = _atlas_path(schema_name)
+    if default_storage.exists(atlas_path):
+        default_storage.delete(atlas_path)
+    default_storage.save(atlas_path, ContentFile(json.dumps(atlas).encode('utf-8')))
+
+    if previous and previous.get('image_name') != image_name:
+        _delete_sprite_image(previous)
+
+    return atlas
+
+
+def _delete_sprite_image(atlas):
+    image_name = atlas.get('image_name')
+    if image_name and default_storage.exists(image_name):
+        default_storage.delete(image_name)
+
+
+def _delete_sprite(atlas, schema_name):
+    """Remove a tenant's sprite sheet and atlas."""
+    if atlas:
+        _delete_sprite_image(atlas)
+    atlas_path = _atlas_path(schema_name)
+    if default_storage.exists(atlas_path):
+        default_storage.delete(atlas_path)
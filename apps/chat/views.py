@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_http_methods
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_http_methods
 from django.utils.decorators import method_decorator
 from django.views.generic import ListView
-from .models import ChatMessage, ChatRoom, ChatStamp, ChatReaction
+from django.db.models import Prefetch
+from .models import ChatMessage, ChatRoom, ChatStamp, ChatReaction, ChatReactionCount
+from .services import get_chat_setting, get_stamp_catalog, stamp_cache, toggle_message_reaction
 from apps.streaming.models import Stream
 from apps.moderation.models import BannedWord, ModerationAction
 from django.utils import timezone
@@ -34,33 +37,39 @@ def chat_history(request, stream_id):
             except ChatRoom.DoesNotExist:
                 return JsonResponse({'messages': []})
             
-            # Get recent messages (last 50)
-            messages = ChatMessage.objects.filter(
+            # Get recent messages (last 50) with denormalized reaction counts
+            messages = list(ChatMessage.objects.filter(
                 room=room,
                 is_deleted=False
-            ).select_related('user').prefetch_related('reactions__stamp').order_by('-timestamp')[:50]
+            ).select_related('user').prefetch_related(
+                Prefetch(
+                    'reaction_counts',
+                    queryset=ChatReactionCount.objects.filter(count__gt=0).select_related('stamp')
+                )
+            ).order_by('-timestamp')[:50])
+            
+            # Reactions by the current user (one query for all messages)
+            user_reactions = set(ChatReaction.objects.filter(
+                message__in=messages,
+                user=request.user
+            ).values_list('message_id', 'stamp_id'))
             
             messages_data = []
             for message in reversed(messages):
                 username = message.user.username if message.user else 'システム'
                 
-                # Get reactions for this message
-                reactions = {}
-                for reaction in message.reactions.all():
-                    stamp_id = str(reaction.stamp.id)
-                    if stamp_id not in reactions:
-                        reactions[stamp_id] = {
-                            'stamp': {
-                                'id': reaction.stamp.id,
-                                'name': reaction.stamp.name,
-                                'image_url': reaction.stamp.image.url if reaction.stamp.image else None,
-                            },
-                            'count': 0,
-                            'user_reacted': False
-                        }
-                    reactions[stamp_id]['count'] += 1
-                    if reaction.user == request.user:
-                        reactions[stamp_id]['user_reacted'] = True
+                reactions = [
+                    {
+                        'stamp': {
+                            'id': counter.stamp.id,
+                            'name': counter.stamp.name,
+                            'image_url': counter.stamp.image.url if counter.stamp.image else None,
+                        },
+                        'count': counter.count,
+                        'user_reacted': (message.id, counter.stamp_id) in user_reactions,
+                    }
+                    for counter in message.reaction_counts.all()
+                ]
                 
                 messages_data.append({
                     'id': message.id,
@@ -70,7 +79,7 @@ def chat_history(request, stream_id):
                     'message_type': message.message_type,
                     'timestamp': message.timestamp.isoformat(),
                     'is_pinned': message.is_pinned,
-                    'reactions': list(reactions.values()),
+                    'reactions': reactions,
                 })
             
             return JsonResponse({'messages': messages_data})
@@ -150,22 +159,26 @@ def moderate_message(request, message_id):
         return JsonResponse({'error': f'Moderation failed: {str(e)}'}, status=500)
 
 
+def _stamp_catalog_etag(request):
+    """ETag for the stamp catalog (served from cache, no DB query on hit)."""
+    request.stamp_catalog = get_stamp_catalog()
+    return request.stamp_catalog['etag']
+
+
 @login_required
 @require_http_methods(["GET"])
+@condition(etag_func=_stamp_catalog_etag)
 def get_stamps(request):
     """Get list of available chat stamps."""
     try:
-        stamps = ChatStamp.objects.filter(is_active=True).order_by('name')
-        stamps_data = []
-        
-        for stamp in stamps:
-            stamps_data.append({
-                'id': stamp.id,
-                'name': stamp.name,
-                'image_url': stamp.image.url if stamp.image else None,
-            })
-        
-        return JsonResponse({'stamps': stamps_data})
+        catalog = getattr(request, 'stamp_catalog', None) or get_stamp_catalog()
+        response = HttpResponse(catalog['body'], content_type='application/json')
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=get_chat_setting('STAMP_CATALOG_MAX_AGE', 300),
+        )
+        return response
         
     except Exception as e:
         return JsonResponse({'error': 'Failed to load stamps'}, status=500)
@@ -189,23 +202,12 @@ def toggle_reaction(request):
             return JsonResponse({'error': 'Missing message_id or stamp_id'}, status=400)
         
         message = get_object_or_404(ChatMessage, id=message_id)
-        stamp = get_object_or_404(ChatStamp, id=stamp_id, is_active=True)
-        
-        # Check if reaction already exists
-        reaction, created = ChatReaction.objects.get_or_create(
-            message=message,
-            user=request.user,
-            stamp=stamp
-        )
-        
-        if created:
-            action = 'added'
-        else:
-            reaction.delete()
-            action = 'removed'
+        stamp = stamp_cache.get(stamp_id)
+        if not stamp:
+            return JsonResponse({'error': 'Stamp not found'}, status=404)
         
-        # Get updated reaction count for this stamp on this message
-        reaction_count = ChatReaction.objects.filter(message=message, stamp=stamp).count()
+        # Toggle reaction and update the counter atomically (no COUNT query)
+        action, reaction_count = toggle_message_reaction(message.id, request.user.id, stamp['id'])
         
         return JsonResponse({
             'success': True,
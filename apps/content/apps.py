@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class ContentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.content'
\ No newline at end of file
+    name = 'apps.content'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,43 @@
+"""
+WebSocket consumers for VOD content.
+"""
+import json
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from apps.content.processing import processing_group
+
+
+class VideoProcessingConsumer(AsyncWebsocketConsumer):
+    """
+    動画処理の進捗通知（マイ動画ページ用）
+    処理ワーカーがアップロードしたユーザーのグループへ送る進捗をそのまま転送する
+    """
+    
+    async def connect(self):
+        self.group_name = None
+        
+        user = self.scope.get('user')
+        if not user or not getattr(user, 'is_authenticated', False):
+            await self.close()
+            return
+        
+        self.group_name = processing_group(self.scope.get('schema_name'), user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def processing_progress(self, event):
+        """
+        進捗メッセージを送信
+        """
+        await self.send(text_data=json.dumps({
+            'type': 'processing_progress',
+            'video_id': event['video_id'],
+            'status': event['status'],
+            'stage': event['stage'],
+            'progress': event['progress'],
+            'error': event.get('error'),
+        }))
@@ -0,0 +1,124 @@
+"""
+Search facet counts.
+公開中の動画についてタグ/カテゴリ毎の件数を SearchFacet に保持し、
+検索ページでは毎回 GROUP BY せずキャッシュから返す。
+"""
+
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+
+from .services import get_video_setting
+
+PUBLISHED_PRIVACY = ('public', 'unlisted')
+
+
+def is_published(status, privacy):
+    """Same rule as Video.is_published / the search queryset."""
+    return status == 'ready' and privacy in PUBLISHED_PRIVACY
+
+
+def _facets_cache_key(schema_name):
+    return f'content:facets:{schema_name}'
+
+
+def invalidate_search_facets(schema_name=None):
+    """Drop cached facets after the current transaction commits."""
+    schema_name = schema_name or connection.schema_name
+    transaction.on_commit(lambda: cache.delete(_facets_cache_key(schema_name)))
+
+
+def apply_facet_deltas(deltas):
+    """
+    Apply {(facet_type, object_id): delta} with F() updates, creating missing rows.
+    """
+    from .models import SearchFacet
+
+    changed = False
+    for (facet_type, object_id), delta in deltas.items():
+        if not delta or object_id is None:
+            continue
+        changed = True
+        facet = SearchFacet.objects.filter(facet_type=facet_type, object_id=object_id)
+        if facet.update(video_count=F('video_count') + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                SearchFacet.objects.create(facet_type=facet_type, object_id=object_id, video_count=delta)
+        except IntegrityError:
+            # 同時に作成された場合は加算に切り替える
+            facet.update(video_count=F('video_count') + delta)
+
+    if changed:
+        invalidate_search_facets()
+
+
+def video_facet_deltas(category_id, tag_ids, sign):
+    """Deltas for adding (sign=1) or removing (sign=-1) one published video."""
+    deltas = Counter()
+    if category_id:
+        deltas[('category', category_id)] += sign
+    for tag_id in tag_ids:
+        deltas[('tag', tag_id)] += sign
+    return deltas
+
+
+def rebuild_search_facets():
+    """Recompute all facet counts from scratch (GROUP BY). Returns the number of rows."""
+    from .models import SearchFacet, Video
+
+    published = Video.objects.filter(status='ready', privacy__in=PUBLISHED_PRIVACY)
+    counts = {}
+    for row in published.exclude(category=None).values('category_id').annotate(total=Count('id')).order_by():
+        counts[('category', row['category_id'])] = row['total']
+    for row in published.filter(tags__isnull=False).values('tags').annotate(total=Count('id')).order_by():
+        counts[('tag', row['tags'])] = row['total']
+
+    with transaction.atomic():
+        SearchFacet.objects.all().delete()
+        SearchFacet.objects.bulk_create(
+            [
+                SearchFacet(facet_type=facet_type, object_id=object_id, video_count=total)
+                for (facet_type, object_id), total in counts.items()
+            ],
+            batch_size=1000,
+        )
+    invalidate_search_facets()
+    return len(counts)
+
+
+def get_search_facets(tag_limit=20):
+    """
+    検索ページ用のファセット（キャッシュ）
+    Returns {'tags': [{'id', 'name', 'video_count'}], 'categories': [{'id', 'name', 'video_count'}]}.
+    """
+    from .models import SearchFacet, VideoCategory, VideoTag
+
+    cache_key = _facets_cache_key(connection.schema_name)
+    facets = cache.get(cache_key)
+    if facets is not None:
+        return facets
+
+    top_tags = list(
+        SearchFacet.objects.filter(facet_type='tag', video_count__gt=0)
+        .order_by('-video_count')
+        .values_list('object_id', 'video_count')[:tag_limit]
+    )
+    tag_names = dict(VideoTag.objects.filter(id__in=[t[0] for t in top_tags]).values_list('id', 'name'))
+    category_counts = dict(SearchFacet.objects.filter(facet_type='category').values_list('object_id', 'video_count'))
+
+    facets = {
+        'tags': [
+            {'id': tag_id, 'name': tag_names[tag_id], 'video_count': count}
+            for tag_id, count in top_tags
+            if tag_id in tag_names
+        ],
+        'categories': [
+            {'id': category['id'], 'name': category['name'], 'video_count': category_counts.get(category['id'], 0)}
+            for category in VideoCategory.objects.filter(is_active=True).values('id', 'name')
+        ],
+    }
+    cache.set(cache_key, facets, get_video_setting('FACET_CACHE_TIMEOUT', 300))
+    return facets
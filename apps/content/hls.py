@@ -0,0 +1,372 @@
+"""
+HLS packaging.
+動画ファイルを HLS_LADDER の各画質のセグメント（MPEG-TS）に分割し、
+セグメント一覧を <video dir>/hls/index.json に保存する。
+マスタープレイリスト・各画質のプレイリストは index.json からリクエスト時に生成してキャッシュする
+（ファイルとしては書き出さないため、URL やセグメント長の設定変更は再パッケージなしで反映される）。
+
+ffmpeg がある場合は画質ごとにトランスコードして分割する。
+ない場合、MPEG-TS のソース（録画など）は純 Python でキーフレーム（random_access_indicator）の
+パケットで分割し、ソース画質の1本だけを作る。キーフレームの目印がないストリームはバイト数で分割し、
+そのセグメントは単独で再生を始められないため、マスタープレイリストに INDEPENDENT-SEGMENTS を付けない。
+"""
+
+import csv
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .services import get_video_setting
+
+HLS_DIR = 'hls'
+INDEX_FILE = 'index.json'
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+PAT_PID = 0
+PCR_CLOCK = 90000  # Hz (33-bit PCR base)
+DEFAULT_SEGMENT_SECONDS = 6
+DEFAULT_LADDER = [
+    {'name': '1080p', 'height': 1080, 'video_bitrate': 5000, 'audio_bitrate': 192},
+    {'name': '720p', 'height': 720, 'video_bitrate': 2800, 'audio_bitrate': 128},
+    {'name': '480p', 'height': 480, 'video_bitrate': 1400, 'audio_bitrate': 128},
+    {'name': '360p', 'height': 360, 'video_bitrate': 800, 'audio_bitrate': 96},
+]
+COMMAND_TIMEOUT = 6 * 60 * 60  # seconds per rendition
+
+
+def can_package(source):
+    """Whether a source can be packaged here (ffmpeg installed, or an MPEG-TS file)."""
+    return bool(shutil.which('ffmpeg')) or source.lower().endswith('.ts')
+
+
+def probe_dimensions(source):
+    """(width, height) of the first video stream, or None when unknown."""
+    if not shutil.which('ffprobe'):
+        return None
+    result = subprocess.run(
+        [
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height', '-of', 'json', source,
+        ],
+        capture_output=True, check=True, timeout=60,
+    )
+    streams = json.loads(result.stdout).get('streams') or [{}]
+    width, height = streams[0].get('width'), streams[0].get('height')
+    return (width, height) if width and height else None
+
+
+def select_ladder(ladder, source_height):
+    """Renditions not taller than the source (at least the smallest one)."""
+    ladder = sorted(ladder, key=lambda rendition: rendition['height'], reverse=True)
+    if not source_height:
+        return ladder
+    selected = [rendition for rendition in ladder if rendition['height'] <= source_height]
+    return selected or ladder[-1:]
+
+
+def _even(value):
+    return max(int(round(value / 2)) * 2, 2)
+
+
+def segment_with_ffmpeg(source, output_dir, rendition, segment_seconds, duration, report):
+    """
+    Transcode one rendition and cut it into MPEG-TS segments.
+    Returns [(file name, seconds), ...]; report(fraction) is called while encoding.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    segment_list = os.path.join(output_dir, 'segments.csv')
+    video_bitrate, audio_bitrate = rendition['video_bitrate'], rendition['audio_bitrate']
+    command = [
+        'ffmpeg', '-v', 'error', '-nostats', '-y', '-i', source,
+        '-map', '0:v:0', '-map', '0:a:0?',
+        '-vf', f"scale=-2:{rendition['height']}",
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+        '-b:v', f'{video_bitrate}k', '-maxrate', f'{int(video_bitrate * 1.07)}k', '-bufsize', f'{video_bitrate * 2}k',
+        # キーフレームをセグメント境界に揃える（画質間で切り替え位置が一致する）
+        '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})', '-sc_threshold', '0',
+        '-c:a', 'aac', '-b:a', f'{audio_bitrate}k', '-ac', '2',
+        '-f', 'segment', '-segment_time', str(segment_seconds), '-segment_format', 'mpegts',
+        '-segment_list', segment_list, '-segment_list_type', 'csv',
+        '-progress', 'pipe:1',
+        os.path.join(output_dir, '%05d.ts'),
+    ]
+    errors = []
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    # 出力を読んでいる間もタイムアウトを効かせる（止まった ffmpeg がパイプを開いたままでもワーカーを塞がない）
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    watchdog = threading.Timer(COMMAND_TIMEOUT, kill)
+    watchdog.daemon = True
+    watchdog.start()
+    try:
+        for line in process.stdout:
+            key, separator, value = line.strip().partition('=')
+            if key == 'out_time_us' and duration and value.isdigit():
+                report(min(int(value) / 1_000_000 / duration, 1))
+            elif not separator:
+                errors.append(line.strip())
+        process.wait()
+    finally:
+        watchdog.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(command, COMMAND_TIMEOUT)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command, output='\n'.join(errors[-5:]))
+
+    with open(segment_list, newline='') as f:
+        segments = [(row[0], float(row[2]) - float(row[1])) for row in csv.reader(f) if row]
+    os.remove(segment_list)
+    return segments
+
+
+def _payload(packet):
+    """Payload bytes of a TS packet (after the adaptation field)."""
+    offset = 4
+    if packet[3] & 0x20:
+        offset += 1 + packet[4]
+    return packet[offset:] if packet[3] & 0x10 else b''
+
+
+def _pmt_pids(packet):
+    """PMT PIDs listed in a PAT packet (payload unit start only)."""
+    payload = _payload(packet)
+    if not packet[1] & 0x40 or not payload:
+        return set()
+    section = payload[1 + payload[0]:]
+    if len(section) < 8:
+        return set()
+    section_length = ((section[1] & 0x0F) << 8) | section[2]
+    programs = section[8:min(3 + section_length - 4, len(section))]
+    return {
+        ((programs[i + 2] & 0x1F) << 8) | programs[i + 3]
+        for i in range(0, len(programs) - 3, 4)
+        if programs[i:i + 2] != b'\x00\x00'  # program 0 is the network PID
+    }
+
+
+def _packet_info(packet):
+    """(pid, random access point, PCR seconds or None) of a TS packet."""
+    pid = ((packet[1] & 0x1F) << 8) | packet[2]
+    random_access, pcr = False, None
+    if packet[3] & 0x20 and packet[4] > 0:
+        flags = packet[5]
+        random_access = bool(flags & 0x40)
+        if flags & 0x10 and packet[4] >= 7:
+            pcr = (int.from_bytes(packet[6:12], 'big') >> 15) / PCR_CLOCK
+    return pid, random_access, pcr
+
+
+def segment_transport_stream(source, output_dir, segment_seconds, duration, report):
+    """
+    Pure-Python segmenter for MPEG-TS sources.
+    segment_seconds を超えた後の最初のキーフレーム（random_access_indicator）で区切り、
+    各セグメントの先頭に直前の PAT / PMT を入れる。長さは PCR から求める。
+    キーフレームの目印がないストリームはバイト数で区切り、長さもバイト数からの概算になる。
+
+    Returns ([(file name, seconds), ...], independent) where independent tells whether
+    every segment starts at a random access point.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    size = os.path.getsize(source)
+    duration = duration or segment_seconds
+    segment_bytes = max(size * segment_seconds // duration // TS_PACKET_SIZE, 1) * TS_PACKET_SIZE
+
+    pmt_pids = set()
+    headers = {}  # latest PAT / PMT packet by PID, repeated at the start of each segment
+    keyframes_seen = False
+    independent = True
+    cuts = []  # (file name, first byte, first PCR)
+    last_pcr = None
+    out = None
+    position = 0
+
+    def start_segment(packet_pcr, prefix=b''):
+        nonlocal out
+        if out:
+            out.close()
+        name = f'{len(cuts):05d}.ts'
+        out = open(os.path.join(output_dir, name), 'wb')
+        out.write(prefix)
+        cuts.append([name, position, packet_pcr])
+
+    try:
+        with open(source, 'rb') as f:
+            while True:
+                chunk = f.read(TS_PACKET_SIZE * 4096)
+                if not chunk:
+                    break
+                for offset in range(0, len(chunk) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+                    packet = chunk[offset:offset + TS_PACKET_SIZE]
+                    if packet[0] != TS_SYNC_BYTE:
+                        raise ValueError(f'{source}: lost MPEG-TS sync at byte {position}')
+                    pid, random_access, pcr = _packet_info(packet)
+                    keyframes_seen = keyframes_seen or random_access
+
+                    if out is None:
+                        start_segment(pcr)
+                    else:
+                        _, first_byte, first_pcr = cuts[-1]
+                        now = pcr if pcr is not None else last_pcr
+                        if keyframes_seen:
+                            elapsed = (
+                                now - first_pcr if first_pcr is not None and now is not None
+                                else (position - first_byte) * duration / size
+                            )
+                            cut = random_access and elapsed >= segment_seconds
+                        else:
+                            cut = position - first_byte >= segment_bytes
+                            independent = independent and not cut
+                        if cut:
+                            start_segment(pcr, b''.join(headers.values()) if keyframes_seen else b'')
+
+                    if pcr is not None:
+                        last_pcr = pcr
+                        if cuts[-1][2] is None:
+                            cuts[-1][2] = pcr
+                    if pid == PAT_PID:
+                        pmt_pids = _pmt_pids(packet) or pmt_pids
+                        headers = {PAT_PID: packet, **{p: headers[p] for p in pmt_pids if p in headers}}
+                    elif pid in pmt_pids:
+                        headers[pid] = packet
+
+                    out.write(packet)
+                    position += TS_PACKET_SIZE
+                report(position / size)
+    finally:
+        if out:
+            out.close()
+
+    # 各セグメントの長さ: 次のセグメント先頭の PCR との差（PCR がなければバイト数で按分）
+    use_pcr = all(first_pcr is not None for _, _, first_pcr in cuts) and last_pcr is not None
+    segments = []
+    for index, (name, first_byte, first_pcr) in enumerate(cuts):
+        is_last = index + 1 == len(cuts)
+        if use_pcr:
+            length = (last_pcr if is_last else cuts[index + 1][2]) - first_pcr
+        if not use_pcr or length < 0:  # PCR の折り返しなど
+            end_byte = size if is_last else cuts[index + 1][1]
+            length = duration * (end_byte - first_byte) / size
+        segments.append((name, length))
+    return segments, independent
+
+
+def package_hls(source, video_dir, duration, report):
+    """
+    Package a source into <video_dir>/hls and write its index.json.
+    report(percent) receives 0-100 over all renditions.
+    """
+    segment_seconds = get_video_setting('HLS_SEGMENT_SECONDS', DEFAULT_SEGMENT_SECONDS)
+    temp_dir = os.path.join(video_dir, f'{HLS_DIR}.tmp')
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+    renditions = []
+    if shutil.which('ffmpeg'):
+        dimensions = probe_dimensions(source)
+        ladder = select_ladder(get_video_setting('HLS_LADDER', DEFAULT_LADDER), dimensions and dimensions[1])
+        for index, rendition in enumerate(ladder):
+            def report_rendition(fraction, index=index):
+                report((index + fraction) * 100 / len(ladder))
+
+            segments = segment_with_ffmpeg(
+                source, os.path.join(temp_dir, rendition['name']), rendition, segment_seconds, duration,
+                report_rendition,
+            )
+            entry = {
+                'name': rendition['name'],
+                'bandwidth': (rendition['video_bitrate'] + rendition['audio_bitrate']) * 1000,
+                'segments': segments,
+                'independent': True,  # キーフレームをセグメント境界に揃えている
+            }
+            if dimensions:
+                width, height = dimensions
+                entry['resolution'] = f"{_even(width * rendition['height'] / height)}x{rendition['height']}"
+            renditions.append(entry)
+    else:
+        segments, independent = segment_transport_stream(
+            source, os.path.join(temp_dir, 'source'), segment_seconds, duration,
+            lambda fraction: report(fraction * 100),
+        )
+        seconds = sum(length for _, length in segments) or 1
+        renditions.append({
+            'name': 'source',
+            'bandwidth': int(os.path.getsize(source) * 8 / seconds),
+            'segments': segments,
+            'independent': independent,
+        })
+
+    with open(os.path.join(temp_dir, INDEX_FILE), 'w') as f:
+        json.dump({'segment_seconds': segment_seconds, 'renditions': renditions}, f)
+
+    # 完成してから差し替える（再パッケージ中も古いセグメントを配信できる）
+    hls_dir = os.path.join(video_dir, HLS_DIR)
+    old_dir = os.path.join(video_dir, f'{HLS_DIR}.old')
+    if os.path.exists(hls_dir):
+        os.replace(hls_dir, old_dir)
+    os.replace(temp_dir, hls_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def render_master_playlist(index):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    if all(rendition.get('independent') for rendition in index['renditions']):
+        lines.append('#EXT-X-INDEPENDENT-SEGMENTS')
+    for rendition in sorted(index['renditions'], key=lambda rendition: rendition['bandwidth'], reverse=True):
+        attributes = f"BANDWIDTH={rendition['bandwidth']}"
+        if rendition.get('resolution'):
+            attributes += f",RESOLUTION={rendition['resolution']}"
+        lines += [f'#EXT-X-STREAM-INF:{attributes}', f"{rendition['name']}.m3u8"]
+    return '\n'.join(lines) + '\n'
+
+
+def render_media_playlist(index, name):
+    """Playlist of one rendition, or None for an unknown name."""
+    rendition = next((rendition for rendition in index['renditions'] if rendition['name'] == name), None)
+    if rendition is None:
+        return None
+    segments = rendition['segments']
+    target = max([index['segment_seconds']] + [int(length + 0.999) for _, length in segments])
+    lines = [
+        '#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{target}',
+        '#EXT-X-MEDIA-SEQUENCE:0', '#EXT-X-PLAYLIST-TYPE:VOD',
+    ]
+    for filename, length in segments:
+        lines += [f'#EXTINF:{length:.3f},', f"{name}/{filename}"]
+    lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+def get_playlist(video_dir, name, schema_name=None):
+    """
+    Text of master.m3u8 ('master') or a rendition playlist for a packaged video, or None.
+    Rendered from index.json on first use and cached until the video is packaged again.
+    """
+    index_path = os.path.join(settings.MEDIA_ROOT, video_dir, HLS_DIR, INDEX_FILE)
+    try:
+        mtime = os.stat(index_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    schema_name = schema_name or connection.schema_name
+    key = f'hls:{schema_name}:{video_dir}:{mtime}:{name}'
+    playlist = cache.get(key)
+    if playlist is None:
+        with open(index_path) as f:
+            index = json.load(f)
+        playlist = render_master_playlist(index) if name == 'master' else render_media_playlist(index, name)
+        if playlist is None:
+            return None
+        cache.set(key, playlist, get_video_setting('HLS_MANIFEST_CACHE_TIMEOUT', 60 * 60))
+    return playlist
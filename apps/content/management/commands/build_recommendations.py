@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from apps.content.models import VideoFavorite, VideoLike, VideoView
+from apps.content.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user video recommendations in Redis (stale users by default; run every few minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=str,
+            help='Tenant schema to update (default: all tenants)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild for every user active in the last 30 days (e.g. nightly after build_related_videos)',
+        )
+
+    def handle(self, *args, **options):
+        Tenant = get_tenant_model()
+        tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+        if options['tenant']:
+            tenants = tenants.filter(schema_name=options['tenant'])
+
+        for tenant in tenants:
+            with schema_context(tenant.schema_name):
+                user_ids = self.active_user_ids() if options['all'] else None
+                updated = build_recommendations(user_ids, tenant.schema_name)
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.schema_name}: rebuilt recommendations for {updated} users'
+            ))
+
+    def active_user_ids(self):
+        since = timezone.now() - timedelta(days=30)
+        user_ids = set(
+            VideoView.objects.filter(updated_at__gte=since, user__isnull=False).values_list('user_id', flat=True).distinct()
+        )
+        user_ids.update(VideoLike.objects.filter(created_at__gte=since).values_list('user_id', flat=True).distinct())
+        user_ids.update(VideoFavorite.objects.filter(created_at__gte=since).values_list('user_id', flat=True).distinct())
+        return user_ids
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from apps.content.uploads import cleanup_expired_uploads
+
+
+class Command(BaseCommand):
+    help = 'Remove resumable uploads that have been idle for UPLOAD_EXPIRY_HOURS (run hourly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=str,
+            help='Tenant schema to clean up (default: all tenants)',
+        )
+
+    def handle(self, *args, **options):
+        Tenant = get_tenant_model()
+        tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+        if options['tenant']:
+            tenants = tenants.filter(schema_name=options['tenant'])
+
+        for tenant in tenants:
+            with schema_context(tenant.schema_name):
+                removed = cleanup_expired_uploads()
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.schema_name}: removed {removed} expired uploads'
+            ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from apps.content.services import flush_video_views, flush_watch_progress
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered view counts and watch progress from Redis to the database (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=str,
+            help='Tenant schema to flush (default: all tenants)',
+        )
+
+    def handle(self, *args, **options):
+        Tenant = get_tenant_model()
+        tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+        if options['tenant']:
+            tenants = tenants.filter(schema_name=options['tenant'])
+
+        for tenant in tenants:
+            try:
+                with schema_context(tenant.schema_name):
+                    updated = flush_video_views(tenant.schema_name)
+                    written = flush_watch_progress(tenant.schema_name)
+            except Exception as e:
+                # 1テナントの失敗で他のテナントの反映を止めない（未反映分は次回に持ち越す）
+                self.stderr.write(self.style.ERROR(f'{tenant.schema_name}: flush failed: {e}'))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.schema_name}: flushed view counts for {updated} videos, '
+                f'{written} watch history entries'
+            ))
@@ -0,0 +1,64 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from apps.content.hls import can_package, package_hls
+from apps.content.models import Video
+from apps.content.processing import find_source, probe_duration, video_media_dir
+
+
+class Command(BaseCommand):
+    help = (
+        'Package ready videos that still play their source file (uploads, recordings placed at '
+        'videos/<schema>/<id>/source.*) as HLS and point playback_url at the master playlist'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=str,
+            help='Tenant schema to package (default: all tenants)',
+        )
+        parser.add_argument(
+            '--video',
+            type=int,
+            action='append',
+            help='Video id to (re)package, even if already HLS (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        Tenant = get_tenant_model()
+        tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+        if options['tenant']:
+            tenants = tenants.filter(schema_name=options['tenant'])
+
+        for tenant in tenants:
+            with schema_context(tenant.schema_name):
+                packaged, skipped = self.package(tenant.schema_name, options['video'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.schema_name}: packaged {packaged} videos ({skipped} without a packageable source)'
+            ))
+
+    def package(self, schema_name, video_ids):
+        videos = Video.objects.filter(status='ready')
+        if video_ids:
+            videos = videos.filter(id__in=video_ids)
+        else:
+            videos = videos.exclude(playback_url__endswith='.m3u8')
+
+        packaged = skipped = 0
+        for video in videos:
+            source_path = find_source(video.id, schema_name)
+            source = source_path and os.path.join(settings.MEDIA_ROOT, source_path)
+            if not source or not can_package(source):
+                skipped += 1
+                continue
+
+            video_dir = os.path.join(settings.MEDIA_ROOT, video_media_dir(video.id, schema_name))
+            package_hls(source, video_dir, video.duration or probe_duration(source), lambda percent: None)
+            video.playback_url = reverse('content:hls_playlist', args=[video.id, 'master'])
+            video.save(update_fields=['playback_url', 'updated_at'])
+            packaged += 1
+        return packaged, skipped
@@ -0,0 +1,75 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django_redis import get_redis_connection
+from apps.content.processing import (
+    PROCESSING_ACTIVE_KEY, PROCESSING_QUEUE_KEY, requeue_unfinished_jobs, run_job,
+)
+from apps.content.services import get_video_setting
+
+
+def _init_worker():
+    # spawn 方式のプロセスでも Django を初期化し、fork 元の DB 接続は使わない
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run the video processing worker pool (long-running; consumes the Redis processing queue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of worker processes (default: VIDEO_SETTINGS PROCESSING_WORKERS)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty instead of waiting for new jobs',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or get_video_setting('PROCESSING_WORKERS', 2)
+        redis = get_redis_connection('default')
+
+        # 前回停止時に処理中だったジョブをキューに戻す（ワーカーは1台で動かす前提）
+        requeued = requeue_unfinished_jobs()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} unfinished jobs')
+
+        connections.close_all()
+        processed = failed = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            self.stdout.write(self.style.SUCCESS(f'Video processing worker started ({workers} processes)'))
+            running = {}
+            try:
+                while True:
+                    # 空いているワーカーの数だけジョブを取り出す（取り出したジョブは active リストへ）
+                    while len(running) < workers:
+                        job = redis.brpoplpush(PROCESSING_QUEUE_KEY, PROCESSING_ACTIVE_KEY, timeout=1)
+                        if not job:
+                            break
+                        running[pool.submit(run_job, job)] = job
+
+                    if not running:
+                        if options['once']:
+                            break
+                        continue
+
+                    done, _ = wait(running, timeout=1, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = running.pop(future)
+                        redis.lrem(PROCESSING_ACTIVE_KEY, 1, job)
+                        try:
+                            if future.result():
+                                processed += 1
+                        except Exception as e:
+                            failed += 1
+                            self.stderr.write(f'Job {job!r} failed: {e}')
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping; unfinished jobs will be requeued on the next start')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} videos ({failed} failed)'))
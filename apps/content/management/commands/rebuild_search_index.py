@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from apps.content.models import Video
+from apps.content.search import update_search_vector
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search vectors of all videos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=str,
+            help='Tenant schema to rebuild (default: all tenants)',
+        )
+
+    def handle(self, *args, **options):
+        Tenant = get_tenant_model()
+        tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+        if options['tenant']:
+            tenants = tenants.filter(schema_name=options['tenant'])
+
+        for tenant in tenants:
+            with schema_context(tenant.schema_name):
+                count = 0
+                for video in Video.objects.select_related('uploader').iterator(chunk_size=500):
+                    update_search_vector(video)
+                    count += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.schema_name}: rebuilt search index for {count} videos'
+            ))
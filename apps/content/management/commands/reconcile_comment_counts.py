@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from apps.content.services import reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild video comment counts and comment reply counts from the comments table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=str,
+            help='Tenant schema to reconcile (default: all tenants)',
+        )
+
+    def handle(self, *args, **options):
+        Tenant = get_tenant_model()
+        tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+        if options['tenant']:
+            tenants = tenants.filter(schema_name=options['tenant'])
+
+        for tenant in tenants:
+            with schema_context(tenant.schema_name):
+                updated = reconcile_comment_counts()
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.schema_name}: reconciled comment counts for {updated} videos'
+            ))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-19 03:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0002_videofavorite'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoview',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='videoview',
+            index=models.Index(fields=['user', '-updated_at'], name='content_vv_user_updated_idx'),
+        ),
+    ]
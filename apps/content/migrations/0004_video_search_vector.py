@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-19 03:22
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_search_vector(apps, schema_editor):
+    from apps.content.search import build_search_vector
+
+    Video = apps.get_model('content', 'Video')
+    videos = Video.objects.select_related('uploader').prefetch_related('tags')
+    for video in videos.iterator(chunk_size=500):
+        tags = ' '.join(tag.name for tag in video.tags.all())
+        Video.objects.filter(pk=video.pk).update(
+            search_vector=build_search_vector(video.title, tags, video.uploader.username, video.description)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0003_videoview_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='content_video_search_gin'),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
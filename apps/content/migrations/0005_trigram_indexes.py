@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 03:23
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_video_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Installed into public so every tenant schema sees gin_trgm_ops via search_path
+        migrations.RunSQL(
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='content_video_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='videotag',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='content_videotag_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
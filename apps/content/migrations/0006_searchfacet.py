@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-19 03:24
+
+from django.db import migrations, models
+
+
+def backfill_search_facets(apps, schema_editor):
+    SearchFacet = apps.get_model('content', 'SearchFacet')
+    Video = apps.get_model('content', 'Video')
+
+    published = Video.objects.filter(status='ready', privacy__in=['public', 'unlisted'])
+    facets = [
+        SearchFacet(facet_type='category', object_id=row['category_id'], video_count=row['total'])
+        for row in published.exclude(category=None).values('category_id').annotate(total=models.Count('id')).order_by()
+    ] + [
+        SearchFacet(facet_type='tag', object_id=row['tags'], video_count=row['total'])
+        for row in published.filter(tags__isnull=False).values('tags').annotate(total=models.Count('id')).order_by()
+    ]
+    SearchFacet.objects.bulk_create(facets, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0005_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet_type', models.CharField(choices=[('tag', 'タグ'), ('category', 'カテゴリ')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('video_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['facet_type', '-video_count'], name='content_facet_count_idx')],
+                'unique_together': {('facet_type', 'object_id')},
+            },
+        ),
+        migrations.RunPython(backfill_search_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-19 03:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_reply_count(apps, schema_editor):
+    Comment = apps.get_model('content', 'Comment')
+    Comment.objects.update(
+        reply_count=Coalesce(
+            models.Subquery(
+                Comment.objects.filter(parent=models.OuterRef('pk'), is_hidden=False)
+                .order_by()
+                .values('parent')
+                .annotate(total=models.Count('id'))
+                .values('total')
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0007_relatedvideo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['video', 'parent', '-created_at'], name='content_comment_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent', 'created_at'], name='content_comment_replies_idx'),
+        ),
+        migrations.RunPython(backfill_reply_count, migrations.RunPython.noop),
+    ]
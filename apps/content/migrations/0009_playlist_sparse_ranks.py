@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-19 03:33
+
+from django.db import migrations, models
+
+RANK_GAP = 1024
+
+
+def spread_playlist_ranks(apps, schema_editor):
+    Playlist = apps.get_model('content', 'Playlist')
+    PlaylistItem = apps.get_model('content', 'PlaylistItem')
+    items = PlaylistItem._meta.db_table
+    playlists = Playlist._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {items} SET "order" = ranked.position * %s
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY playlist_id ORDER BY "order", id) AS position
+                FROM {items}
+            ) ranked
+            WHERE {items}.id = ranked.id
+        """, [RANK_GAP])
+        cursor.execute(f"""
+            UPDATE {playlists} SET tail_rank = COALESCE(
+                (SELECT MAX("order") FROM {items} WHERE {items}.playlist_id = {playlists}.id), 0
+            )
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0008_comment_reply_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='tail_rank',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='playlistitem',
+            name='order',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='playlistitem',
+            index=models.Index(fields=['playlist', 'order'], name='content_plitem_order_idx'),
+        ),
+        migrations.RunPython(spread_playlist_ranks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-19 03:35
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_item_count(apps, schema_editor):
+    Playlist = apps.get_model('content', 'Playlist')
+    PlaylistItem = apps.get_model('content', 'PlaylistItem')
+    Playlist.objects.update(
+        item_count=Coalesce(
+            models.Subquery(
+                PlaylistItem.objects.filter(playlist=models.OuterRef('pk'))
+                .order_by()
+                .values('playlist')
+                .annotate(total=models.Count('id'))
+                .values('total')
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0009_playlist_sparse_ranks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_item_count, migrations.RunPython.noop),
+    ]
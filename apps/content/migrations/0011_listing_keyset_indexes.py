@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 03:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0010_playlist_item_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(models.F('status'), models.OrderBy(models.F('published_at'), descending=True, nulls_last=True), models.OrderBy(models.F('id'), descending=True), name='content_video_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(models.F('uploader'), models.OrderBy(models.F('published_at'), descending=True, nulls_last=True), models.OrderBy(models.F('id'), descending=True), name='content_video_uploader_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-view_count', '-id'], name='content_video_views_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videofavorite',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='content_fav_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-19 03:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0011_listing_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('path', models.CharField(max_length=500)),
+                ('status', models.CharField(choices=[('uploading', 'アップロード中'), ('complete', '完了')], default='uploading', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_uploads', to=settings.AUTH_USER_MODEL)),
+                ('video', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='upload', to='content.video')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='content_upload_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 09:10
+
+from django.db import migrations
+
+
+def reindex_search_vector(apps, schema_editor):
+    # 索引に CJK の末尾1文字を含めるようにしたため、既存の tsvector を作り直す
+    from apps.content.search import build_search_vector
+
+    Video = apps.get_model('content', 'Video')
+    videos = Video.objects.select_related('uploader').prefetch_related('tags')
+    for video in videos.iterator(chunk_size=500):
+        tags = ' '.join(tag.name for tag in video.tags.all())
+        Video.objects.filter(pk=video.pk).update(
+            search_vector=build_search_vector(video.title, tags, video.uploader.username, video.description)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0012_videoupload'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_search_vector, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,7 @@
+import uuid
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.conf import settings
 
@@ -53,6 +57,9 @@ class Video(models.Model):
     tags = models.ManyToManyField('VideoTag', blank=True, related_name='videos')
     category = models.ForeignKey('VideoCategory', on_delete=models.SET_NULL, null=True, blank=True)
     
+    # Full-text search (maintained by signals, see apps.content.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     published_at = models.DateTimeField(null=True, blank=True)
@@ -60,6 +67,20 @@ class Video(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='content_video_search_gin'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='content_video_title_trgm'),
+            # keyset pagination of listings (see apps.core.pagination)
+            models.Index(
+                models.F('status'), models.F('published_at').desc(nulls_last=True), models.F('id').desc(),
+                name='content_video_published_idx',
+            ),
+            models.Index(
+                models.F('uploader'), models.F('published_at').desc(nulls_last=True), models.F('id').desc(),
+                name='content_video_uploader_idx',
+            ),
+            models.Index(fields=['-view_count', '-id'], name='content_video_views_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} by {self.uploader.username}"
@@ -78,6 +99,35 @@ class Video(models.Model):
         return f"{minutes:02d}:{seconds:02d}"
 
 
+class VideoUpload(models.Model):
+    """Resumable (tus-style) upload session of a video source file."""
+    
+    STATUS_CHOICES = [
+        ('uploading', 'アップロード中'),
+        ('complete', '完了'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    video = models.OneToOneField(Video, on_delete=models.CASCADE, related_name='upload')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='video_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()  # declared total size in bytes
+    offset = models.BigIntegerField(default=0)  # bytes received so far
+    path = models.CharField(max_length=500)  # partial file, then the source file (relative to MEDIA_ROOT)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='content_upload_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
 class VideoCategory(models.Model):
     """Video category/genre."""
     name = models.CharField(max_length=100, unique=True)
@@ -96,10 +146,52 @@ class VideoTag(models.Model):
     """Video tags."""
     name = models.CharField(max_length=50, unique=True)
     
+    class Meta:
+        indexes = [
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='content_videotag_name_trgm'),
+        ]
+    
     def __str__(self):
         return self.name
 
 
+class RelatedVideo(models.Model):
+    """Precomputed item-to-item neighbours of a video (built by build_related_videos)."""
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='related_from')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    
+    class Meta:
+        unique_together = ('video', 'rank')
+        ordering = ['rank']
+    
+    def __str__(self):
+        return f"{self.video_id} -> {self.related_id} (#{self.rank})"
+
+
+class SearchFacet(models.Model):
+    """Materialized tag/category counts of published videos (maintained by signals)."""
+    
+    FACET_TYPE_CHOICES = [
+        ('tag', 'タグ'),
+        ('category', 'カテゴリ'),
+    ]
+    
+    facet_type = models.CharField(max_length=10, choices=FACET_TYPE_CHOICES)
+    object_id = models.BigIntegerField()  # VideoTag.id or VideoCategory.id
+    video_count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('facet_type', 'object_id')
+        indexes = [
+            models.Index(fields=['facet_type', '-video_count'], name='content_facet_count_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.facet_type}:{self.object_id} ({self.video_count})"
+
+
 class Playlist(models.Model):
     """User playlists."""
     
@@ -116,6 +208,8 @@ class Playlist(models.Model):
     
     privacy = models.CharField(max_length=20, choices=PRIVACY_CHOICES, default='public')
     thumbnail_url = models.URLField(blank=True)
+    tail_rank = models.BigIntegerField(default=0)  # order of the last appended item
+    item_count = models.IntegerField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -128,19 +222,22 @@ class Playlist(models.Model):
     
     @property
     def video_count(self):
-        return self.videos.count()
+        return self.item_count
 
 
 class PlaylistItem(models.Model):
     """Playlist video items with ordering."""
     playlist = models.ForeignKey(Playlist, on_delete=models.CASCADE)
     video = models.ForeignKey(Video, on_delete=models.CASCADE)
-    order = models.IntegerField(default=0)
+    order = models.BigIntegerField(default=0)  # sparse rank, see playlists.py
     added_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         unique_together = ('playlist', 'video')
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['playlist', 'order'], name='content_plitem_order_idx'),
+        ]
 
 
 class VideoView(models.Model):
@@ -152,9 +249,13 @@ class VideoView(models.Model):
     watch_duration = models.IntegerField(default=0)  # seconds watched
     completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # last progress report
     
     class Meta:
         unique_together = ('video', 'user', 'ip_address')
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='content_vv_user_updated_idx'),
+        ]
     
     def __str__(self):
         user_info = self.user.username if self.user else self.ip_address
@@ -187,12 +288,18 @@ class Comment(models.Model):
     is_hidden = models.BooleanField(default=False)
     
     like_count = models.IntegerField(default=0)
+    reply_count = models.IntegerField(default=0)  # visible direct replies
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of top-level comments and of each thread's replies
+            models.Index(fields=['video', 'parent', '-created_at'], name='content_comment_thread_idx'),
+            models.Index(fields=['parent', 'created_at'], name='content_comment_replies_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.user.username} on {self.video.title}"
@@ -210,6 +317,9 @@ class VideoFavorite(models.Model):
     
     class Meta:
         unique_together = ('video', 'user')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='content_fav_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} favorited {self.video.title}"
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Playlist ordering.
+PlaylistItem.order は間隔（PLAYLIST_RANK_GAP）を空けた疎なランクで、
+末尾のランクを Playlist.tail_rank に保持する。
+追加は MAX(order) を集計せずに末尾ランクから採番し、
+移動は前後のアイテムの中間ランクを振るだけでリスト全体を振り直さない。
+間隔を使い切った場合のみプレイリストを再採番する。
+"""
+
+from django.db import connection, transaction
+from django.db.models import F, Prefetch
+
+from .services import get_video_setting
+from .viewer_state import invalidate_viewer_state
+
+
+def get_rank_gap():
+    return get_video_setting('PLAYLIST_RANK_GAP', 1024)
+
+
+def _lock_playlist(playlist):
+    """Lock the playlist row so that ranks are handed out one writer at a time."""
+    from .models import Playlist
+
+    return Playlist.objects.select_for_update().values_list('tail_rank', flat=True).get(pk=playlist.pk)
+
+
+def add_videos_to_playlist(playlist, video_ids):
+    """
+    動画をプレイリストの末尾にまとめて追加する（INSERT 1回）
+    video_ids は呼び出し側で存在・公開状態を確認済みであること。
+
+    Returns (added_count, already_exists_count).
+    """
+    from .models import Playlist, PlaylistItem
+
+    video_ids = list(dict.fromkeys(int(video_id) for video_id in video_ids))
+    if not video_ids:
+        return 0, 0
+
+    gap = get_rank_gap()
+    with transaction.atomic():
+        tail_rank = _lock_playlist(playlist)
+        existing = set(
+            PlaylistItem.objects.filter(playlist=playlist, video_id__in=video_ids)
+            .values_list('video_id', flat=True)
+        )
+        items = [
+            PlaylistItem(playlist=playlist, video_id=video_id, order=tail_rank + gap * position)
+            for position, video_id in enumerate(
+                (video_id for video_id in video_ids if video_id not in existing), start=1
+            )
+        ]
+        if items:
+            PlaylistItem.objects.bulk_create(items, ignore_conflicts=True)
+            playlist.tail_rank = items[-1].order
+            Playlist.objects.filter(pk=playlist.pk).update(
+                tail_rank=playlist.tail_rank,
+                item_count=F('item_count') + len(items),
+            )
+            invalidate_viewer_state(playlist.owner_id)
+
+    return len(items), len(existing)
+
+
+def rebalance_playlist(playlist):
+    """Renumber a playlist to evenly spaced ranks, keeping the current order."""
+    from .models import Playlist, PlaylistItem
+
+    items = PlaylistItem._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {items} SET "order" = ranked.position * %s
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY "order", id) AS position
+                FROM {items}
+                WHERE playlist_id = %s
+            ) ranked
+            WHERE {items}.id = ranked.id
+            RETURNING "order"
+        """, [get_rank_gap(), playlist.pk])
+        playlist.tail_rank = max((row[0] for row in cursor.fetchall()), default=0)
+    Playlist.objects.filter(pk=playlist.pk).update(tail_rank=playlist.tail_rank)
+
+
+def _rank_between(previous, following, gap):
+    """Rank strictly between two neighbours, or None when no integer is left in the gap."""
+    if previous is None:
+        return following - gap
+    if following is None:
+        return previous + gap
+    if following - previous < 2:
+        return None
+    return (previous + following) // 2
+
+
+def move_playlist_item(playlist, item_id, after_item_id=None):
+    """
+    アイテムを after_item_id の直後（None の場合は先頭）へ移動する
+    更新するのは移動したアイテムの1行のみ。
+
+    Returns the item's new rank. Raises PlaylistItem.DoesNotExist for unknown ids.
+    """
+    from .models import Playlist, PlaylistItem
+
+    gap = get_rank_gap()
+    with transaction.atomic():
+        playlist.tail_rank = _lock_playlist(playlist)
+        items = PlaylistItem.objects.filter(playlist=playlist)
+        item = items.get(pk=item_id)
+        if after_item_id is not None and int(after_item_id) == item.pk:
+            return item.order
+        others = items.exclude(pk=item.pk).order_by('order').values_list('order', flat=True)
+
+        for attempt in range(2):
+            if after_item_id is None:
+                previous = None
+            else:
+                previous = items.values_list('order', flat=True).get(pk=after_item_id)
+                others = others.filter(order__gt=previous)
+            following = others.first()
+            if previous is None and following is None:
+                return item.order  # the only item in the playlist
+
+            rank = _rank_between(previous, following, gap)
+            if rank is not None:
+                break
+            # 隣接ランクの間隔を使い切ったので全体を振り直して再計算
+            rebalance_playlist(playlist)
+            others = items.exclude(pk=item.pk).order_by('order').values_list('order', flat=True)
+
+        items.filter(pk=item.pk).update(order=rank)
+        if rank > playlist.tail_rank:
+            playlist.tail_rank = rank
+            Playlist.objects.filter(pk=playlist.pk).update(tail_rank=rank)
+
+    return rank
+
+
+def with_previews(queryset):
+    """
+    一覧表示用に各プレイリストの先頭 PLAYLIST_PREVIEW_COUNT 件だけを preview_items に取得する
+    スライスした Prefetch は ROW_NUMBER() OVER (PARTITION BY playlist_id) で絞り込まれるため、
+    プレイリストの長さに関係なくページあたりの取得件数が一定になる。
+    """
+    from .models import PlaylistItem
+
+    previews = (
+        PlaylistItem.objects.filter(video__status='ready')
+        .select_related('video')
+        .only('playlist', 'order', 'video__id', 'video__title', 'video__thumbnail_url', 'video__status')
+        .order_by('order')[:get_video_setting('PLAYLIST_PREVIEW_COUNT', 4)]
+    )
+    return queryset.prefetch_related(Prefetch('playlistitem_set', queryset=previews, to_attr='preview_items'))
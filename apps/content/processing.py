@@ -0,0 +1,233 @@
+"""
+Video processing.
+アップロードが完了した動画を Redis のキューに積み、process_videos コマンドのワーカープールで処理する。
+ワーカーは probe → thumbnail → package の各ステージを実行し、
+進捗を DB と WebSocket グループ（アップロードしたユーザー単位）に送るため、クライアントはポーリング不要。
+package ステージは HLS にパッケージし（apps.content.hls）、
+パッケージできない環境ではモックエンコーダ（ソースをそのまま配信）で処理する。
+"""
+
+import glob
+import json
+import logging
+import os
+import shutil
+import subprocess
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+from django_redis import get_redis_connection
+from django_tenants.utils import schema_context
+
+from apps.core.thumbnails import generate_thumbnails
+
+from .hls import can_package, package_hls
+from .services import get_video_setting
+
+logger = logging.getLogger(__name__)
+
+MEDIA_DIR = 'videos'
+PROCESSING_QUEUE_KEY = 'video:processing:queue'
+PROCESSING_ACTIVE_KEY = 'video:processing:active'  # jobs taken by a worker and not yet finished
+COMMAND_TIMEOUT = 60 * 60  # seconds per ffmpeg / ffprobe run
+
+# (stage, progress when the stage starts)
+STAGES = [
+    ('probe', 0),
+    ('thumbnail', 10),
+    ('package', 30),
+]
+
+
+def video_media_dir(video_id, schema_name=None):
+    """Directory (relative to MEDIA_ROOT) holding a video's source and processed files."""
+    return f'{MEDIA_DIR}/{schema_name or connection.schema_name}/{video_id}'
+
+
+def find_source(video_id, schema_name=None):
+    """Path (relative to MEDIA_ROOT) of a video's uploaded or recorded source file, or None."""
+    directory = video_media_dir(video_id, schema_name)
+    matches = sorted(glob.glob(os.path.join(settings.MEDIA_ROOT, directory, 'source.*')))
+    return os.path.relpath(matches[0], settings.MEDIA_ROOT) if matches else None
+
+
+def enqueue_video_processing(video_id, source_path, schema_name=None):
+    """Queue a video for processing once the current transaction commits."""
+    schema_name = schema_name or connection.schema_name
+    job = json.dumps({'schema': schema_name, 'video_id': video_id, 'source': source_path})
+
+    def push():
+        get_redis_connection('default').lpush(PROCESSING_QUEUE_KEY, job)
+        logger.info(f"Queued video {video_id} ({schema_name}) for processing")
+
+    transaction.on_commit(push)
+
+
+def processing_group(schema_name, user_id):
+    """Channel layer group that receives progress of a user's videos."""
+    return f'video_processing_{schema_name}_{user_id}'
+
+
+class ProgressReporter:
+    """Write processing progress to the Video row and push it to the uploader's WebSocket group."""
+
+    def __init__(self, video, schema_name):
+        self.video = video
+        self.group = processing_group(schema_name, video.uploader_id)
+        self.channel_layer = get_channel_layer()
+        self.stage = None
+        self.progress = -1
+
+    def send(self, status, **extra):
+        if self.channel_layer is None:
+            return
+        try:
+            async_to_sync(self.channel_layer.group_send)(self.group, {
+                'type': 'processing.progress',
+                'video_id': self.video.id,
+                'status': status,
+                'stage': self.stage,
+                'progress': max(self.progress, 0),
+                **extra,
+            })
+        except Exception as e:
+            # 進捗通知の失敗で処理自体は止めない
+            logger.warning(f"Failed to push processing progress of video {self.video.id}: {e}")
+
+    def update(self, progress, stage=None):
+        """Record progress (0-100); unchanged values are not written or pushed again."""
+        progress = min(int(progress), 100)
+        if stage is not None:
+            self.stage = stage
+        elif progress <= self.progress:
+            return
+        self.progress = progress
+        type(self.video).objects.filter(pk=self.video.pk).update(processing_progress=progress)
+        self.send('processing')
+
+
+def _absolute(path):
+    return os.path.join(settings.MEDIA_ROOT, path)
+
+
+def _media_url(path):
+    return f'{settings.MEDIA_URL}{path}'
+
+
+def probe_duration(source):
+    """Duration of a media file in seconds (0 when ffprobe is unavailable)."""
+    if not shutil.which('ffprobe'):
+        return 0
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', source],
+        capture_output=True, check=True, timeout=COMMAND_TIMEOUT,
+    )
+    duration = json.loads(result.stdout).get('format', {}).get('duration')
+    return int(float(duration)) if duration else 0
+
+
+def extract_thumbnail(source, output_dir, duration):
+    """Grab one frame as thumbnail.jpg; returns its path, or None without ffmpeg."""
+    if not shutil.which('ffmpeg'):
+        return None
+    width, height = get_video_setting('THUMBNAIL_SIZE', (320, 240))
+    output = os.path.join(output_dir, 'thumbnail.jpg')
+    subprocess.run(
+        [
+            'ffmpeg', '-v', 'error', '-y', '-ss', str(min(duration // 10, 5)), '-i', source,
+            '-frames:v', '1', '-vf', f'scale={width}:{height}:force_original_aspect_ratio=decrease', output,
+        ],
+        capture_output=True, check=True, timeout=COMMAND_TIMEOUT,
+    )
+    return output
+
+
+def package_renditions(video_id, source_path, duration, schema_name, report):
+    """
+    Package the source as HLS when possible, otherwise publish the source itself
+    (progressive download; mock encoder). Returns the playback URL.
+    """
+    source = _absolute(source_path)
+    if can_package(source):
+        package_hls(source, _absolute(video_media_dir(video_id, schema_name)), duration, report)
+        return reverse('content:hls_playlist', args=[video_id, 'master'])
+
+    report(100)
+    # 範囲リクエスト・公開設定のチェックに対応した配信ビュー経由で再生する
+    return reverse('content:video_media', args=[
+        video_id, os.path.relpath(source_path, video_media_dir(video_id, schema_name)),
+    ])
+
+
+def process_video(video_id, source_path, schema_name):
+    """Run every processing stage of a video in the current schema and mark it ready (or failed)."""
+    from apps.notifications.services import NotificationService
+    from .models import Video
+
+    video = Video.objects.select_related('uploader').filter(pk=video_id).first()
+    if video is None or video.status != 'processing':
+        return False  # deleted or already processed
+
+    reporter = ProgressReporter(video, schema_name)
+    source = _absolute(source_path)
+    output_dir = os.path.dirname(source)
+    starts = dict(STAGES)
+
+    def report_package(percent):
+        reporter.update(starts['package'] + (100 - starts['package']) * percent / 100)
+
+    try:
+        reporter.update(starts['probe'], stage='probe')
+        duration = probe_duration(source)
+
+        reporter.update(starts['thumbnail'], stage='thumbnail')
+        thumbnail = extract_thumbnail(source, output_dir, duration)
+        if thumbnail:
+            # 一覧・視聴ページ用の縮小版を公開前に作っておく
+            generate_thumbnails(_media_url(os.path.relpath(thumbnail, settings.MEDIA_ROOT)), ['card', 'watch'])
+
+        reporter.update(starts['package'], stage='package')
+        playback_url = package_renditions(video.id, source_path, duration, schema_name, report_package)
+    except Exception as e:
+        logger.exception(f"Processing of video {video_id} ({schema_name}) failed")
+        video.status = 'failed'
+        video.save(update_fields=['status', 'updated_at'])
+        reporter.send('failed', error=str(e))
+        return False
+
+    video.duration = duration
+    video.playback_url = playback_url
+    if thumbnail:
+        video.thumbnail_url = _media_url(os.path.relpath(thumbnail, settings.MEDIA_ROOT))
+    video.status = 'ready'
+    video.processing_progress = 100
+    video.published_at = video.published_at or timezone.now()
+    video.save(update_fields=[
+        'duration', 'playback_url', 'thumbnail_url', 'status', 'processing_progress', 'published_at', 'updated_at',
+    ])
+    reporter.progress = 100
+    reporter.send('ready')
+
+    NotificationService.notify_new_video(video)
+    return True
+
+
+def run_job(job):
+    """Process one queued job (JSON from the queue). Runs inside a worker process."""
+    data = json.loads(job)
+    with schema_context(data['schema']):
+        return process_video(data['video_id'], data['source'], data['schema'])
+
+
+def requeue_unfinished_jobs():
+    """Return jobs left in the active list by a stopped worker to the queue. Returns the count."""
+    redis = get_redis_connection('default')
+    count = 0
+    while redis.rpoplpush(PROCESSING_ACTIVE_KEY, PROCESSING_QUEUE_KEY):
+        count += 1
+    return count
+
@@ -0,0 +1,143 @@
+"""
+Per-user video recommendations.
+高評価・お気に入り・視聴履歴を起点に RelatedVideo の近傍を集計し、
+動画IDのリストとして Redis に保存する（ホーム画面は1回の読み出しのみ）。
+
+操作があったユーザーは dirty セットに追加され、
+build_recommendations で差分更新される。
+"""
+
+import logging
+from collections import defaultdict
+
+from django.db import connection
+from django_redis import get_redis_connection
+
+from .services import get_video_setting
+
+logger = logging.getLogger(__name__)
+
+SEED_LIMIT = 50  # most recent interactions of each kind used as seeds
+SEED_WEIGHTS = {
+    'favorite': 3.0,
+    'like': 2.0,
+    'completed': 1.5,
+    'watched': 1.0,
+}
+
+
+def _recommendations_key(schema_name, user_id):
+    return f'recs:{schema_name}:{user_id}'
+
+
+def _dirty_key(schema_name):
+    return f'recs:dirty:{schema_name}'
+
+
+def mark_recommendations_stale(user_ids, schema_name=None):
+    """Queue users whose recommendations should be rebuilt (new like/favorite/history)."""
+    user_ids = [user_id for user_id in user_ids if user_id]
+    if not user_ids:
+        return
+    schema_name = schema_name or connection.schema_name
+    try:
+        get_redis_connection('default').sadd(_dirty_key(schema_name), *user_ids)
+    except Exception as e:
+        logger.warning(f"Failed to mark recommendations stale: {e}")
+
+
+def get_cached_recommendations(user_id, schema_name=None):
+    """Cached recommended video ids, or None when not built yet / expired."""
+    schema_name = schema_name or connection.schema_name
+    try:
+        value = get_redis_connection('default').get(_recommendations_key(schema_name, user_id))
+    except Exception as e:
+        logger.warning(f"Failed to read recommendations for user {user_id}: {e}")
+        return None
+    if value is None:
+        mark_recommendations_stale([user_id], schema_name)
+        return None
+    return [int(video_id) for video_id in value.decode('utf-8').split(',') if video_id]
+
+
+def compute_recommendations(user_id, trending_ids=()):
+    """
+    Score candidate videos for a user from the related-videos index.
+    Returns a list of video ids, padded with trending videos.
+    """
+    from .models import RelatedVideo, Video, VideoFavorite, VideoLike, VideoView
+
+    seeds = defaultdict(float)
+    for video_id in VideoFavorite.objects.filter(user_id=user_id).order_by('-created_at').values_list(
+        'video_id', flat=True
+    )[:SEED_LIMIT]:
+        seeds[video_id] += SEED_WEIGHTS['favorite']
+    for video_id in VideoLike.objects.filter(user_id=user_id, is_like=True).order_by('-created_at').values_list(
+        'video_id', flat=True
+    )[:SEED_LIMIT]:
+        seeds[video_id] += SEED_WEIGHTS['like']
+    for video_id, completed in VideoView.objects.filter(user_id=user_id).order_by('-updated_at').values_list(
+        'video_id', 'completed'
+    )[:SEED_LIMIT]:
+        seeds[video_id] += SEED_WEIGHTS['completed' if completed else 'watched']
+
+    scores = defaultdict(float)
+    for video_id, related_id, score in RelatedVideo.objects.filter(video_id__in=list(seeds)).values_list(
+        'video_id', 'related_id', 'score'
+    ):
+        if related_id not in seeds:  # 視聴済み・評価済みは除外
+            scores[related_id] += seeds[video_id] * score
+
+    count = get_video_setting('RECOMMENDATION_COUNT', 30)
+    candidates = set(scores) | set(trending_ids[:count * 2])
+    available = set(
+        Video.objects.filter(
+            id__in=candidates,
+            status='ready',
+            privacy__in=['public', 'unlisted']
+        ).exclude(uploader_id=user_id).values_list('id', flat=True)
+    )
+
+    ranked = sorted((video_id for video_id in scores if video_id in available), key=scores.get, reverse=True)
+    for video_id in trending_ids:
+        if len(ranked) >= count:
+            break
+        if video_id in available and video_id not in seeds and video_id not in scores:
+            ranked.append(video_id)
+    return ranked[:count]
+
+
+def store_recommendations(user_id, video_ids, schema_name=None):
+    schema_name = schema_name or connection.schema_name
+    get_redis_connection('default').set(
+        _recommendations_key(schema_name, user_id),
+        ','.join(str(video_id) for video_id in video_ids),
+        ex=get_video_setting('RECOMMENDATION_TTL', 6 * 60 * 60),
+    )
+
+
+def build_recommendations(user_ids=None, schema_name=None, batch_size=500):
+    """
+    Rebuild recommendations for the given users, or for the queued (stale) users.
+    Must be called inside the tenant schema. Returns the number of users updated.
+    """
+    from apps.analytics.services import get_trending_video_ids
+
+    schema_name = schema_name or connection.schema_name
+    redis = get_redis_connection('default')
+    trending_ids = get_trending_video_ids()
+
+    def build(batch):
+        for user_id in batch:
+            store_recommendations(user_id, compute_recommendations(user_id, trending_ids), schema_name)
+        return len(batch)
+
+    if user_ids is not None:
+        return build(list(user_ids))
+
+    updated = 0
+    while True:
+        batch = [int(user_id) for user_id in redis.spop(_dirty_key(schema_name), batch_size) or []]
+        if not batch:
+            return updated
+        updated += build(batch)
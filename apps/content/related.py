@@ -0,0 +1,145 @@
+"""
+Related videos index.
+視聴の共起（同じユーザーが視聴した動画）、共通タグ、同一カテゴリから
+動画間の類似度を計算し、動画ごとの上位 K 件を RelatedVideo に保存する。
+
+共起行列 VᵀV（V: ユーザー×動画の視聴行列）は疎なので、
+PostgreSQL の自己結合で非ゼロ要素だけを集計する。
+"""
+
+import heapq
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .services import get_video_setting
+
+HISTORY_DAYS = 90  # viewing history used for co-views
+HISTORY_PER_USER = 100  # most recent videos per user (caps the pairs per user)
+MAX_TAG_VIDEOS = 1000  # tags on more videos than this are too generic to relate videos
+
+
+def _coview_counts(since):
+    """Sparse co-view matrix {(a, b): users} and viewer counts {video: users}."""
+    from .models import VideoView
+
+    recent = f"""
+        SELECT DISTINCT user_id, video_id FROM (
+            SELECT user_id, video_id,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY updated_at DESC) AS position
+            FROM {VideoView._meta.db_table}
+            WHERE user_id IS NOT NULL AND updated_at >= %s
+        ) ranked
+        WHERE position <= %s
+    """
+    params = [since, HISTORY_PER_USER]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH recent AS ({recent})
+            SELECT a.video_id, b.video_id, COUNT(*)
+            FROM recent a JOIN recent b ON a.user_id = b.user_id AND a.video_id <> b.video_id
+            GROUP BY a.video_id, b.video_id
+        """, params)
+        pairs = {(a, b): count for a, b, count in cursor.fetchall()}
+
+        cursor.execute(f"""
+            WITH recent AS ({recent})
+            SELECT video_id, COUNT(*) FROM recent GROUP BY video_id
+        """, params)
+        viewers = dict(cursor.fetchall())
+
+    return pairs, viewers
+
+
+def _shared_tag_counts():
+    """Sparse shared-tag matrix {(a, b): tags} and tag counts {video: tags}."""
+    from .models import Video
+
+    through = Video.tags.through._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT a.video_id, b.video_id, COUNT(*)
+            FROM {through} a JOIN {through} b ON a.videotag_id = b.videotag_id AND a.video_id <> b.video_id
+            WHERE a.videotag_id IN (
+                SELECT videotag_id FROM {through} GROUP BY videotag_id HAVING COUNT(*) <= %s
+            )
+            GROUP BY a.video_id, b.video_id
+        """, [MAX_TAG_VIDEOS])
+        pairs = {(a, b): count for a, b, count in cursor.fetchall()}
+
+        cursor.execute(f"SELECT video_id, COUNT(*) FROM {through} GROUP BY video_id")
+        tag_counts = dict(cursor.fetchall())
+
+    return pairs, tag_counts
+
+
+def build_related_videos():
+    """
+    類似度 = w_coview * cos(共起) + w_tag * cos(共通タグ) + w_category * 同一カテゴリ
+    Rebuilds RelatedVideo for the current tenant. Returns the number of videos indexed.
+    """
+    from .models import RelatedVideo, Video
+
+    top_k = get_video_setting('RELATED_VIDEOS_COUNT', 10)
+    coview_weight = get_video_setting('RELATED_COVIEW_WEIGHT', 1.0)
+    tag_weight = get_video_setting('RELATED_TAG_WEIGHT', 0.5)
+    category_weight = get_video_setting('RELATED_CATEGORY_WEIGHT', 0.2)
+
+    categories = dict(
+        Video.objects.filter(status='ready', privacy__in=['public', 'unlisted']).values_list('id', 'category_id')
+    )
+
+    scores = defaultdict(float)
+    coviews, viewers = _coview_counts(timezone.now() - timedelta(days=HISTORY_DAYS))
+    for (a, b), count in coviews.items():
+        scores[(a, b)] += coview_weight * count / math.sqrt(viewers[a] * viewers[b])
+    shared_tags, tag_counts = _shared_tag_counts()
+    for (a, b), count in shared_tags.items():
+        scores[(a, b)] += tag_weight * count / math.sqrt(tag_counts[a] * tag_counts[b])
+
+    neighbours = defaultdict(list)
+    for (a, b), score in scores.items():
+        if a not in categories or b not in categories:
+            continue  # 非公開・削除済みの動画は含めない
+        if categories[a] and categories[a] == categories[b]:
+            score += category_weight
+        neighbours[a].append((score, b))
+
+    entries = [
+        RelatedVideo(video_id=video_id, related_id=related_id, rank=rank, score=score)
+        for video_id, candidates in neighbours.items()
+        for rank, (score, related_id) in enumerate(heapq.nlargest(top_k, candidates))
+    ]
+
+    with transaction.atomic():
+        RelatedVideo.objects.all().delete()
+        RelatedVideo.objects.bulk_create(entries, batch_size=1000)
+    return len(neighbours)
+
+
+def get_related_videos(video, limit=10):
+    """
+    Precomputed related videos (one indexed query).
+    まだインデックスがない動画は同じカテゴリの人気動画を返す。
+    """
+    from .models import Video
+
+    published = Video.objects.filter(
+        status='ready',
+        privacy__in=['public', 'unlisted']
+    ).select_related('uploader')
+
+    related = list(
+        published.filter(related_from__video=video).order_by('related_from__rank')[:limit]
+    )
+    if related:
+        return related
+
+    fallback = published.exclude(id=video.id)
+    if video.category_id:
+        fallback = fallback.filter(category_id=video.category_id)
+    return list(fallback.order_by('-view_count')[:limit])
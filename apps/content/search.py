@@ -0,0 +1,150 @@
+"""
+Full-text search for videos.
+PostgreSQL の標準パーサは日本語を単語分割できないため、
+CJK 文字列は2文字ずつのバイグラムに分割してから 'simple' 設定の tsvector に格納する。
+1文字の CJK 検索語は前方一致（'猫:*'）で検索するため、索引には各連続部分の末尾1文字も加える。
+"""
+
+import hashlib
+import re
+import unicodedata
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Q, Value
+
+SEARCH_CONFIG = 'simple'
+
+_CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'  # kana, CJK ideographs
+_TOKEN_RE = re.compile(rf'([{_CJK}]+)|([^\W_{_CJK}]+)')
+
+
+def tokenize(text, index=False):
+    """
+    検索用にテキストをトークン化（スペース区切りの文字列を返す）
+    CJK は文字バイグラム、それ以外は英数字の単語単位。全角/半角は NFKC で正規化する。
+    index=True（tsvector 用）では CJK の各連続部分の末尾1文字も加え、
+    どの文字もいずれかのトークンの先頭になるようにする。
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower()
+    tokens = []
+    for cjk, word in _TOKEN_RE.findall(text):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+            if index:
+                tokens.append(cjk[-1])
+    return ' '.join(tokens)
+
+
+def build_search_vector(title, tags='', username='', description=''):
+    """Weighted tsvector expression: title (A), tags/uploader (B), description (C)."""
+    def vector(text, weight):
+        return SearchVector(Value(tokenize(text, index=True)), config=SEARCH_CONFIG, weight=weight)
+
+    return (
+        vector(title, 'A')
+        + vector(' '.join([tags, username]), 'B')
+        + vector(description, 'C')
+    )
+
+
+def update_search_vector(video):
+    """Recompute the stored search_vector of a video (UPDATE only, no save signals)."""
+    tags = ' '.join(video.tags.values_list('name', flat=True))
+    type(video).objects.filter(pk=video.pk).update(
+        search_vector=build_search_vector(
+            video.title, tags, video.uploader.username, video.description
+        )
+    )
+
+
+def build_tsquery(query):
+    """
+    tsquery text (AND of all tokens) for the user's query, or '' if it has no tokens.
+    1文字の CJK トークンはバイグラムと一致しないため前方一致にする（'猫' → '猫:*'）。
+    トークンは英数字と CJK 文字のみなので、tsquery の演算子を含まない。
+    """
+    return ' & '.join(
+        f'{token}:*' if len(token) == 1 and _TOKEN_RE.fullmatch(token).group(1) else token
+        for token in tokenize(query).split()
+    )
+
+
+def build_search_query(query):
+    """Build a tsquery matching all tokens of the user's query, or None if it has no tokens."""
+    tsquery = build_tsquery(query)
+    if not tsquery:
+        return None
+    return SearchQuery(tsquery, config=SEARCH_CONFIG, search_type='raw')
+
+
+def search(queryset, query):
+    """Filter a Video queryset by full-text query and annotate ts_rank as `rank`."""
+    search_query = build_search_query(query)
+    if search_query is None:
+        return queryset.none()
+    return queryset.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F('search_vector'), search_query)
+    )
+
+
+def _trigram_match(queryset, field, query):
+    """
+    Substring (~*) or typo-tolerant word-similarity (%>) match on a pg_trgm indexed column.
+    icontains は UPPER() を付けるため trgm インデックスが使われない。
+    """
+    return queryset.filter(
+        Q(**{f'{field}__iregex': re.escape(query)}) | Q(**{f'{field}__trigram_word_similar': query})
+    ).annotate(similarity=TrigramWordSimilarity(query, field))
+
+
+def autocomplete(query, limit=5):
+    """
+    検索ボックスの候補（動画タイトル・タグ・チャンネル名）
+    Returns {'videos': [...], 'tags': [...], 'channels': [...]}.
+    """
+    from .models import Video, VideoTag
+
+    public_videos = Video.objects.filter(status='ready', privacy='public')
+
+    videos = _trigram_match(public_videos, 'title', query).order_by('-similarity', '-view_count')
+    tags = _trigram_match(VideoTag.objects.all(), 'name', query).order_by('-similarity', 'name')
+    channels = _trigram_match(
+        get_user_model().objects.filter(Exists(public_videos.filter(uploader=OuterRef('pk')))),
+        'username',
+        query,
+    ).order_by('-similarity', 'username')
+
+    return {
+        'videos': [{'id': v['id'], 'title': v['title']} for v in videos.values('id', 'title')[:limit]],
+        'tags': list(tags.values_list('name', flat=True)[:limit]),
+        'channels': [
+            {'id': c['id'], 'username': c['username']}
+            for c in channels.values('id', 'username')[:limit]
+        ],
+    }
+
+
+def get_autocomplete(query):
+    """Autocomplete results cached per normalized prefix for a short time."""
+    video_settings = getattr(settings, 'VIDEO_SETTINGS', {})
+    query = unicodedata.normalize('NFKC', query).strip().lower()[:50]
+    if not query:
+        return {'videos': [], 'tags': [], 'channels': []}
+
+    digest = hashlib.md5(query.encode('utf-8')).hexdigest()
+    cache_key = f'content:autocomplete:{connection.schema_name}:{digest}'
+    results = cache.get(cache_key)
+    if results is None:
+        results = autocomplete(query, video_settings.get('AUTOCOMPLETE_LIMIT', 5))
+        cache.set(cache_key, results, video_settings.get('AUTOCOMPLETE_CACHE_TIMEOUT', 60))
+    return results
@@ -0,0 +1,504 @@
+"""
+Content service helpers.
+Buffers hot write paths (view counts etc.) in Redis and flushes them in batches.
+"""
+
+import hashlib
+import ipaddress
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from apps.core.pagination import KeysetPaginator
+
+logger = logging.getLogger(__name__)
+
+
+def get_video_setting(name, default=None):
+    """Get a value from VIDEO_SETTINGS."""
+    return getattr(settings, 'VIDEO_SETTINGS', {}).get(name, default)
+
+
+def _is_trusted_proxy(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, 'TRUSTED_PROXIES', [])
+    )
+
+
+def get_client_ip(request):
+    """
+    Get the client IP address.
+    X-Forwarded-For は REMOTE_ADDR が settings.TRUSTED_PROXIES のプロキシの場合のみ使い、
+    右端から信頼できるプロキシを除いた最初のアドレスをクライアントとする（偽装された先頭の値は使わない）。
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '0.0.0.0')
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if not forwarded_for:
+        return remote_addr
+    client = remote_addr
+    for address in reversed(forwarded_for.split(',')):
+        if not _is_trusted_proxy(client):
+            break
+        client = address.strip()
+    try:
+        # 不正な値はバッファ・DB（GenericIPAddressField）に入れない
+        return str(ipaddress.ip_address(client))
+    except ValueError:
+        return remote_addr
+
+
+def get_viewer_key(request):
+    """Identify a viewer for de-duplication (user, session, or IP + user agent)."""
+    if request.user.is_authenticated:
+        return f'u{request.user.id}'
+    if request.session.session_key:
+        return f's{request.session.session_key}'
+    user_agent = request.META.get('HTTP_USER_AGENT', '')
+    digest = hashlib.sha1(f'{get_client_ip(request)}|{user_agent}'.encode('utf-8')).hexdigest()[:16]
+    return f'a{digest}'
+
+
+def _pending_views_key(schema_name):
+    return f'views:pending:{schema_name}'
+
+
+HOURLY_VIEWS_TTL = 8 * 24 * 60 * 60  # keep a little over a week of hourly buckets
+
+
+def _hourly_views_key(schema_name, dt):
+    return f'views:hourly:{schema_name}:{dt.strftime("%Y%m%d%H")}'
+
+
+def record_video_view(request, video_id):
+    """
+    視聴回数を Redis に加算（同一視聴者の再読み込みは一定時間カウントしない）
+    DB への反映は flush_video_views でまとめて行う。
+
+    Returns True if the view was counted.
+    """
+    schema_name = connection.schema_name
+    window = get_video_setting('VIEW_DEDUP_WINDOW', 30 * 60)
+    dedup_key = f'views:seen:{schema_name}:{video_id}:{get_viewer_key(request)}'
+
+    try:
+        redis = get_redis_connection('default')
+        if not redis.set(dedup_key, 1, nx=True, ex=window):
+            return False
+        redis.hincrby(_pending_views_key(schema_name), video_id, 1)
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to buffer view for video {video_id}: {e}")
+        return False
+
+
+def get_pending_views(video_id, schema_name=None):
+    """Views counted in Redis but not yet flushed to the DB."""
+    schema_name = schema_name or connection.schema_name
+    try:
+        value = get_redis_connection('default').hget(_pending_views_key(schema_name), video_id)
+        return int(value) if value else 0
+    except Exception:
+        return 0
+
+
+def flush_video_views(schema_name=None):
+    """
+    バッファした視聴回数を DB に反映
+    UPDATE ... SET view_count = view_count + delta を増分ごとにまとめて実行する。
+    Must be called inside the tenant schema. Returns the number of videos updated.
+    """
+    from .models import Video
+
+    schema_name = schema_name or connection.schema_name
+    redis = get_redis_connection('default')
+    pending_key = _pending_views_key(schema_name)
+    flushing_key = f'views:flushing:{schema_name}:{uuid.uuid4().hex}'
+
+    # 新しい加算と競合しないよう、キーを退避してから読み出す
+    try:
+        redis.rename(pending_key, flushing_key)
+    except ResponseError:
+        return 0  # nothing pending (no such key)
+
+    counts = redis.hgetall(flushing_key)
+    by_delta = defaultdict(list)
+    for video_id, delta in counts.items():
+        by_delta[int(delta)].append(int(video_id))
+
+    try:
+        with transaction.atomic():
+            for delta, video_ids in by_delta.items():
+                Video.objects.filter(id__in=video_ids).update(view_count=F('view_count') + delta)
+    except Exception:
+        # 失敗した場合は加算分を戻す
+        pipe = redis.pipeline(transaction=False)
+        for video_id, delta in counts.items():
+            pipe.hincrby(pending_key, video_id, int(delta))
+        pipe.execute()
+        raise
+    finally:
+        redis.delete(flushing_key)
+
+    # 時間別の視聴数（トレンドスコア計算用）
+    hourly_key = _hourly_views_key(schema_name, timezone.now())
+    pipe = redis.pipeline(transaction=False)
+    for video_id, delta in counts.items():
+        pipe.hincrby(hourly_key, video_id, int(delta))
+    pipe.expire(hourly_key, HOURLY_VIEWS_TTL)
+    pipe.execute()
+
+    return len(counts)
+
+
+def get_hourly_views(hours, schema_name=None):
+    """
+    直近 N 時間の時間別視聴数
+    Returns a list of {video_id: views}, index 0 being the current hour.
+    """
+    schema_name = schema_name or connection.schema_name
+    now = timezone.now()
+    redis = get_redis_connection('default')
+    pipe = redis.pipeline(transaction=False)
+    for age in range(hours):
+        pipe.hgetall(_hourly_views_key(schema_name, now - timedelta(hours=age)))
+    return [
+        {int(video_id): int(views) for video_id, views in bucket.items()}
+        for bucket in pipe.execute()
+    ]
+
+
+def _pending_progress_key(schema_name):
+    return f'watch:pending:{schema_name}'
+
+
+def record_watch_progress(request, video_id, watch_duration, completed=False):
+    """
+    プレーヤーからの視聴進捗を Redis にバッファ（ハートビート毎の DB 書き込みを行わない）
+    同じ視聴者・動画の進捗は最新のもので上書きされ、flush_watch_progress でまとめて反映する。
+    """
+    schema_name = connection.schema_name
+    field = f'{video_id}:{request.user.id}:{get_client_ip(request)}'
+    value = json.dumps({
+        'watch_duration': max(int(watch_duration), 0),
+        'completed': bool(completed),
+        'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+    })
+    try:
+        get_redis_connection('default').hset(_pending_progress_key(schema_name), field, value)
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to buffer watch progress for video {video_id}: {e}")
+        return False
+
+
+def _parse_progress_entry(field, value):
+    """
+    (video_id, user_id, ip_address, data) of a buffered progress entry.
+    Raises ValueError for a malformed entry.
+    """
+    try:
+        video_id, user_id, ip_address = field.decode('utf-8').split(':', 2)
+        data = json.loads(value)
+        return int(video_id), int(user_id), str(ipaddress.ip_address(ip_address)), {
+            'watch_duration': max(int(data['watch_duration']), 0),
+            'completed': bool(data['completed']),
+            'user_agent': str(data.get('user_agent', '')),
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f'malformed watch progress entry {field!r}: {e}') from e
+
+
+def _upsert_watch_progress(views):
+    """
+    UPSERT VideoView rows. completed is never reset: a view that was completed
+    once stays completed when a later (e.g. rewatch) progress report is written.
+    """
+    from .models import VideoView
+
+    VideoView.objects.bulk_create(
+        views,
+        update_conflicts=True,
+        unique_fields=['video', 'user', 'ip_address'],
+        update_fields=['user_agent', 'watch_duration', 'updated_at'],
+    )
+    condition = Q()
+    for view in views:
+        if view.completed:
+            condition |= Q(video_id=view.video_id, user_id=view.user_id, ip_address=view.ip_address)
+    if condition:
+        VideoView.objects.filter(condition, completed=False).update(completed=True)
+
+
+def flush_watch_progress(schema_name=None):
+    """
+    バッファした視聴進捗を VideoView に一括 UPSERT
+    (video, user, ip_address) の一意制約に対して bulk_create(update_conflicts=True) を使う。
+    updated_at (auto_now) は反映時刻になる。
+    不正なエントリや書き込めない行は警告を出して捨てる（バッチ全体を戻すと以降の反映がすべて止まるため）。
+    Must be called inside the tenant schema. Returns the number of rows written.
+    """
+    from .models import Video, VideoView
+
+    schema_name = schema_name or connection.schema_name
+    redis = get_redis_connection('default')
+    pending_key = _pending_progress_key(schema_name)
+    flushing_key = f'watch:flushing:{schema_name}:{uuid.uuid4().hex}'
+
+    try:
+        redis.rename(pending_key, flushing_key)
+    except ResponseError:
+        return 0  # nothing pending (no such key)
+
+    entries = redis.hgetall(flushing_key)
+    progress = []
+    for field, value in entries.items():
+        try:
+            progress.append((field, value) + _parse_progress_entry(field, value))
+        except ValueError as e:
+            logger.warning(f"Dropping watch progress ({schema_name}): {e}")
+
+    # 削除済みの動画は除外し、完了判定に動画の長さを使う
+    durations = dict(
+        Video.objects.filter(id__in={p[2] for p in progress}).values_list('id', 'duration')
+    )
+    complete_ratio = get_video_setting('WATCH_COMPLETE_RATIO', 0.9)
+
+    rows = []
+    for field, value, video_id, user_id, ip_address, data in progress:
+        if video_id not in durations:
+            continue
+        duration = durations[video_id]
+        completed = data['completed'] or (duration > 0 and data['watch_duration'] >= duration * complete_ratio)
+        rows.append((field, value, VideoView(
+            video_id=video_id,
+            user_id=user_id,
+            ip_address=ip_address,
+            user_agent=data['user_agent'],
+            watch_duration=data['watch_duration'],
+            completed=completed,
+        )))
+
+    batch_size = get_video_setting('WATCH_PROGRESS_BATCH_SIZE', 500)
+    written = []
+    start = 0
+    try:
+        for start in range(0, len(rows), batch_size):
+            batch = [view for _, _, view in rows[start:start + batch_size]]
+            try:
+                with transaction.atomic():
+                    _upsert_watch_progress(batch)
+                written.extend(batch)
+            except (IntegrityError, DataError):
+                # 1行ずつ書き直し、書き込めない行（退会したユーザーなど）だけを捨てる
+                for view in batch:
+                    try:
+                        with transaction.atomic():
+                            _upsert_watch_progress([view])
+                        written.append(view)
+                    except (IntegrityError, DataError) as e:
+                        logger.warning(
+                            f"Dropping watch progress of video {view.video_id} "
+                            f"for user {view.user_id} ({schema_name}): {e}"
+                        )
+    except Exception:
+        # DB に接続できない場合などは未反映分を戻す（新しい進捗は上書きしないよう HSETNX）
+        pipe = redis.pipeline(transaction=False)
+        for field, value, _ in rows[start:]:
+            pipe.hsetnx(pending_key, field, value)
+        pipe.execute()
+        raise
+    finally:
+        redis.delete(flushing_key)
+
+    from .recommendations import mark_recommendations_stale
+    mark_recommendations_stale({view.user_id for view in written}, schema_name)
+
+    return len(written)
+
+
+def toggle_video_like(video, user, is_like):
+    """
+    高評価/低評価の切り替え（同じ操作なら取り消し）
+    VideoLike の変更とカウンタの F() 更新を1トランザクションで行い、同時リクエストでも加算が失われない。
+
+    Returns (status, video_like, like_count, dislike_count) where status is
+    'added', 'changed' or 'removed'. video_like is set only for a new reaction.
+    """
+    from .models import Video, VideoLike
+
+    like_delta = dislike_delta = 0
+    created_like = None
+
+    with transaction.atomic():
+        existing = VideoLike.objects.select_for_update().filter(video=video, user=user).first()
+        if existing is None:
+            status = 'added'
+            try:
+                with transaction.atomic():
+                    created_like = VideoLike.objects.create(video=video, user=user, is_like=is_like)
+            except IntegrityError:
+                pass  # 同時リクエストで既に追加済み（カウントは先のリクエストで加算される）
+            else:
+                if is_like:
+                    like_delta = 1
+                else:
+                    dislike_delta = 1
+        elif existing.is_like == is_like:
+            existing.delete()
+            status = 'removed'
+            if is_like:
+                like_delta = -1
+            else:
+                dislike_delta = -1
+        else:
+            existing.is_like = is_like
+            existing.save(update_fields=['is_like'])
+            status = 'changed'
+            like_delta, dislike_delta = (1, -1) if is_like else (-1, 1)
+
+        counters = Video.objects.filter(pk=video.pk)
+        if like_delta or dislike_delta:
+            counters.update(
+                like_count=Greatest(F('like_count') + like_delta, 0),
+                dislike_count=Greatest(F('dislike_count') + dislike_delta, 0),
+            )
+        like_count, dislike_count = counters.values_list('like_count', 'dislike_count').get()
+
+    return status, created_like, like_count, dislike_count
+
+
+def reconcile_like_counts():
+    """
+    Rebuild like_count/dislike_count of every video from VideoLike in one UPDATE.
+    Returns the number of videos updated.
+    """
+    from .models import Video, VideoLike
+
+    def count_of(is_like):
+        return Coalesce(
+            Subquery(
+                VideoLike.objects.filter(video=OuterRef('pk'), is_like=is_like)
+                .order_by()
+                .values('video')
+                .annotate(total=Count('id'))
+                .values('total')
+            ),
+            0,
+        )
+
+    return Video.objects.update(like_count=count_of(True), dislike_count=count_of(False))
+
+
+COMMENT_PAGE_SIZE = 20
+
+
+def get_comment_page(video, cursor=None, size=COMMENT_PAGE_SIZE):
+    """
+    トップレベルコメントのキーセットページネーション（新しい順）
+    ピン留めコメントは1ページ目の先頭にのみ表示する。
+    Returns (comments, next_cursor).
+    """
+    from .models import Comment
+
+    comments = Comment.objects.filter(
+        video=video,
+        parent=None,
+        is_hidden=False
+    ).select_related('user')
+
+    page = KeysetPaginator(comments.filter(is_pinned=False), ('-created_at', '-id'), size).get_page(cursor)
+    pinned = [] if page.has_previous else list(comments.filter(is_pinned=True).order_by('-created_at', '-id'))
+    return pinned + page.object_list, page.next_cursor
+
+
+def get_reply_page(parent, cursor=None, size=COMMENT_PAGE_SIZE):
+    """
+    返信のキーセットページネーション（古い順）
+    Returns (replies, next_cursor).
+    """
+    from .models import Comment
+
+    replies = Comment.objects.filter(parent=parent, is_hidden=False).select_related('user')
+    page = KeysetPaginator(replies, ('created_at', 'id'), size).get_page(cursor)
+    return page.object_list, page.next_cursor
+
+
+def add_video_comment(video, user, content, parent=None):
+    """
+    Create a comment and bump comment_count (and the parent's reply_count) with F().
+    Returns (comment, comment_count).
+    """
+    from .models import Comment, Video
+
+    with transaction.atomic():
+        comment = Comment.objects.create(video=video, user=user, parent=parent, content=content)
+        counters = Video.objects.filter(pk=video.pk)
+        counters.update(comment_count=F('comment_count') + 1)
+        if parent:
+            Comment.objects.filter(pk=parent.pk).update(reply_count=F('reply_count') + 1)
+        comment_count = counters.values_list('comment_count', flat=True).get()
+    return comment, comment_count
+
+
+def delete_video_comment(comment):
+    """
+    コメント（と返信スレッド全体）を削除し、表示中の件数だけカウンタを減らす
+    Returns the video's new comment_count.
+    """
+    from .models import Comment, Video
+
+    with transaction.atomic():
+        # CASCADE で削除される返信も含めて数える（削除は稀なので階層ごとに1クエリ）
+        thread_ids = [comment.id]
+        frontier = [comment.id]
+        while frontier:
+            frontier = list(Comment.objects.filter(parent_id__in=frontier).values_list('id', flat=True))
+            thread_ids.extend(frontier)
+        removed = Comment.objects.filter(id__in=thread_ids, is_hidden=False).count()
+
+        comment.delete()
+
+        counters = Video.objects.filter(pk=comment.video_id)
+        counters.update(comment_count=Greatest(F('comment_count') - removed, 0))
+        if comment.parent_id and not comment.is_hidden:
+            Comment.objects.filter(pk=comment.parent_id).update(reply_count=Greatest(F('reply_count') - 1, 0))
+        return counters.values_list('comment_count', flat=True).get()
+
+
+def reconcile_comment_counts():
+    """
+    Rebuild Video.comment_count and Comment.reply_count from the visible comments.
+    Returns the number of videos updated.
+    """
+    from .models import Comment, Video
+
+    def visible_count(**filters):
+        return Coalesce(
+            Subquery(
+                Comment.objects.filter(is_hidden=False, **filters)
+                .order_by()
+                .values(*filters)
+                .annotate(total=Count('id'))
+                .values('total')
+            ),
+            0,
+        )
+
+    with transaction.atomic():
+        Comment.objects.update(reply_count=visible_count(parent=OuterRef('pk')))
+        return Video.objects.update(comment_count=visible_count(video=OuterRef('pk')))
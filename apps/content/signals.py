@@ -0,0 +1,209 @@
+"""
+Signal handlers for content models.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.accounts.models import Follow
+from apps.core.fragment_cache import invalidate_fragments
+
+from .facets import (
+    PUBLISHED_PRIVACY, apply_facet_deltas, invalidate_search_facets, is_published, video_facet_deltas,
+)
+from .models import Playlist, PlaylistItem, SearchFacet, Video, VideoCategory, VideoFavorite, VideoLike, VideoTag
+from .recommendations import mark_recommendations_stale
+from .search import update_search_vector
+from .viewer_state import invalidate_viewer_state
+
+# Fields that feed the search index
+SEARCH_FIELDS = {'title', 'description'}
+
+# Fields that decide which facets a video is counted in
+FACET_FIELDS = {'status', 'privacy', 'category'}
+
+
+def _schedule_reindex(videos):
+    """Update search vectors after commit (tags are usually set after the first save)."""
+    def reindex():
+        for video in videos:
+            update_search_vector(video)
+
+    transaction.on_commit(reindex)
+
+
+@receiver(post_save, sender=Video)
+def reindex_video(sender, instance, created, update_fields=None, **kwargs):
+    """Keep Video.search_vector current when the title or description may have changed."""
+    if update_fields and not SEARCH_FIELDS & set(update_fields):
+        return
+    _schedule_reindex([instance])
+
+
+@receiver(m2m_changed, sender=Video.tags.through)
+def reindex_video_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex videos whose tags were added or removed."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        _schedule_reindex([instance])
+    elif pk_set:
+        _schedule_reindex(list(Video.objects.filter(pk__in=pk_set).select_related('uploader')))
+
+
+@receiver(post_save, sender=VideoTag)
+def reindex_renamed_tag(sender, instance, created, **kwargs):
+    """Reindex videos carrying a tag whose name changed."""
+    if not created:
+        _schedule_reindex(list(instance.videos.select_related('uploader')))
+        invalidate_search_facets()
+
+
+# --- Search facets ---
+
+@receiver(pre_save, sender=Video)
+def remember_facet_state(sender, instance, update_fields=None, **kwargs):
+    """Load the stored publish state/category so post_save can compute facet deltas."""
+    if update_fields and not FACET_FIELDS & set(update_fields):
+        return
+    instance._facet_previous = None
+    if instance.pk:
+        instance._facet_previous = sender.objects.filter(pk=instance.pk).values_list(
+            'status', 'privacy', 'category_id'
+        ).first()
+
+
+@receiver(post_save, sender=Video)
+def update_video_facets(sender, instance, update_fields=None, **kwargs):
+    """Adjust tag/category counts when a video is published, hidden or recategorized."""
+    if not hasattr(instance, '_facet_previous'):
+        return
+    previous = instance.__dict__.pop('_facet_previous')
+    was_published = bool(previous) and is_published(previous[0], previous[1])
+    now_published = is_published(instance.status, instance.privacy)
+    if not was_published and not now_published:
+        return
+
+    deltas = Counter()
+    if was_published != now_published:
+        tag_ids = list(instance.tags.values_list('id', flat=True))
+        if was_published:
+            deltas.update(video_facet_deltas(previous[2], tag_ids, -1))
+        else:
+            deltas.update(video_facet_deltas(instance.category_id, tag_ids, 1))
+    elif previous[2] != instance.category_id:
+        deltas.update(video_facet_deltas(previous[2], [], -1))
+        deltas.update(video_facet_deltas(instance.category_id, [], 1))
+    apply_facet_deltas(deltas)
+
+
+@receiver(m2m_changed, sender=Video.tags.through)
+def update_tag_facets(sender, instance, action, reverse, pk_set, **kwargs):
+    """Adjust tag counts when tags are added to or removed from published videos."""
+    if action == 'pre_clear':
+        # clear() は post_clear で pk_set を渡さないため、事前に対象を記録する
+        if reverse:
+            instance._facet_cleared = Counter({
+                ('tag', instance.pk): -instance.videos.filter(
+                    status='ready', privacy__in=PUBLISHED_PRIVACY
+                ).count()
+            })
+        elif is_published(instance.status, instance.privacy):
+            instance._facet_cleared = video_facet_deltas(None, instance.tags.values_list('id', flat=True), -1)
+        return
+
+    if action == 'post_clear':
+        apply_facet_deltas(instance.__dict__.pop('_facet_cleared', {}))
+        return
+
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        published = Video.objects.filter(
+            pk__in=pk_set, status='ready', privacy__in=PUBLISHED_PRIVACY
+        ).count()
+        apply_facet_deltas({('tag', instance.pk): sign * published})
+    elif is_published(instance.status, instance.privacy):
+        apply_facet_deltas(video_facet_deltas(None, pk_set, sign))
+
+
+@receiver(pre_delete, sender=Video)
+def remove_video_facets(sender, instance, **kwargs):
+    """Uncount a published video before it (and its tag links) are deleted."""
+    if is_published(instance.status, instance.privacy):
+        tag_ids = list(instance.tags.values_list('id', flat=True))
+        apply_facet_deltas(video_facet_deltas(instance.category_id, tag_ids, -1))
+
+
+@receiver(post_delete, sender=VideoTag)
+def delete_tag_facet(sender, instance, **kwargs):
+    SearchFacet.objects.filter(facet_type='tag', object_id=instance.pk).delete()
+    invalidate_search_facets()
+
+
+@receiver(post_delete, sender=VideoCategory)
+def delete_category_facet(sender, instance, **kwargs):
+    SearchFacet.objects.filter(facet_type='category', object_id=instance.pk).delete()
+    invalidate_search_facets()
+
+
+@receiver(post_save, sender=VideoCategory)
+def invalidate_category_facets(sender, instance, **kwargs):
+    """Category names/active flags are part of the cached facets."""
+    invalidate_search_facets()
+
+
+# --- Recommendations ---
+
+@receiver(post_save, sender=VideoLike)
+@receiver(post_delete, sender=VideoLike)
+@receiver(post_save, sender=VideoFavorite)
+@receiver(post_delete, sender=VideoFavorite)
+def queue_recommendation_update(sender, instance, **kwargs):
+    """Rebuild the user's recommendations on the next build_recommendations run."""
+    mark_recommendations_stale([instance.user_id])
+
+
+# --- Cached page fragments ---
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def invalidate_video_fragments(sender, instance, update_fields=None, **kwargs):
+    """Video lists on the home/trending pages are cached per tenant."""
+    if update_fields and set(update_fields) <= {'view_count', 'like_count', 'dislike_count', 'comment_count'}:
+        return  # counters only; the short fragment TTL picks these up
+    invalidate_fragments('home_trending', 'home_recent', 'trending')
+
+
+@receiver(post_delete, sender=PlaylistItem)
+def decrement_playlist_item_count(sender, instance, **kwargs):
+    """Keep Playlist.item_count current when items are removed (including video deletion)."""
+    Playlist.objects.filter(pk=instance.playlist_id).update(item_count=Greatest(F('item_count') - 1, 0))
+
+
+# --- Cached viewer state of the watch page ---
+
+@receiver(post_save, sender=VideoLike)
+@receiver(post_delete, sender=VideoLike)
+@receiver(post_save, sender=VideoFavorite)
+@receiver(post_delete, sender=VideoFavorite)
+def invalidate_reaction_viewer_state(sender, instance, **kwargs):
+    invalidate_viewer_state(instance.user_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_viewer_state(sender, instance, **kwargs):
+    invalidate_viewer_state(instance.follower_id)
+
+
+@receiver(post_save, sender=Playlist)
+@receiver(post_delete, sender=Playlist)
+def invalidate_playlist_viewer_state(sender, instance, **kwargs):
+    invalidate_viewer_state(instance.owner_id)
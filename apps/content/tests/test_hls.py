@@ -0,0 +1,140 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from apps.content import hls
+
+
+class SelectLadderTestCase(SimpleTestCase):
+    """画質ラダーの選択テスト"""
+
+    def test_skips_renditions_taller_than_source(self):
+        names = [rendition['name'] for rendition in hls.select_ladder(hls.DEFAULT_LADDER, 720)]
+        self.assertEqual(names, ['720p', '480p', '360p'])
+
+    def test_keeps_smallest_for_tiny_source(self):
+        names = [rendition['name'] for rendition in hls.select_ladder(hls.DEFAULT_LADDER, 240)]
+        self.assertEqual(names, ['360p'])
+
+
+class PackageTransportStreamTestCase(SimpleTestCase):
+    """ffmpeg なしでの MPEG-TS パッケージとプレイリスト生成のテスト"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.source = os.path.join(self.tempdir.name, 'source.ts')
+        with open(self.source, 'wb') as f:
+            f.write((b'\x47' + b'\x00' * (hls.TS_PACKET_SIZE - 1)) * 1000)
+
+    @mock.patch('apps.content.hls.shutil.which', return_value=None)
+    def test_segments_at_packet_boundaries(self, which):
+        progress = []
+        hls.package_hls(self.source, self.tempdir.name, 20, progress.append)
+
+        with open(os.path.join(self.tempdir.name, 'hls', 'index.json')) as f:
+            index = json.load(f)
+        segments = index['renditions'][0]['segments']
+        # 20秒・6秒セグメント → 300 パケットずつ4本
+        self.assertEqual(len(segments), 4)
+        for name, _ in segments:
+            size = os.path.getsize(os.path.join(self.tempdir.name, 'hls', 'source', name))
+            self.assertEqual(size % hls.TS_PACKET_SIZE, 0)
+        self.assertAlmostEqual(sum(length for _, length in segments), 20)
+        self.assertEqual(progress[-1], 100)
+
+    @mock.patch('apps.content.hls.shutil.which', return_value=None)
+    def test_playlists(self, which):
+        hls.package_hls(self.source, self.tempdir.name, 20, lambda percent: None)
+        with open(os.path.join(self.tempdir.name, 'hls', 'index.json')) as f:
+            index = json.load(f)
+
+        master = hls.render_master_playlist(index)
+        self.assertIn('#EXT-X-STREAM-INF:BANDWIDTH=', master)
+        self.assertIn('source.m3u8', master)
+        # キーフレームの目印がないためバイト数で分割 → 単独で再生開始できるとは宣言しない
+        self.assertFalse(index['renditions'][0]['independent'])
+        self.assertNotIn('#EXT-X-INDEPENDENT-SEGMENTS', master)
+
+        playlist = hls.render_media_playlist(index, 'source')
+        self.assertIn('#EXT-X-TARGETDURATION:6', playlist)
+        self.assertIn('source/00000.ts', playlist)
+        self.assertTrue(playlist.endswith('#EXT-X-ENDLIST\n'))
+        self.assertIsNone(hls.render_media_playlist(index, '720p'))
+
+
+def ts_packet(pid, payload=b'', pcr=None, random_access=False, unit_start=False):
+    """One 188-byte MPEG-TS packet (adaptation field when a PCR or random access flag is set)."""
+    header = bytes([0x47, (0x40 if unit_start else 0) | (pid >> 8), pid & 0xFF])
+    adaptation = b''
+    if pcr is not None or random_access:
+        flags = (0x40 if random_access else 0) | (0x10 if pcr is not None else 0)
+        field = bytes([flags])
+        if pcr is not None:
+            field += (int(pcr * hls.PCR_CLOCK) << 15).to_bytes(6, 'big')
+        adaptation = bytes([len(field)]) + field
+    control = (0x20 if adaptation else 0) | 0x10
+    body = adaptation + payload
+    return header + bytes([control]) + body + b'\xff' * (hls.TS_PACKET_SIZE - 4 - len(body))
+
+
+class SegmentKeyframesTestCase(SimpleTestCase):
+    """キーフレーム（random_access_indicator）での分割テスト"""
+
+    PMT_PID = 0x1000
+    VIDEO_PID = 0x100
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.source = os.path.join(self.tempdir.name, 'source.ts')
+        # PAT: program 1 -> PMT PID 0x1000（CRC は検証しないため 0）
+        pat_section = bytes([0x00, 0xB0, 13, 0x00, 0x01, 0xC1, 0x00, 0x00, 0x00, 0x01, 0xF0, 0x00]) + b'\x00' * 4
+        packets = [ts_packet(hls.PAT_PID, b'\x00' + pat_section, unit_start=True), ts_packet(self.PMT_PID)]
+        # 0.5秒ごとのフレーム、2秒ごとのキーフレームで 20 秒
+        for frame in range(40):
+            seconds = frame / 2
+            packets.append(ts_packet(self.VIDEO_PID, pcr=seconds, random_access=frame % 4 == 0))
+            packets.append(ts_packet(self.VIDEO_PID))
+        with open(self.source, 'wb') as f:
+            f.write(b''.join(packets))
+
+    def test_cuts_at_keyframes_with_pcr_durations(self):
+        output_dir = os.path.join(self.tempdir.name, 'out')
+        segments, independent = hls.segment_transport_stream(self.source, output_dir, 6, 0, lambda fraction: None)
+
+        self.assertTrue(independent)
+        self.assertEqual([length for _, length in segments], [6, 6, 6, 1.5])
+        for name, _ in segments[1:]:
+            with open(os.path.join(output_dir, name), 'rb') as f:
+                data = f.read()
+            # 先頭に PAT / PMT を入れ、続くパケットはキーフレーム
+            packets = [hls._packet_info(data[i:i + hls.TS_PACKET_SIZE]) for i in range(0, len(data), hls.TS_PACKET_SIZE)]
+            self.assertEqual([pid for pid, _, _ in packets[:3]], [hls.PAT_PID, self.PMT_PID, self.VIDEO_PID])
+            self.assertTrue(packets[2][1])
+
+    @mock.patch('apps.content.hls.shutil.which', return_value=None)
+    def test_master_playlist_declares_independent_segments(self, which):
+        hls.package_hls(self.source, self.tempdir.name, 0, lambda percent: None)
+        with open(os.path.join(self.tempdir.name, 'hls', 'index.json')) as f:
+            index = json.load(f)
+        self.assertIn('#EXT-X-INDEPENDENT-SEGMENTS', hls.render_master_playlist(index))
+
+
+class SegmentWithFfmpegTimeoutTestCase(SimpleTestCase):
+    """応答しない ffmpeg のタイムアウトテスト"""
+
+    @mock.patch('apps.content.hls.COMMAND_TIMEOUT', 0.5)
+    def test_kills_process_that_keeps_stdout_open(self):
+        popen = subprocess.Popen
+
+        def hung_ffmpeg(command, **kwargs):
+            return popen([sys.executable, '-c', 'import time; time.sleep(30)'], **kwargs)
+
+        with tempfile.TemporaryDirectory() as output_dir, \
+                mock.patch('apps.content.hls.subprocess.Popen', side_effect=hung_ffmpeg):
+            with self.assertRaises(subprocess.TimeoutExpired):
+                hls.segment_with_ffmpeg('source.mp4', output_dir, hls.DEFAULT_LADDER[0], 6, 10, lambda fraction: None)
@@ -0,0 +1,22 @@
+from django.test import SimpleTestCase
+from apps.content.playlists import _rank_between
+
+
+class RankBetweenTestCase(SimpleTestCase):
+    """疎なプレイリストランクの計算テスト"""
+
+    def test_midpoint(self):
+        """前後のアイテムの中間に配置"""
+        self.assertEqual(_rank_between(1024, 2048, 1024), 1536)
+
+    def test_top(self):
+        """先頭への移動は次のアイテムより1間隔前"""
+        self.assertEqual(_rank_between(None, 1024, 1024), 0)
+
+    def test_tail(self):
+        """末尾への移動は直前のアイテムより1間隔後"""
+        self.assertEqual(_rank_between(2048, None, 1024), 3072)
+
+    def test_exhausted_gap(self):
+        """間隔を使い切った場合は None（再採番が必要）"""
+        self.assertIsNone(_rank_between(5, 6, 1024))
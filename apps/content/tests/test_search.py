@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase
+from apps.content.search import build_tsquery, tokenize
+
+
+class TokenizeTestCase(SimpleTestCase):
+    """検索用トークナイザのテスト"""
+
+    def test_cjk_bigrams(self):
+        """日本語は2文字ずつのバイグラムに分割"""
+        self.assertEqual(tokenize('ライブ配信'), 'ライ イブ ブ配 配信')
+
+    def test_single_cjk_character(self):
+        """1文字の日本語はそのまま"""
+        self.assertEqual(tokenize('猫'), '猫')
+
+    def test_mixed_text(self):
+        """英数字は単語単位で小文字化し、日本語と分割"""
+        self.assertEqual(tokenize('Django入門 第2回'), 'django 入門 第 2 回')
+
+    def test_fullwidth_normalized(self):
+        """全角英数字は半角に正規化"""
+        self.assertEqual(tokenize('ＡＢＣ１２３'), 'abc123')
+
+    def test_empty(self):
+        self.assertEqual(tokenize(''), '')
+        self.assertEqual(tokenize(None), '')
+
+
+class SearchQueryTestCase(SimpleTestCase):
+    """検索クエリ（tsquery）のテスト"""
+
+    def matches(self, query, title):
+        """Evaluate an AND-only tsquery against the indexed tokens of a title, as PostgreSQL would."""
+        lexemes = set(tokenize(title, index=True).split())
+        for term in build_tsquery(query).split(' & '):
+            if term.endswith(':*'):
+                if not any(lexeme.startswith(term[:-2]) for lexeme in lexemes):
+                    return False
+            elif term not in lexemes:
+                return False
+        return True
+
+    def test_single_cjk_character_is_prefix_query(self):
+        """1文字の CJK 検索語は前方一致"""
+        self.assertEqual(build_tsquery('猫'), '猫:*')
+        self.assertEqual(build_tsquery('猫 django'), '猫:* & django')
+
+    def test_single_cjk_character_matches_title(self):
+        """1文字の検索でその文字を含むタイトルが見つかる（先頭・途中・末尾）"""
+        for title in ['猫の動画', 'かわいい子猫たち', '今日の猫', '猫']:
+            with self.subTest(title=title):
+                self.assertTrue(self.matches('猫', title))
+        self.assertFalse(self.matches('猫', '犬の動画'))
+
+    def test_multi_character_query_uses_bigrams(self):
+        """2文字以上の検索はバイグラムの完全一致"""
+        self.assertEqual(build_tsquery('配信'), '配信')
+        self.assertTrue(self.matches('ライブ配信', '今夜のライブ配信まとめ'))
+        self.assertFalse(self.matches('ライブ配信', 'ライブ映像'))
+
+    def test_index_adds_trailing_unigram(self):
+        """索引には連続部分の末尾1文字も入る"""
+        self.assertEqual(tokenize('ライブ配信', index=True), 'ライ イブ ブ配 配信 信')
+
+    def test_empty_query(self):
+        self.assertEqual(build_tsquery('!?'), '')
@@ -0,0 +1,88 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from apps.content.services import _parse_progress_entry, get_client_ip, get_viewer_key
+
+
+class _Session:
+    def __init__(self, session_key=None):
+        self.session_key = session_key
+
+
+class ViewerIdentityTestCase(SimpleTestCase):
+    """視聴者識別ヘルパーのテスト"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def make_request(self, session_key=None, **extra):
+        request = self.factory.get('/content/watch/1/', **extra)
+        request.user = AnonymousUser()
+        request.session = _Session(session_key)
+        return request
+
+    def test_client_ip_from_remote_addr(self):
+        """REMOTE_ADDR からIPを取得"""
+        request = self.make_request(REMOTE_ADDR='192.0.2.10')
+        self.assertEqual(get_client_ip(request), '192.0.2.10')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_client_ip_from_forwarded_for(self):
+        """信頼できるプロキシ経由なら X-Forwarded-For のクライアントIPを優先"""
+        request = self.make_request(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.7, 10.0.0.2')
+        self.assertEqual(get_client_ip(request), '198.51.100.7')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_client_ip_ignores_spoofed_forwarded_for(self):
+        """クライアントが付けた X-Forwarded-For の値はプロキシの手前で止める"""
+        request = self.make_request(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.9, 198.51.100.7')
+        self.assertEqual(get_client_ip(request), '198.51.100.7')
+
+    @override_settings(TRUSTED_PROXIES=[])
+    def test_client_ip_ignores_forwarded_for_from_untrusted_peer(self):
+        """信頼できないアクセス元の X-Forwarded-For は無視"""
+        request = self.make_request(REMOTE_ADDR='192.0.2.10', HTTP_X_FORWARDED_FOR='198.51.100.7')
+        self.assertEqual(get_client_ip(request), '192.0.2.10')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_client_ip_invalid_forwarded_for_falls_back(self):
+        """X-Forwarded-For の値がIPアドレスでなければ REMOTE_ADDR を使う"""
+        request = self.make_request(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='unknown')
+        self.assertEqual(get_client_ip(request), '10.0.0.1')
+
+    def test_viewer_key_uses_session(self):
+        """セッションがあればセッションキーで識別"""
+        request = self.make_request(session_key='abc123')
+        self.assertEqual(get_viewer_key(request), 'sabc123')
+
+    def test_viewer_key_anonymous_is_stable(self):
+        """セッションがない場合はIPとUser-Agentで識別"""
+        first = get_viewer_key(self.make_request(REMOTE_ADDR='192.0.2.10', HTTP_USER_AGENT='UA'))
+        second = get_viewer_key(self.make_request(REMOTE_ADDR='192.0.2.10', HTTP_USER_AGENT='UA'))
+        other = get_viewer_key(self.make_request(REMOTE_ADDR='192.0.2.11', HTTP_USER_AGENT='UA'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+
+class WatchProgressEntryTestCase(SimpleTestCase):
+    """バッファした視聴進捗エントリの解析のテスト"""
+
+    def test_parse_entry(self):
+        """IPv6 アドレスを含むフィールドも解析できる"""
+        entry = _parse_progress_entry(
+            b'3:7:2001:db8::1', b'{"watch_duration": 42, "completed": true, "user_agent": "UA"}',
+        )
+        self.assertEqual(entry, (3, 7, '2001:db8::1', {'watch_duration': 42, 'completed': True, 'user_agent': 'UA'}))
+
+    def test_malformed_entries_raise_value_error(self):
+        """不正なエントリは ValueError（flush 時に捨てられる）"""
+        value = b'{"watch_duration": 1, "completed": false}'
+        for field, data in [
+            (b'3:None:192.0.2.1', value),
+            (b'3:7:unknown', value),
+            (b'3:7', value),
+            (b'3:7:192.0.2.1', b'not json'),
+            (b'3:7:192.0.2.1', b'{"completed": false}'),
+        ]:
+            with self.subTest(field=field, data=data):
+                with self.assertRaises(ValueError):
+                    _parse_progress_entry(field, data)
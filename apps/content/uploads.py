@@ -0,0 +1,188 @@
+"""
+Resumable chunked uploads (tus-style offsets).
+クライアントは Upload-Offset ヘッダ付きの PATCH でファイルを分割送信し、
+各チャンクはリクエストボディから MEDIA_ROOT 上の部分ファイルへ直接書き込む（メモリ使用量は一定）。
+接続が切れた場合は HEAD で受信済みオフセットを取得して続きから再送できる。
+チャンクごとに Upload-Checksum（sha256）を検証し、不一致なら書き込み前の長さに戻す。
+"""
+
+import base64
+import hashlib
+import os
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .processing import enqueue_video_processing, video_media_dir
+from .services import get_video_setting
+
+UPLOAD_DIR = 'uploads'
+READ_SIZE = 64 * 1024  # bytes read from the request per iteration
+CHECKSUM_ALGORITHMS = {'sha256': hashlib.sha256, 'sha1': hashlib.sha1, 'md5': hashlib.md5}
+
+
+class UploadError(Exception):
+    """Upload request that cannot be applied; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _absolute(path):
+    return os.path.join(settings.MEDIA_ROOT, path)
+
+
+def validate_upload(filename, size):
+    """Check the declared file name and size against VIDEO_SETTINGS. Returns the extension."""
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    formats = get_video_setting('SUPPORTED_FORMATS', ['mp4'])
+    if extension not in formats:
+        raise UploadError(f'対応していない形式です (対応形式: {", ".join(formats)})')
+    max_size = get_video_setting('MAX_FILE_SIZE', 500 * 1024 * 1024)
+    if size <= 0:
+        raise UploadError('ファイルサイズが不正です')
+    if size > max_size:
+        raise UploadError(f'ファイルサイズが大きすぎます (上限: {max_size // (1024 * 1024)}MB)', status=413)
+    return extension
+
+
+def create_upload(video, user, filename, size):
+    """Start an upload session for a video entry and reserve its partial file."""
+    from .models import VideoUpload
+
+    validate_upload(filename, size)
+    upload = VideoUpload(video=video, user=user, filename=os.path.basename(filename), size=size)
+    upload.path = f'{UPLOAD_DIR}/{connection.schema_name}/{upload.id}.part'
+    os.makedirs(os.path.dirname(_absolute(upload.path)), exist_ok=True)
+    open(_absolute(upload.path), 'wb').close()
+    upload.save()
+    return upload
+
+
+def parse_checksum(header):
+    """Parse an Upload-Checksum header ("<algorithm> <base64 digest>"), or None when absent."""
+    if not header:
+        return None
+    try:
+        algorithm, digest = header.split(' ', 1)
+        return algorithm.lower(), base64.b64decode(digest.strip(), validate=True)
+    except ValueError:
+        raise UploadError('Upload-Checksum ヘッダが不正です')
+
+
+def write_chunk(upload_id, offset, stream, length, checksum=None):
+    """
+    受信済みオフセットの位置からチャンクを書き込み、新しいオフセットを返す
+    同じアップロードへの同時 PATCH は行ロックで弾き（409）、オフセット不一致も 409 を返す。
+    """
+    from .models import VideoUpload
+
+    max_chunk = get_video_setting('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+    if length is None or length < 0:
+        raise UploadError('Content-Length が必要です', status=411)
+    if length > max_chunk:
+        raise UploadError(f'チャンクが大きすぎます (上限: {max_chunk} bytes)', status=413)
+
+    digest = None
+    if checksum:
+        algorithm, expected = checksum
+        if algorithm not in CHECKSUM_ALGORITHMS:
+            raise UploadError('対応していないチェックサム形式です')
+        digest = CHECKSUM_ALGORITHMS[algorithm]()
+
+    with transaction.atomic():
+        try:
+            upload = VideoUpload.objects.select_for_update(nowait=True).select_related('video').get(pk=upload_id)
+        except DatabaseError:
+            raise UploadError('同じアップロードへの書き込みが進行中です', status=409)
+        if upload.status != 'uploading':
+            raise UploadError('アップロードは完了しています', status=409)
+        if offset != upload.offset:
+            raise UploadError(f'Upload-Offset が一致しません (受信済み: {upload.offset})', status=409)
+        if offset + length > upload.size:
+            raise UploadError('宣言されたファイルサイズを超えています', status=413)
+
+        path = _absolute(upload.path)
+        received = 0
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            while received < length:
+                data = stream.read(min(READ_SIZE, length - received))
+                if not data:
+                    break  # client disconnected; keep what was written
+                if digest is not None:
+                    digest.update(data)
+                f.write(data)
+                received += len(data)
+
+            if digest is not None and (received != length or digest.digest() != expected):
+                f.truncate(offset)
+                raise UploadError('チェックサムが一致しません', status=460)
+            f.truncate(offset + received)
+
+        upload.offset = offset + received
+        upload.save(update_fields=['offset', 'updated_at'])
+        if upload.offset == upload.size:
+            finalize_upload(upload)
+
+    return upload
+
+
+def finalize_upload(upload):
+    """Move the completed file to the video's source path and hand it off to processing."""
+    video = upload.video
+    extension = os.path.splitext(upload.filename)[1].lower()
+    source_path = f'{video_media_dir(video.id)}/source{extension}'
+    os.makedirs(os.path.dirname(_absolute(source_path)), exist_ok=True)
+    os.replace(_absolute(upload.path), _absolute(source_path))
+
+    upload.path = source_path
+    upload.status = 'complete'
+    upload.save(update_fields=['path', 'status', 'updated_at'])
+
+    video.file_size = upload.size
+    video.status = 'processing'
+    video.processing_progress = 0
+    video.save(update_fields=['file_size', 'status', 'processing_progress', 'updated_at'])
+
+    enqueue_video_processing(video.id, source_path)
+
+
+def abort_upload(upload):
+    """Delete an unfinished upload together with its partial file and video entry."""
+    if upload.status == 'uploading':
+        try:
+            os.remove(_absolute(upload.path))
+        except FileNotFoundError:
+            pass
+        upload.video.delete()  # cascades to the upload
+
+
+def cleanup_expired_uploads():
+    """Abort uploads that have not received data for UPLOAD_EXPIRY_HOURS. Returns the number removed."""
+    from .models import VideoUpload
+
+    cutoff = timezone.now() - timedelta(hours=get_video_setting('UPLOAD_EXPIRY_HOURS', 24))
+    expired = VideoUpload.objects.filter(status='uploading', updated_at__lt=cutoff).select_related('video')
+    removed = 0
+    for upload in expired:
+        abort_upload(upload)
+        removed += 1
+    return removed
+
+
+def delete_video_files(video):
+    """Remove every file stored for a video (partial upload, source and processed outputs)."""
+    from .models import VideoUpload
+
+    upload = VideoUpload.objects.filter(video=video, status='uploading').first()
+    if upload:
+        try:
+            os.remove(_absolute(upload.path))
+        except FileNotFoundError:
+            pass
+    shutil.rmtree(_absolute(video_media_dir(video.id)), ignore_errors=True)
@@ -7,7 +7,10 @@ urlpatterns = [
     path('trending/', views.trending, name='trending'),
     path('subscriptions/', views.subscriptions, name='subscriptions'),
     path('search/', views.search_videos, name='search'),
+    path('api/autocomplete/', views.autocomplete_api, name='autocomplete_api'),
     path('watch/<int:video_id>/', views.watch_video, name='watch'),
+    path('media/<int:video_id>/hls/<str:name>.m3u8', views.hls_playlist, name='hls_playlist'),
+    path('media/<int:video_id>/<path:name>', views.video_media, name='video_media'),
     
     # User library
     path('history/', views.history, name='history'),
@@ -22,9 +25,12 @@ urlpatterns = [
     path('playlists/<int:pk>/add-video/', views.add_video_to_playlist, name='add_video_to_playlist'),
     path('playlists/<int:pk>/add-multiple/', views.add_multiple_videos_to_playlist, name='add_multiple_videos_to_playlist'),
     path('playlists/<int:pk>/remove/<int:item_id>/', views.remove_from_playlist, name='remove_from_playlist'),
+    path('playlists/<int:pk>/reorder/', views.reorder_playlist_item, name='reorder_playlist_item'),
     
     # Video upload and management
     path('upload/', views.upload_video, name='upload_video'),
+    path('api/uploads/', views.create_upload, name='create_upload'),
+    path('api/uploads/<uuid:upload_id>/', views.upload_api, name='upload_api'),
     path('manage/', views.manage_videos, name='manage_videos'),
     path('edit/<int:video_id>/', views.edit_video, name='edit_video'),
     path('delete/<int:video_id>/', views.delete_video, name='delete_video'),
@@ -33,8 +39,11 @@ urlpatterns = [
     # Comments and likes
     path('api/video/<int:video_id>/like/', views.like_video, name='like_video'),
     path('api/video/<int:video_id>/favorite/', views.favorite_video, name='favorite_video'),
+    path('api/video/<int:video_id>/progress/', views.save_watch_progress, name='save_watch_progress'),
     path('api/video/<int:video_id>/comment/', views.add_comment, name='add_comment'),
     path('api/comment/<int:comment_id>/delete/', views.delete_comment, name='delete_comment'),
+    path('api/video/<int:video_id>/comments/', views.video_comments, name='video_comments'),
+    path('api/comment/<int:comment_id>/replies/', views.comment_replies, name='comment_replies'),
     
     # Category Management (Admin only)
     path('admin/categories/', views.manage_categories, name='admin_categories'),
@@ -0,0 +1,107 @@
+"""
+Per-viewer state of the watch page.
+ログインユーザーごとのフラグ（フォロー・評価・お気に入り・プレイリスト登録状況）を
+サブクエリで注釈した1クエリで取得し、ユーザー単位で短時間キャッシュする。
+フォロー・評価・お気に入り・プレイリストの変更時にはシグナルからユーザーのバージョンを更新して破棄する。
+"""
+
+import time
+
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.db.models.functions import JSONObject
+
+from .services import get_video_setting
+
+VERSION_TTL = 24 * 60 * 60  # only needs to outlive the cached states
+
+EMPTY_STATE = {
+    'is_following': False,
+    'like_status': None,
+    'is_favorited': False,
+    'playlists': [],
+}
+
+
+def _version_key(schema_name, user_id):
+    return f'viewer:version:{schema_name}:{user_id}'
+
+
+def _state_key(schema_name, user_id, version, video_id):
+    return f'viewer:{schema_name}:{user_id}:{version}:{video_id}'
+
+
+def load_viewer_state(video, user):
+    """
+    Fetch every per-user flag for a video in one query.
+
+    Returns {'is_following', 'like_status' ('like' / 'dislike' / None),
+    'is_favorited', 'playlists': [{'id', 'title', 'has_video'}]}.
+    """
+    from apps.accounts.models import Follow
+    from .models import Playlist, PlaylistItem, Video, VideoFavorite, VideoLike
+
+    playlists = (
+        Playlist.objects.filter(owner_id=user.id)
+        .order_by()
+        .values('owner_id')
+        .annotate(data=JSONBAgg(
+            JSONObject(
+                id='id',
+                title='title',
+                has_video=Exists(
+                    PlaylistItem.objects.filter(playlist=OuterRef('pk'), video=OuterRef(OuterRef('pk')))
+                ),
+            ),
+            order_by='-updated_at',
+        ))
+        .values('data')
+    )
+
+    row = (
+        Video.objects.filter(pk=video.pk)
+        .annotate(
+            is_following=Exists(Follow.objects.filter(follower_id=user.id, following_id=OuterRef('uploader_id'))),
+            is_like=Subquery(VideoLike.objects.filter(video=OuterRef('pk'), user_id=user.id).values('is_like')[:1]),
+            is_favorited=Exists(VideoFavorite.objects.filter(video=OuterRef('pk'), user_id=user.id)),
+            viewer_playlists=Subquery(playlists),
+        )
+        .values('is_following', 'is_like', 'is_favorited', 'viewer_playlists')
+        .first()
+    )
+    if row is None:
+        return dict(EMPTY_STATE)
+
+    return {
+        'is_following': row['is_following'],
+        'like_status': None if row['is_like'] is None else ('like' if row['is_like'] else 'dislike'),
+        'is_favorited': row['is_favorited'],
+        'playlists': row['viewer_playlists'] or [],
+    }
+
+
+def get_viewer_state(video, user):
+    """Cached load_viewer_state(); anonymous users get the empty state without a query."""
+    if not user.is_authenticated:
+        return dict(EMPTY_STATE)
+
+    schema_name = connection.schema_name
+    version = cache.get_or_set(_version_key(schema_name, user.id), time.time_ns, VERSION_TTL)
+    key = _state_key(schema_name, user.id, version, video.pk)
+    state = cache.get(key)
+    if state is None:
+        state = load_viewer_state(video, user)
+        cache.set(key, state, get_video_setting('VIEWER_STATE_TTL', 60))
+    return state
+
+
+def invalidate_viewer_state(*user_ids, schema_name=None):
+    """Drop every cached viewer state of the given users after the transaction commits."""
+    schema_name = schema_name or connection.schema_name
+
+    def invalidate():
+        cache.set_many({_version_key(schema_name, user_id): time.time_ns() for user_id in user_ids}, VERSION_TTL)
+
+    transaction.on_commit(invalidate)
@@ -1,19 +1,50 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
 from django.core.paginator import Paginator
-from django.db import models
-from django.db.models import Q, Count
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from django.db.models import Q, Count, Sum
+from django.db.models.functions import Coalesce
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_http_methods, require_POST
+from django.urls import reverse
+from django.utils._os import safe_join
 from django.utils.text import slugify
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from django.core.files.storage import default_storage
 import uuid
 import os
-from .models import Video, VideoCategory, VideoTag, Comment, VideoLike, VideoView, VideoFavorite, Playlist, PlaylistItem
+from .models import (
+    Video, VideoCategory, VideoTag, Comment, VideoView, VideoFavorite, Playlist, PlaylistItem, VideoUpload,
+)
+from . import search
+from .facets import get_search_facets
+from .hls import get_playlist
+from .playlists import add_videos_to_playlist, move_playlist_item, with_previews
+from .processing import video_media_dir
+from .related import get_related_videos
+from .services import (
+    add_video_comment, delete_video_comment, get_comment_page, get_pending_views, get_reply_page,
+    get_video_setting, record_video_view, record_watch_progress, toggle_video_like,
+)
+from .uploads import (
+    UploadError, abort_upload, create_upload as start_upload, delete_video_files, parse_checksum,
+    validate_upload, write_chunk,
+)
+from .viewer_state import get_viewer_state, invalidate_viewer_state
 from apps.accounts.permissions import tenant_admin_required
+from apps.analytics.services import with_trending_score
+from apps.core.fragment_cache import fragment
+from apps.core.media import serve_file
+from apps.core.pagination import KeysetPaginator, cached_count
+
+User = get_user_model()
 
 
 def trending(request):
@@ -21,7 +52,7 @@ def trending(request):
     videos = Video.objects.filter(
         status='ready',
         privacy__in=['public', 'unlisted']
-    ).order_by('-view_count')
+    ).select_related('uploader', 'category')
     
     # Filter by category if requested
     category_slug = request.GET.get('category')
@@ -37,36 +68,52 @@ def trending(request):
             # If category doesn't exist, ignore the filter
             pass
     
-    paginator = Paginator(videos, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Ranked by the precomputed trending scores (update_trending); only evaluated
+    # when the cached list fragment has to be re-rendered
+    cursor = request.GET.get('cursor')
+
+    def get_page():
+        ranked, ordering = with_trending_score(videos)
+        return KeysetPaginator(ranked, ordering, 12).get_page(cursor)
+    
+    # ランキング番号の開始位置（前のページまでの件数）
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0) if cursor else 0
+    except ValueError:
+        offset = 0
     
     categories = VideoCategory.objects.filter(is_active=True)
     
     context = {
-        'trending_videos': page_obj,
+        'trending_videos': SimpleLazyObject(get_page),
         'categories': categories,
         'current_category': category_slug,
         'period': request.GET.get('period', 'week'),
+        'cursor': cursor or '',
+        'offset': offset,
+        'fragments': {'trending': fragment('trending')},
     }
     return render(request, 'content/trending.html', context)
 
 
 @login_required
 def subscriptions(request):
-    """User subscriptions page."""
-    # This would be implemented with a proper follow system
+    """Latest videos from the channels the user follows."""
+    from apps.accounts.models import Follow
+    
+    channel_ids = Follow.objects.filter(follower=request.user).values('following_id')
+    subscribed_channels = User.objects.filter(id__in=channel_ids).order_by('username')
+    
     videos = Video.objects.filter(
+        uploader_id__in=channel_ids,
         status='ready',
         privacy__in=['public', 'unlisted']
-    ).order_by('-published_at')
-    
-    paginator = Paginator(videos, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    ).select_related('uploader', 'category')
+    page = KeysetPaginator(videos, ('-published_at', '-id'), 12).get_page(request.GET.get('cursor'))
     
     context = {
-        'videos': page_obj,
+        'subscribed_channels': subscribed_channels,
+        'recent_videos': page,
     }
     return render(request, 'content/subscriptions.html', context)
 
@@ -111,72 +158,58 @@ def watch_video(request, video_id):
         except Playlist.DoesNotExist:
             current_playlist = None
     
-    # Check if current user is following the uploader
-    is_following = False
-    user_like_status = None
-    is_favorited = False
-    if request.user.is_authenticated:
-        from apps.accounts.models import Follow
-        is_following = Follow.objects.filter(
-            follower=request.user,
-            following=video.uploader
-        ).exists()
-        
-        # Check user's like status
-        try:
-            like_obj = VideoLike.objects.get(video=video, user=request.user)
-            user_like_status = 'like' if like_obj.is_like else 'dislike'
-        except VideoLike.DoesNotExist:
-            user_like_status = None
-            
-        # Check if video is favorited by user
-        is_favorited = VideoFavorite.objects.filter(
-            video=video, 
-            user=request.user
-        ).exists()
-    
-    # Get related videos
-    related_videos = Video.objects.filter(
-        status='ready',
-        privacy__in=['public', 'unlisted']
-    ).exclude(id=video_id)
-    
-    if video.category:
-        related_videos = related_videos.filter(category=video.category)
-    
-    related_videos = related_videos.order_by('-view_count')[:10]
+    # Follow / like / favorite / playlist flags of the viewer in one cached query
+    viewer_state = get_viewer_state(video, request.user)
     
-    # Get comments
-    comments = Comment.objects.filter(
-        video=video,
-        parent=None,
-        is_hidden=False
-    ).prefetch_related('replies', 'user').order_by('-is_pinned', '-created_at')
+    # Get related videos (precomputed by build_related_videos)
+    related_videos = get_related_videos(video, limit=10)
     
-    # Increment view count (simplified)
-    video.view_count += 1
-    video.save(update_fields=['view_count'])
+    # Get the first page of top-level comments (replies are loaded per thread)
+    comments, comments_cursor = get_comment_page(video)
     
-    # Get user's playlists for "Add to playlist" feature
-    user_playlists = []
-    if request.user.is_authenticated:
-        user_playlists = Playlist.objects.filter(owner=request.user)
+    # Count the view in Redis (de-duplicated, flushed to the DB in batches)
+    record_video_view(request, video.id)
+    video.view_count += get_pending_views(video.id)
     
     context = {
         'video': video,
         'related_videos': related_videos,
-        'is_following': is_following,
-        'user_like_status': user_like_status,
-        'is_favorited': is_favorited,
+        'is_following': viewer_state['is_following'],
+        'user_like_status': viewer_state['like_status'],
+        'is_favorited': viewer_state['is_favorited'],
         'comments': comments,
-        'user_playlists': user_playlists,
+        'comments_cursor': comments_cursor,
+        'user_playlists': viewer_state['playlists'],
         'current_playlist': current_playlist,
         'playlist_videos': playlist_videos,
         'current_index': current_index,
+        'progress_interval': get_video_setting('WATCH_PROGRESS_INTERVAL', 15),
     }
     return render(request, 'content/watch.html', context)
 
 
+@login_required
+@require_POST
+def save_watch_progress(request, video_id):
+    """
+    Player progress beacon (navigator.sendBeacon).
+    進捗は Redis にバッファされ、flush_video_views で VideoView にまとめて反映される。
+    """
+    # 視聴ページと同じチェック（見られない動画を履歴に載せない）
+    video, error = _get_playable_video(request, video_id)
+    if error:
+        return error
+
+    try:
+        watch_duration = int(float(request.POST.get('watch_duration', 0)))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Invalid watch_duration'}, status=400)
+    completed = request.POST.get('completed') in ('1', 'true')
+
+    record_watch_progress(request, video.id, watch_duration, completed)
+    return HttpResponse(status=204)
+
+
 @login_required
 def upload_video(request):
     """Video upload page."""
@@ -185,64 +218,13 @@ def upload_video(request):
         return redirect('streaming:home')
     
     if request.method == 'POST':
-        title = request.POST.get('title', '').strip()
-        description = request.POST.get('description', '').strip()
-        privacy = request.POST.get('privacy', 'public')
-        category_id = request.POST.get('category')
-        tags_input = request.POST.get('tags', '').strip()
-        
-        if not title:
+        # Entry without a file (the file itself is sent through the chunked upload API)
+        if not request.POST.get('title', '').strip():
             messages.error(request, 'タイトルを入力してください')
             return render(request, 'content/upload.html', get_upload_context())
         
-        # Skip file upload validation for now
-        # Original file upload code is commented out
-        """
-        if 'video_file' not in request.FILES:
-            messages.error(request, '動画ファイルを選択してください')
-            return render(request, 'content/upload.html', get_upload_context())
-        
-        video_file = request.FILES['video_file']
-        
-        # Basic file validation
-        if video_file.size > 500 * 1024 * 1024:  # 500MB limit
-            messages.error(request, 'ファイルサイズが大きすぎます (上限: 500MB)')
-            return render(request, 'content/upload.html', get_upload_context())
-        """
-        
-        # Create clean video record without file
         try:
-            video = Video.objects.create(
-                title=title,
-                description=description,
-                uploader=request.user,
-                privacy=privacy,
-                status='ready',
-                slug=generate_unique_slug(title),
-                file_size=0,
-                playback_url="",
-                thumbnail_url="",
-                duration=0,
-                published_at=timezone.now()
-            )
-            
-            # Set category if provided
-            if category_id:
-                try:
-                    category = VideoCategory.objects.get(id=category_id, is_active=True)
-                    video.category = category
-                except VideoCategory.DoesNotExist:
-                    pass
-            
-            # Save the video with thumbnail and category
-            video.save()
-            
-            # Process and save tags
-            if tags_input:
-                tag_names = [tag.strip() for tag in tags_input.split(',') if tag.strip()]
-                for tag_name in tag_names:
-                    tag, created = VideoTag.objects.get_or_create(name=tag_name)
-                    video.tags.add(tag)
+            video = _create_video_entry(request, status='ready')
             
             # Send notifications to followers
             from apps.notifications.services import NotificationService
@@ -257,12 +239,54 @@ def upload_video(request):
     return render(request, 'content/upload.html', get_upload_context())
 
 
+def _create_video_entry(request, status):
+    """Create a Video from the upload form fields (title, description, privacy, category, tags)."""
+    title = request.POST.get('title', '').strip()
+    description = request.POST.get('description', '').strip()
+    privacy = request.POST.get('privacy', 'public')
+    category_id = request.POST.get('category')
+    tags_input = request.POST.get('tags', '').strip()
+    
+    video = Video(
+        title=title,
+        description=description,
+        uploader=request.user,
+        privacy=privacy,
+        status=status,
+        slug=generate_unique_slug(title),
+        file_size=0,
+        playback_url="",
+        thumbnail_url="",
+        duration=0,
+        published_at=timezone.now() if status == 'ready' else None
+    )
+    
+    # Set category if provided
+    if category_id:
+        try:
+            video.category = VideoCategory.objects.get(id=category_id, is_active=True)
+        except (VideoCategory.DoesNotExist, ValueError):
+            pass
+    
+    video.save()
+    
+    # Process and save tags
+    if tags_input:
+        tag_names = [tag.strip() for tag in tags_input.split(',') if tag.strip()]
+        for tag_name in tag_names:
+            tag, created = VideoTag.objects.get_or_create(name=tag_name)
+            video.tags.add(tag)
+    
+    return video
+
+
 def get_upload_context():
     """Get context for upload form."""
     return {
         'categories': VideoCategory.objects.filter(is_active=True),
-        'max_file_size': 500,  # MB
-        'supported_formats': ['mp4', 'mov', 'avi', 'mkv']
+        'max_file_size': get_video_setting('MAX_FILE_SIZE', 500 * 1024 * 1024) // (1024 * 1024),  # MB
+        'supported_formats': get_video_setting('SUPPORTED_FORMATS', ['mp4']),
+        'chunk_size': get_video_setting('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
     }
 
 
@@ -310,28 +334,24 @@ def manage_videos(request):
         except VideoCategory.DoesNotExist:
             pass
     
-    # Sort order
+    # Sort order (the unique id keeps the keyset cursor stable)
     sort_by = request.GET.get('sort', '-created_at')
     valid_sorts = ['-created_at', 'created_at', '-view_count', 'title', '-duration']
-    if sort_by in valid_sorts:
-        videos = videos.order_by(sort_by)
-    else:
-        videos = videos.order_by('-created_at')
-    
-    paginator = Paginator(videos, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Statistics
-    stats = {
-        'total_videos': videos.count(),
-        'total_views': sum(v.view_count for v in videos),
-        'total_likes': sum(v.like_count for v in videos),
-        'processing': videos.filter(status='processing').count(),
-    }
+    if sort_by not in valid_sorts:
+        sort_by = '-created_at'
+    ordering = (sort_by, '-id' if sort_by.startswith('-') else 'id')
+    page = KeysetPaginator(videos.select_related('category'), ordering, 12).get_page(request.GET.get('cursor'))
+    
+    # Statistics (one aggregate query instead of loading every video)
+    stats = videos.aggregate(
+        total_videos=Count('id'),
+        total_views=Coalesce(Sum('view_count'), 0),
+        total_likes=Coalesce(Sum('like_count'), 0),
+        processing=Count('id', filter=Q(status='processing')),
+    )
     
     context = {
-        'videos': page_obj,
+        'videos': page,
         'stats': stats,
         'search_query': search_query,
         'status_filter': status_filter,
@@ -396,11 +416,161 @@ def edit_video(request, video_id):
 def delete_video(request, video_id):
     """Delete user's video."""
     video = get_object_or_404(Video, id=video_id, uploader=request.user)
+    delete_video_files(video)
     video.delete()
     messages.success(request, f'「{video.title}」を削除しました')
     return redirect('content:manage_videos')
 
 
+def _upload_response(upload, status=204, data=None):
+    response = JsonResponse(data, status=status) if data is not None else HttpResponse(status=status)
+    response['Upload-Offset'] = str(upload.offset)
+    response['Upload-Length'] = str(upload.size)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@login_required
+@require_POST
+def create_upload(request):
+    """Create a video entry and start a resumable upload session for its file."""
+    if not request.user.can_stream:
+        return JsonResponse({'error': '動画アップロード権限がありません'}, status=403)
+    if not request.POST.get('title', '').strip():
+        return JsonResponse({'error': 'タイトルを入力してください'}, status=400)
+    
+    filename = request.POST.get('filename', '')
+    try:
+        size = int(request.POST.get('size', 0))
+        validate_upload(filename, size)
+    except ValueError:
+        return JsonResponse({'error': 'ファイルサイズが不正です'}, status=400)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    
+    with transaction.atomic():
+        video = _create_video_entry(request, status='uploading')
+        upload = start_upload(video, request.user, filename, size)
+    
+    url = reverse('content:upload_api', args=[upload.id])
+    response = _upload_response(upload, status=201, data={
+        'upload_id': str(upload.id),
+        'video_id': video.id,
+        'url': url,
+        'offset': upload.offset,
+        'chunk_size': get_video_setting('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
+    })
+    response['Location'] = url
+    return response
+
+
+@csrf_protect
+@login_required
+@require_http_methods(["GET", "HEAD", "PATCH", "DELETE"])
+def upload_api(request, upload_id):
+    """
+    Resumable upload endpoint.
+    HEAD/GET: received offset, PATCH: append a chunk at Upload-Offset, DELETE: abort.
+    """
+    upload = get_object_or_404(VideoUpload.objects.select_related('video'), pk=upload_id, user=request.user)
+    
+    if request.method in ('GET', 'HEAD'):
+        return _upload_response(upload, status=200, data={
+            'offset': upload.offset,
+            'size': upload.size,
+            'status': upload.status,
+            'video_id': upload.video_id,
+        })
+    
+    if request.method == 'DELETE':
+        abort_upload(upload)
+        return HttpResponse(status=204)
+    
+    if request.content_type != 'application/offset+octet-stream':
+        return JsonResponse({'error': 'Content-Type は application/offset+octet-stream を指定してください'}, status=415)
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or -1)
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset ヘッダが不正です'}, status=400)
+    
+    try:
+        checksum = parse_checksum(request.headers.get('Upload-Checksum'))
+        upload = write_chunk(upload.pk, offset, request, length, checksum)
+    except UploadError as e:
+        upload.refresh_from_db(fields=['offset'])
+        return _upload_response(upload, status=e.status, data={'error': str(e), 'offset': upload.offset})
+    
+    if upload.status == 'complete':
+        return _upload_response(upload, status=200, data={
+            'offset': upload.offset,
+            'status': upload.status,
+            'video_id': upload.video_id,
+            'redirect_url': reverse('content:manage_videos'),
+        })
+    return _upload_response(upload)
+
+
+def _get_playable_video(request, video_id):
+    """
+    Video whose files the user may play, or an error response.
+    視聴ページと同じ公開設定のチェック（アップロードした本人は処理中・非公開でも再生可能）
+    """
+    video = get_object_or_404(Video.objects.only('uploader_id', 'privacy', 'status'), id=video_id)
+    is_owner = request.user.is_authenticated and video.uploader_id == request.user.id
+    if not is_owner:
+        if video.status != 'ready' or video.privacy == 'private':
+            raise Http404
+        if video.privacy == 'premium' and not (request.user.is_authenticated and request.user.is_premium()):
+            return video, HttpResponse(status=403)
+    return video, None
+
+
+def _media_cache_control(video):
+    cache_scope = 'public' if video.privacy in ('public', 'unlisted') and video.status == 'ready' else 'private'
+    return f"{cache_scope}, max-age={get_video_setting('MEDIA_MAX_AGE', 3600)}"
+
+
+@require_http_methods(["GET", "HEAD"])
+def video_media(request, video_id, name):
+    """
+    Serve a stored file of a video (source / HLS segments) to the player.
+    Range requests let the player seek without downloading the whole file.
+    """
+    video, error = _get_playable_video(request, video_id)
+    if error:
+        return error
+    
+    directory = video_media_dir(video.id)
+    try:
+        path = safe_join(settings.MEDIA_ROOT, directory, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    
+    accel_prefix = get_video_setting('MEDIA_ACCEL_REDIRECT')
+    accel_path = f"{accel_prefix.rstrip('/')}/{directory}/{name}" if accel_prefix else None
+    try:
+        return serve_file(request, path, cache_control=_media_cache_control(video), accel_path=accel_path)
+    except (FileNotFoundError, IsADirectoryError):
+        raise Http404
+
+
+@require_http_methods(["GET", "HEAD"])
+def hls_playlist(request, video_id, name):
+    """HLS master ('master') or rendition playlist, generated from the packaged segment index."""
+    video, error = _get_playable_video(request, video_id)
+    if error:
+        return error
+    
+    playlist = get_playlist(video_media_dir(video.id), name)
+    if playlist is None:
+        raise Http404
+    response = HttpResponse(playlist, content_type='application/vnd.apple.mpegurl')
+    response['Cache-Control'] = _media_cache_control(video)
+    return response
+
+
 @require_http_methods(["GET"])
 def video_processing_status(request, video_id):
     """API endpoint for video processing status."""
@@ -425,66 +595,21 @@ def like_video(request, video_id):
     if action not in ['like', 'dislike']:
         return JsonResponse({'error': 'Invalid action'}, status=400)
     
-    is_like = action == 'like'
+    status, video_like, like_count, dislike_count = toggle_video_like(video, request.user, action == 'like')
     
-    try:
-        # Check if user already liked/disliked
-        existing_like = VideoLike.objects.get(video=video, user=request.user)
-        
-        if existing_like.is_like == is_like:
-            # Remove the like/dislike
-            existing_like.delete()
-            if is_like:
-                video.like_count = max(0, video.like_count - 1)
-            else:
-                video.dislike_count = max(0, video.dislike_count - 1)
-            video.save()
-            return JsonResponse({
-                'status': 'removed',
-                'like_count': video.like_count,
-                'dislike_count': video.dislike_count
-            })
-        else:
-            # Change like to dislike or vice versa
-            if existing_like.is_like:
-                video.like_count = max(0, video.like_count - 1)
-                video.dislike_count += 1
-            else:
-                video.dislike_count = max(0, video.dislike_count - 1)
-                video.like_count += 1
-            
-            existing_like.is_like = is_like
-            existing_like.save()
-            video.save()
-            
-            return JsonResponse({
-                'status': 'changed',
-                'action': action,
-                'like_count': video.like_count,
-                'dislike_count': video.dislike_count
-            })
-            
-    except VideoLike.DoesNotExist:
-        # Create new like/dislike
-        video_like = VideoLike.objects.create(video=video, user=request.user, is_like=is_like)
-        
-        if is_like:
-            video.like_count += 1
-        else:
-            video.dislike_count += 1
-        video.save()
-        
-        # Send notification for likes
-        if is_like:
-            from apps.notifications.services import NotificationService
-            NotificationService.notify_video_like(video_like)
-        
-        return JsonResponse({
-            'status': 'added',
-            'action': action,
-            'like_count': video.like_count,
-            'dislike_count': video.dislike_count
-        })
+    # Send notification for new likes
+    if video_like and video_like.is_like:
+        from apps.notifications.services import NotificationService
+        NotificationService.notify_video_like(video_like)
+    
+    response = {
+        'status': status,
+        'like_count': like_count,
+        'dislike_count': dislike_count
+    }
+    if status != 'removed':
+        response['action'] = action
+    return JsonResponse(response)
 
 
 @login_required
@@ -509,16 +634,7 @@ def add_comment(request, video_id):
         except Comment.DoesNotExist:
             return JsonResponse({'error': 'Parent comment not found'}, status=404)
     
-    comment = Comment.objects.create(
-        video=video,
-        user=request.user,
-        parent=parent,
-        content=content
-    )
-    
-    # Update comment count
-    video.comment_count = video.comments.filter(is_hidden=False).count()
-    video.save(update_fields=['comment_count'])
+    comment, comment_count = add_video_comment(video, request.user, content, parent)
     
     # Send notifications
     from apps.notifications.services import NotificationService
@@ -536,7 +652,7 @@ def add_comment(request, video_id):
             'created_at': comment.created_at.isoformat(),
             'is_reply': comment.is_reply
         },
-        'comment_count': video.comment_count
+        'comment_count': comment_count
     })
 
 
@@ -550,19 +666,42 @@ def delete_comment(request, comment_id):
     if request.user != comment.user and request.user != comment.video.uploader:
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    video = comment.video
-    comment.delete()
-    
-    # Update comment count
-    video.comment_count = video.comments.filter(is_hidden=False).count()
-    video.save(update_fields=['comment_count'])
+    comment_count = delete_video_comment(comment)
     
     return JsonResponse({
         'status': 'success',
-        'comment_count': video.comment_count
+        'comment_count': comment_count
     })
 
 
+def _render_comments(request, video, comments, next_cursor):
+    html = ''.join(
+        render_to_string('partials/comment.html', {'comment': comment, 'video': video}, request=request)
+        for comment in comments
+    )
+    return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+
+@require_http_methods(["GET"])
+def video_comments(request, video_id):
+    """Next page of top-level comments (rendered HTML, keyset cursor)."""
+    video = get_object_or_404(Video, id=video_id, status='ready')
+    if video.privacy == 'private' and video.uploader != request.user:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    comments, next_cursor = get_comment_page(video, request.GET.get('cursor'))
+    return _render_comments(request, video, comments, next_cursor)
+
+
+@require_http_methods(["GET"])
+def comment_replies(request, comment_id):
+    """Replies of a comment thread (rendered HTML, keyset cursor)."""
+    parent = get_object_or_404(Comment.objects.select_related('video'), id=comment_id, is_hidden=False)
+    if parent.video.privacy == 'private' and parent.video.uploader_id != request.user.id:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    replies, next_cursor = get_reply_page(parent, request.GET.get('cursor'))
+    return _render_comments(request, parent.video, replies, next_cursor)
+
+
 def search_videos(request):
     """Search videos with advanced filters and tags."""
     query = request.GET.get('q', '').strip()
@@ -578,13 +717,9 @@ def search_videos(request):
         privacy__in=['public', 'unlisted']
     ).select_related('uploader', 'category').prefetch_related('tags')
     
-    # Search by title, description, and uploader
+    # Full-text search over title, tags, uploader and description (GIN index, ts_rank as `rank`)
     if query:
-        videos = videos.filter(
-            Q(title__icontains=query) | 
-            Q(description__icontains=query) |
-            Q(uploader__username__icontains=query)
-        )
+        videos = search.search(videos, query)
     
     # Search by tags
     if tags_query:
@@ -632,47 +767,29 @@ def search_videos(request):
     
     # Sort results
     if sort_by == 'date':
-        videos = videos.order_by('-published_at')
+        ordering = ('-published_at', '-id')
     elif sort_by == 'views':
-        videos = videos.order_by('-view_count')
+        ordering = ('-view_count', '-id')
     elif sort_by == 'rating':
-        videos = videos.order_by('-like_count')
+        ordering = ('-like_count', '-id')
     elif sort_by == 'duration':
-        videos = videos.order_by('-duration')
+        ordering = ('-duration', '-id')
     else:  # relevance (default)
-        if query or tags_query:
-            # Enhanced relevance scoring
-            videos = videos.extra(
-                select={
-                    'title_match': "CASE WHEN title ILIKE %s THEN 2 ELSE 0 END",
-                    'desc_match': "CASE WHEN description ILIKE %s THEN 1 ELSE 0 END",
-                    'tag_match': "CASE WHEN EXISTS(SELECT 1 FROM content_videotag vt JOIN content_video_tags vvt ON vt.id = vvt.videotag_id WHERE vvt.video_id = content_video.id AND vt.name ILIKE %s) THEN 3 ELSE 0 END"
-                },
-                select_params=[
-                    f'%{query}%' if query else '', 
-                    f'%{query}%' if query else '',
-                    f'%{tags_query}%' if tags_query else ''
-                ],
-                order_by=['-tag_match', '-title_match', '-desc_match', '-view_count']
-            )
+        if query:
+            ordering = ('-rank', '-view_count', '-id')
         else:
-            videos = videos.order_by('-view_count')
-    
-    # Pagination
-    paginator = Paginator(videos, 20)  # Increased page size for better search results
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+            ordering = ('-view_count', '-id')
     
-    # Get categories for filter
-    categories = VideoCategory.objects.filter(is_active=True)
+    # Keyset pagination (no COUNT(*) / OFFSET per page); the total is cached per query
+    page = KeysetPaginator(videos, ordering, 20).get_page(request.GET.get('cursor'))
     
-    # Get popular tags for suggestions
-    popular_tags = VideoTag.objects.annotate(
-        video_count=Count('videos')
-    ).filter(video_count__gt=0).order_by('-video_count')[:20]
+    # Categories and popular tags come from the materialized facet counts (cached)
+    facets = get_search_facets()
+    categories = facets['categories']
+    popular_tags = facets['tags']
     
     context = {
-        'videos': page_obj,
+        'videos': page,
         'categories': categories,
         'popular_tags': popular_tags,
         'search_query': query,
@@ -681,18 +798,45 @@ def search_videos(request):
         'current_sort': sort_by,
         'current_duration': duration_filter,
         'current_upload_date': upload_date,
-        'total_results': paginator.count,
+        'total_results': cached_count(videos),
     }
     
     return render(request, 'content/search.html', context)
 
 
+@require_http_methods(["GET"])
+def autocomplete_api(request):
+    """Search box suggestions (JSON)."""
+    query = request.GET.get('q', '')
+    return JsonResponse({'query': query, **search.get_autocomplete(query)})
+
+
 @login_required
 def history(request):
-    """User's viewing history."""
-    # Placeholder for viewing history - would need to implement WatchHistory model
+    """User's viewing history (keyset-paginated on the (user, -updated_at) index)."""
+    page_size = get_video_setting('HISTORY_PAGE_SIZE', 24)
+    # 視聴ページと同じ公開設定で絞る（非公開・プレミアムになった動画は表示しない）
+    visible = Q(video__uploader=request.user) | Q(video__privacy__in=['public', 'unlisted'])
+    if request.user.is_premium():
+        visible |= Q(video__privacy='premium')
+    views = VideoView.objects.filter(
+        visible,
+        user=request.user,
+        video__status='ready'
+    ).select_related('video__uploader', 'video__category')
+    page = KeysetPaginator(views, ('-updated_at', '-id'), page_size).get_page(request.GET.get('cursor'))
+
+    # 別の IP から視聴した同じ動画は1件にまとめる
+    videos = []
+    seen = set()
+    for view in page:
+        if view.video_id not in seen:
+            seen.add(view.video_id)
+            videos.append(view.video)
+
     context = {
-        'videos': [],
+        'videos': videos,
+        'next_cursor': page.next_cursor,
         'title': '視聴履歴',
         'empty_message': '視聴履歴はありません'
     }
@@ -702,18 +846,16 @@ def history(request):
 @login_required 
 def favorites(request):
     """User's favorite videos."""
-    # Get favorite videos from VideoFavorite model
-    favorite_videos = Video.objects.filter(
-        favorites__user=request.user,
-        status='ready'
-    ).order_by('-favorites__created_at')
-    
-    paginator = Paginator(favorite_videos, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset-paginated on the (user, -created_at, -id) index of VideoFavorite
+    favorites = VideoFavorite.objects.filter(
+        user=request.user,
+        video__status='ready'
+    ).select_related('video__uploader', 'video__category')
+    page = KeysetPaginator(favorites, ('-created_at', '-id'), 12).get_page(request.GET.get('cursor'))
     
     context = {
-        'videos': page_obj,
+        'videos': [favorite.video for favorite in page],
+        'next_cursor': page.next_cursor,
         'title': 'お気に入り',
         'empty_message': 'お気に入りの動画はありません'
     }
@@ -723,7 +865,7 @@ def favorites(request):
 @login_required
 def playlists(request):
     """User's playlists."""
-    user_playlists = Playlist.objects.filter(owner=request.user).prefetch_related('playlistitem_set__video')
+    user_playlists = with_previews(Playlist.objects.filter(owner=request.user))
     
     context = {
         'playlists': user_playlists,
@@ -735,9 +877,9 @@ def playlists(request):
 
 def public_playlists(request):
     """Public playlists for all users."""
-    public_playlists_queryset = Playlist.objects.filter(
-        privacy='public'
-    ).prefetch_related('playlistitem_set__video').order_by('-created_at')
+    public_playlists_queryset = with_previews(
+        Playlist.objects.filter(privacy='public').select_related('owner')
+    ).order_by('-created_at')
     
     # Search functionality
     search_query = request.GET.get('search')
@@ -857,16 +999,8 @@ def add_to_playlist(request):
         video = get_object_or_404(Video, pk=video_id)
         playlist = get_object_or_404(Playlist, pk=playlist_id, owner=request.user)
         
-        # Check if video is already in playlist
-        if not PlaylistItem.objects.filter(playlist=playlist, video=video).exists():
-            # Get the next order number
-            max_order = PlaylistItem.objects.filter(playlist=playlist).aggregate(models.Max('order'))['order__max'] or 0
-            
-            PlaylistItem.objects.create(
-                playlist=playlist,
-                video=video,
-                order=max_order + 1
-            )
+        added_count, _ = add_videos_to_playlist(playlist, [video.pk])
+        if added_count:
             messages.success(request, f'{video.title}をプレイリストに追加しました')
         else:
             messages.info(request, 'この動画は既にプレイリストに含まれています')
@@ -884,6 +1018,7 @@ def remove_from_playlist(request, pk, item_id):
     
     if request.method == 'POST':
         item.delete()
+        invalidate_viewer_state(request.user.id)
         messages.success(request, '動画をプレイリストから削除しました')
     
     return redirect('content:playlist_detail', pk=pk)
@@ -899,16 +1034,8 @@ def add_video_to_playlist(request, pk):
         if video_id:
             video = get_object_or_404(Video, pk=video_id)
             
-            # Check if video is already in playlist
-            if not PlaylistItem.objects.filter(playlist=playlist, video=video).exists():
-                # Get the next order number
-                max_order = PlaylistItem.objects.filter(playlist=playlist).aggregate(models.Max('order'))['order__max'] or 0
-                
-                PlaylistItem.objects.create(
-                    playlist=playlist,
-                    video=video,
-                    order=max_order + 1
-                )
+            added_count, _ = add_videos_to_playlist(playlist, [video.pk])
+            if added_count:
                 messages.success(request, f'{video.title}をプレイリストに追加しました')
             else:
                 messages.info(request, 'この動画は既にプレイリストに含まれています')
@@ -930,30 +1057,9 @@ def add_multiple_videos_to_playlist(request, pk):
             if not video_ids:
                 return JsonResponse({'success': False, 'message': '動画が選択されていません'})
             
-            added_count = 0
-            already_exists_count = 0
-            
-            # 現在のプレイリストの最大順序を取得
-            max_order = PlaylistItem.objects.filter(playlist=playlist).aggregate(models.Max('order'))['order__max'] or 0
-            
-            for video_id in video_ids:
-                try:
-                    video = Video.objects.get(pk=video_id, status='ready')
-                    
-                    # 既にプレイリストに含まれているかチェック
-                    if not PlaylistItem.objects.filter(playlist=playlist, video=video).exists():
-                        max_order += 1
-                        PlaylistItem.objects.create(
-                            playlist=playlist,
-                            video=video,
-                            order=max_order
-                        )
-                        added_count += 1
-                    else:
-                        already_exists_count += 1
-                        
-                except Video.DoesNotExist:
-                    continue
+            # 公開済みの動画のみを末尾にまとめて追加
+            ready_ids = Video.objects.filter(pk__in=video_ids, status='ready').values_list('pk', flat=True)
+            added_count, already_exists_count = add_videos_to_playlist(playlist, ready_ids)
             
             # 結果メッセージを作成
             messages = []
@@ -977,6 +1083,21 @@ def add_multiple_videos_to_playlist(request, pk):
     return JsonResponse({'success': False, 'message': '無効なリクエストメソッドです'})
 
 
+@login_required
+@require_POST
+def reorder_playlist_item(request, pk):
+    """Move a playlist item right after another item (or to the top)."""
+    playlist = get_object_or_404(Playlist, pk=pk, owner=request.user)
+    after_id = request.POST.get('after_id') or None
+    
+    try:
+        order = move_playlist_item(playlist, request.POST.get('item_id'), after_id)
+    except (PlaylistItem.DoesNotExist, ValueError, TypeError):
+        return JsonResponse({'success': False, 'message': '無効なリクエストです'}, status=400)
+    
+    return JsonResponse({'success': True, 'order': order})
+
+
 # Category Management Views (Admin only)
 
 @tenant_admin_required
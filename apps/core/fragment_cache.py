@@ -0,0 +1,44 @@
+"""
+Tenant-aware template fragment caching.
+
+Templates use Django's {% cache %} tag with a key from fragment():
+
+    {% cache fragments.trending.timeout home_trending fragments.trending.key %}
+
+The key contains the tenant schema and a per-section version.
+invalidate_fragments() replaces the version, so every cached variant of a
+section (all pages, categories, ...) is dropped at once.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+DEFAULT_TIMEOUT = 60
+
+
+def _version_key(schema_name, section):
+    return f'fragments:version:{schema_name}:{section}'
+
+
+def fragment(section, schema_name=None):
+    """Cache key/timeout for a template fragment section of the current tenant."""
+    schema_name = schema_name or connection.schema_name
+    version = cache.get_or_set(_version_key(schema_name, section), time.time_ns, None)
+    timeouts = getattr(settings, 'FRAGMENT_CACHE_TIMEOUTS', {})
+    return {
+        'key': f'{schema_name}:{version}',
+        'timeout': timeouts.get(section, DEFAULT_TIMEOUT),
+    }
+
+
+def invalidate_fragments(*sections, schema_name=None):
+    """Invalidate cached fragments of the given sections after the transaction commits."""
+    schema_name = schema_name or connection.schema_name
+
+    def invalidate():
+        cache.set_many({_version_key(schema_name, section): time.time_ns() for section in sections}, None)
+
+    transaction.on_commit(invalidate)
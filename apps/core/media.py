@@ -0,0 +1,132 @@
+"""
+File responses for media served by the application (VOD files, thumbnails).
+
+- HTTP Range（単一範囲）に対応し、シーク時はその範囲だけを返す（206）
+- ETag / Last-Modified による条件付きリクエスト（304）、If-Range
+- 本文は FileResponse でファイルオブジェクトのまま返すため、
+  WSGI サーバーの wsgi.file_wrapper（gunicorn なら os.sendfile）で転送され、ワーカーのメモリは増えない
+- accel_prefix を指定すると本文は返さず X-Accel-Redirect でフロントの nginx に転送させる
+"""
+
+import mimetypes
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    File object limited to length bytes from its current position.
+    fileno() is kept so that sendfile-based file wrappers still apply; they
+    send Content-Length bytes from the current offset.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def make_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single "bytes=" range (end inclusive), None to send the whole file,
+    or False when the range cannot be satisfied.
+    """
+    match = RANGE_HEADER.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None  # 複数範囲や不正な形式は無視して全体を返す
+    first, last = match.groups()
+    if first == '':
+        # bytes=-N: 末尾 N バイト
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _range_applies(request, etag, mtime):
+    """If-Range: the Range header only applies while the file is unchanged."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def serve_file(request, path, content_type=None, cache_control=None, accel_path=None):
+    """
+    Response for a file on disk, honouring Range and conditional headers.
+    Raises FileNotFoundError when the file does not exist.
+    """
+    stat = os.stat(path)
+    etag = make_etag(stat)
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    elif accel_path:
+        # 範囲指定・送信はフロントプロキシに任せる
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_path
+    else:
+        byte_range = None
+        if request.headers.get('Range') and _range_applies(request, etag, stat.st_mtime):
+            byte_range = parse_range(request.headers['Range'], stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        elif byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            file = open(path, 'rb')
+            file.seek(start)
+            response = FileResponse(RangeFile(file, length), content_type=content_type, status=206)
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    return response
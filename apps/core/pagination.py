@@ -0,0 +1,177 @@
+"""
+Keyset (cursor) pagination.
+
+Paginator の COUNT(*) と OFFSET の代わりに、直前ページ最後の行のソートキーを
+不透明なカーソルに埋め込み、WHERE 句で続きから取得する。
+どのページでもインデックスを範囲検索するだけなので、深いページでも1ページ目と同じコストになる。
+
+    page = KeysetPaginator(videos, ('-published_at', '-id'), per_page=12).get_page(request.GET.get('cursor'))
+    {% for video in page %} ... {% if page.has_next %}?cursor={{ page.next_cursor|urlencode }}{% endif %}
+
+The ordering must end in a unique field (normally id). NULLs sort last in
+both directions. Total counts are not computed; use cached_count() or
+estimated_count() where a page needs one.
+"""
+
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connection
+from django.db.models import F, Q
+
+DEFAULT_COUNT_TIMEOUT = 300
+
+
+def _json_default(value):
+    # DjangoJSONEncoder はマイクロ秒を切り捨てるため、キーの比較に使う値は完全な ISO 形式で保存する
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values):
+    data = json.dumps(values, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into its list of values. Raises ValueError for malformed cursors."""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (TypeError, UnicodeError, base64.binascii.Error) as e:
+        raise ValueError(f'Invalid cursor: {e}') from e
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+class CursorPage:
+    """One page of a keyset-paginated queryset."""
+
+    def __init__(self, object_list, next_cursor, cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by (sort key, id) instead of page number.
+
+    ordering is a sequence of field or annotation names with an optional
+    '-' prefix, e.g. ('-published_at', '-id').
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.per_page = per_page
+
+    def _field(self, name):
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None  # annotation (ts_rank, scores): plain JSON number
+
+    def _nullable(self, name):
+        field = self._field(name)
+        return field is not None and field.null
+
+    def _to_python(self, name, value):
+        field = self._field(name)
+        return value if field is None else field.to_python(value)
+
+    def _order_by(self):
+        # NULLS LAST は NULL を許すカラムだけに付ける（NOT NULL カラムは通常のインデックス順のまま）
+        order = []
+        for name, descending in self.ordering:
+            if self._nullable(name):
+                expression = F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+            else:
+                expression = f'-{name}' if descending else name
+            order.append(expression)
+        return order
+
+    def _after(self, values):
+        """Q for rows that come after the given sort key, NULLs last."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            if value is None:
+                # NULL は最後なので、同じキーの中でしか続きはない
+                equal &= Q(**{f'{name}__isnull': True})
+                continue
+            after = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            if self._nullable(name):
+                after |= Q(**{f'{name}__isnull': True})
+            condition |= equal & after
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_page(self, cursor=None):
+        """Return the page after cursor (the first page for a missing or invalid cursor)."""
+        queryset = self.queryset.order_by(*self._order_by())
+
+        if cursor:
+            try:
+                values = decode_cursor(cursor)
+                if len(values) != len(self.ordering):
+                    raise ValueError('Invalid cursor')
+                values = [self._to_python(name, value) for (name, _), value in zip(self.ordering, values)]
+                queryset = queryset.filter(self._after(values))
+            except (ValueError, TypeError, ValidationError):
+                cursor = None
+        else:
+            cursor = None
+
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            last = rows[-1]
+            next_cursor = encode_cursor([getattr(last, name) for name, _ in self.ordering])
+        return CursorPage(rows, next_cursor, cursor)
+
+
+def cached_count(queryset, timeout=DEFAULT_COUNT_TIMEOUT):
+    """COUNT(*) of a queryset, cached per tenant and SQL for timeout seconds."""
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{sql}:{params}'.encode('utf-8')).hexdigest()
+    return cache.get_or_set(f'count:{connection.schema_name}:{digest}', queryset.count, timeout)
+
+
+def estimated_count(model):
+    """
+    テーブル全体の概算行数（pg_class.reltuples、ANALYZE 時点の値）
+    統計情報がまだない場合は cached_count() にフォールバックする。
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row and row[0] is not None and row[0] >= 0:
+        return row[0]
+    return cached_count(model._default_manager.all())
@@ -0,0 +1,32 @@
+from django import template
+
+from apps.core.thumbnails import avatar_preset, thumbnail_url as get_thumbnail_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_url(source, preset='card', fmt='webp'):
+    """
+    固定サイズのサムネイル URL（未生成の間は元画像の URL）
+    
+    使用例:
+    {% load thumbnail_tags %}
+    <img src="{% thumbnail_url video.thumbnail_url 'card' %}">
+    """
+    return get_thumbnail_url(source, preset, fmt)
+
+
+@register.simple_tag
+def avatar_url(user, size=48):
+    """
+    表示サイズに合ったアバター画像の URL（アバター未設定の場合は空文字）
+    
+    使用例:
+    {% load thumbnail_tags %}
+    <img src="{% avatar_url comment.user 32 %}" width="32" height="32">
+    """
+    avatar = getattr(user, 'avatar', None)
+    if not avatar:
+        return ''
+    return get_thumbnail_url(avatar, avatar_preset(int(size)))
@@ -0,0 +1,72 @@
+import os
+import tempfile
+from django.test import RequestFactory, SimpleTestCase
+from apps.core.media import parse_range, serve_file
+
+
+class ParseRangeTestCase(SimpleTestCase):
+    """Range ヘッダ解析のテスト"""
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=500-5000', 1000), (500, 999))
+
+    def test_unsatisfiable(self):
+        self.assertIs(parse_range('bytes=1000-', 1000), False)
+        self.assertIs(parse_range('bytes=-0', 1000), False)
+
+    def test_ignored(self):
+        """複数範囲・不正な形式は全体を返す"""
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 1000))
+        self.assertIsNone(parse_range('items=0-1', 1000))
+
+
+class ServeFileTestCase(SimpleTestCase):
+    """ファイル配信のテスト"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.mp4')
+        os.write(fd, bytes(range(256)) * 4)
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.factory = RequestFactory()
+
+    def get(self, **headers):
+        response = serve_file(self.factory.get('/', headers=headers), self.path)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_whole_file(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(body), 1024)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+
+    def test_range(self):
+        """指定範囲だけを 206 で返す"""
+        response, body = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, bytes(range(10, 20)))
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(Range='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_not_modified(self):
+        etag = self.get()[0]['ETag']
+        response, body = self.get(If_None_Match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        """If-Range が一致しない（ファイルが変わった）場合は全体を返す"""
+        response, body = self.get(Range='bytes=0-9', If_Range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(body), 1024)
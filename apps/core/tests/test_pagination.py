@@ -0,0 +1,26 @@
+from datetime import datetime, timezone as dt_timezone
+from django.test import SimpleTestCase
+from apps.core.pagination import decode_cursor, encode_cursor
+
+
+class CursorCodecTestCase(SimpleTestCase):
+    """キーセットカーソルのエンコード/デコードのテスト"""
+
+    def test_round_trip_keeps_microseconds(self):
+        """日時はマイクロ秒まで保持（同一キーの比較に必要）"""
+        created_at = datetime(2024, 1, 15, 14, 30, 0, 123456, tzinfo=dt_timezone.utc)
+        cursor = encode_cursor([created_at, 42])
+        self.assertEqual(decode_cursor(cursor), [created_at.isoformat(), 42])
+
+    def test_cursor_is_url_safe(self):
+        """カーソルはそのままクエリ文字列に使える"""
+        cursor = encode_cursor(['??>>', None, 0.5])
+        self.assertNotIn('=', cursor)
+        self.assertRegex(cursor, r'^[A-Za-z0-9_-]+$')
+
+    def test_invalid_cursor(self):
+        """不正なカーソルは ValueError"""
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor!')
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor({'id': 1}))
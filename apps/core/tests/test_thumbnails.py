@@ -0,0 +1,53 @@
+import os
+import tempfile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from apps.core.thumbnails import avatar_preset, derivative_name, derivative_path, render_derivatives, thumbnail_url
+
+
+class RenderDerivativesTestCase(SimpleTestCase):
+    """サムネイル生成のテスト"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.source = os.path.join(self.tempdir.name, 'frame.png')
+        Image.new('RGB', (1920, 1080), 'red').save(self.source)
+
+    def test_writes_each_format_at_preset_size(self):
+        """WebP と JPEG をプリセットのサイズで出力"""
+        root = os.path.join(self.tempdir.name, 'thumbs')
+        digest = render_derivatives(self.source, root, 'card', (320, 180), 80)
+
+        for fmt in ('webp', 'jpeg'):
+            path = derivative_path(root, derivative_name(digest, 'card', fmt))
+            with Image.open(path) as image:
+                self.assertEqual(image.size, (320, 180))
+
+    def test_name_depends_on_content(self):
+        """同じ内容なら同じ名前、内容が変われば別の名前"""
+        root = os.path.join(self.tempdir.name, 'thumbs')
+        first = render_derivatives(self.source, root, 'card', (320, 180), 80)
+        self.assertEqual(render_derivatives(self.source, root, 'card', (320, 180), 80), first)
+
+        Image.new('RGB', (1920, 1080), 'blue').save(self.source)
+        self.assertNotEqual(render_derivatives(self.source, root, 'card', (320, 180), 80), first)
+
+
+class ThumbnailUrlTestCase(SimpleTestCase):
+    """サムネイル URL のテスト"""
+
+    def test_external_url_is_returned_as_is(self):
+        """MEDIA_ROOT 外の画像は縮小しない"""
+        url = 'https://picsum.photos/320/180?random=1'
+        self.assertEqual(thumbnail_url(url, 'card'), url)
+
+    def test_empty_source(self):
+        self.assertEqual(thumbnail_url('', 'card'), '')
+
+    @override_settings(THUMBNAIL_SETTINGS={'SIZES': {'avatar_sm': (64, 64), 'avatar': (128, 128)}})
+    def test_avatar_preset_covers_retina_size(self):
+        """表示サイズの2倍以上の最小プリセット（なければ最大）"""
+        self.assertEqual(avatar_preset(24), 'avatar_sm')
+        self.assertEqual(avatar_preset(48), 'avatar')
+        self.assertEqual(avatar_preset(200), 'avatar')
@@ -0,0 +1,216 @@
+"""
+Resized image derivatives (video thumbnails, avatars).
+
+MEDIA_ROOT 上の画像から THUMBNAIL_SETTINGS['SIZES'] の固定サイズの WebP / JPEG を生成し、
+内容のハッシュをファイル名にして THUMBNAIL_SETTINGS['CACHE_DIR'] に保存する。
+ファイル名が内容で決まるため、配信時は immutable な Cache-Control を付けられる。
+
+    {% load thumbnail_tags %}
+    <img src="{% thumbnail_url video.thumbnail_url 'card' %}">
+    <img src="{% thumbnail_url user.avatar 'avatar' %}">
+
+生成はプロセスプールで非同期に行い、完了するまでは元画像の URL を返す
+（リクエストの応答は生成を待たない）。外部 URL の画像はそのまま返す。
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = {
+    'card': (320, 180),
+    'watch': (1280, 720),
+    'avatar_sm': (64, 64),
+    'avatar': (128, 128),
+    'avatar_lg': (256, 256),
+}
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+PENDING_TIMEOUT = 60  # seconds before a lost generation job may be submitted again
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_thumbnail_setting(name, default=None):
+    return getattr(settings, 'THUMBNAIL_SETTINGS', {}).get(name, default)
+
+
+def get_sizes():
+    return get_thumbnail_setting('SIZES', DEFAULT_SIZES)
+
+
+def cache_root():
+    return os.path.join(settings.MEDIA_ROOT, get_thumbnail_setting('CACHE_DIR', 'thumbs'))
+
+
+def derivative_name(digest, preset, fmt):
+    return f'{digest}-{preset}.{fmt}'
+
+
+def derivative_path(root, name):
+    # ハッシュの先頭2文字でディレクトリを分け、1ディレクトリのファイル数を抑える
+    return os.path.join(root, name[:2], name)
+
+
+def render_derivatives(source, root, preset, size, quality):
+    """
+    Write every format of one preset for a source image; returns the content hash.
+    Runs in the pool processes, so it only uses Pillow and the arguments (no Django).
+    """
+    from PIL import Image, ImageOps
+
+    with open(source, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:32]
+
+    targets = {
+        fmt: derivative_path(root, derivative_name(digest, preset, fmt))
+        for fmt in FORMATS
+    }
+    missing = {fmt: path for fmt, path in targets.items() if not os.path.exists(path)}
+    if not missing:
+        return digest
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+        for fmt, path in missing.items():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp = f'{path}.{os.getpid()}.tmp'
+            image.save(temp, FORMATS[fmt], quality=quality, method=6 if fmt == 'webp' else 0, optimize=True)
+            os.replace(temp, path)
+    return digest
+
+
+def get_executor():
+    """Process pool shared by the requests of this process (created on first use)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: サーバープロセスのスレッドや接続を引き継がない
+            _executor = ProcessPoolExecutor(
+                max_workers=get_thumbnail_setting('WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _discard_executor(executor):
+    """Drop a broken pool so that the next job starts a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _local_path(source):
+    """Path relative to MEDIA_ROOT for an ImageField file or a MEDIA_URL url, else None."""
+    if not source:
+        return None
+    if hasattr(source, 'name'):
+        return source.name
+    source = str(source)
+    if source.startswith(settings.MEDIA_URL):
+        return source[len(settings.MEDIA_URL):]
+    return None
+
+
+def _original_url(source):
+    return source.url if hasattr(source, 'url') else str(source)
+
+
+def _result_key(path, stat, preset):
+    digest = hashlib.md5(path.encode('utf-8')).hexdigest()
+    return f'thumb:{digest}:{stat.st_mtime_ns}:{stat.st_size}:{preset}'
+
+
+def thumbnail_url(source, preset, fmt='webp'):
+    """
+    URL of the preset-size derivative of an image, or the original URL until it has been generated.
+    source is an ImageField file or a URL; only files under MEDIA_ROOT are resized.
+    """
+    if not source:
+        return ''
+    sizes = get_sizes()
+    path = _local_path(source)
+    if path is None or preset not in sizes or fmt not in FORMATS:
+        return _original_url(source)
+
+    absolute = os.path.join(settings.MEDIA_ROOT, path)
+    try:
+        stat = os.stat(absolute)
+    except OSError:
+        return _original_url(source)
+
+    key = _result_key(path, stat, preset)
+    digest = cache.get(key)
+    if digest:
+        return reverse('thumbnail', args=[derivative_name(digest, preset, fmt)])
+
+    if cache.add(f'{key}:pending', 1, PENDING_TIMEOUT):
+        _submit(absolute, key, preset, sizes[preset])
+    return _original_url(source)
+
+
+def _submit(absolute, key, preset, size):
+    executor = get_executor()
+
+    def done(future):
+        try:
+            cache.set(key, future.result(), None)
+        except BrokenProcessPool:
+            cache.delete(f'{key}:pending')
+            _discard_executor(executor)
+        except Exception as e:
+            logger.warning(f"Thumbnail generation failed for {absolute} ({preset}): {e}")
+
+    try:
+        future = executor.submit(
+            render_derivatives, absolute, cache_root(), preset, tuple(size),
+            get_thumbnail_setting('QUALITY', 80),
+        )
+    except BrokenProcessPool:
+        cache.delete(f'{key}:pending')
+        _discard_executor(executor)
+        return
+    future.add_done_callback(done)
+
+
+def generate_thumbnails(source, presets=None):
+    """
+    Generate derivatives synchronously (e.g. from the processing worker) and
+    record them so thumbnail_url() returns them immediately.
+    """
+    path = _local_path(source)
+    if path is None:
+        return
+    absolute = os.path.join(settings.MEDIA_ROOT, path)
+    stat = os.stat(absolute)
+    sizes = get_sizes()
+    for preset in presets or sizes:
+        digest = render_derivatives(
+            absolute, cache_root(), preset, tuple(sizes[preset]), get_thumbnail_setting('QUALITY', 80),
+        )
+        cache.set(_result_key(path, stat, preset), digest, None)
+
+
+def avatar_preset(size):
+    """Smallest avatar preset that covers size CSS pixels on a 2x display."""
+    sizes = get_sizes()
+    presets = sorted(
+        (width, name) for name, (width, height) in sizes.items() if name.startswith('avatar')
+    )
+    for width, name in presets:
+        if width >= size * 2:
+            return name
+    return presets[-1][1] if presets else None
@@ -1,3 +1,24 @@
-from django.shortcuts import render
+import re
 
-# 共通のビュー関数がある場合はここに追加
\ No newline at end of file
+from django.http import Http404
+from django.views.decorators.http import require_http_methods
+
+from .media import serve_file
+from .thumbnails import cache_root, derivative_path
+
+THUMBNAIL_NAME = re.compile(r'^[0-9a-f]{32}-[a-z0-9_]+\.(webp|jpeg)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_thumbnail(request, name):
+    """Serve a generated thumbnail; the name contains the content hash, so it never changes."""
+    if not THUMBNAIL_NAME.match(name):
+        raise Http404
+    try:
+        return serve_file(
+            request, derivative_path(cache_root(), name),
+            cache_control=f'public, max-age={IMMUTABLE_MAX_AGE}, immutable',
+        )
+    except FileNotFoundError:
+        raise Http404
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class StreamingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.streaming'
\ No newline at end of file
+    name = 'apps.streaming'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,6 +1,7 @@
 """
 WebSocket consumers for streaming features (reactions, live updates, etc.)
 """
+import asyncio
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
@@ -25,6 +26,9 @@ class StreamReactionConsumer(AsyncWebsocketConsumer):
         
         await self.accept()
         
+        # 配信の主キーは接続時に一度だけ解決する
+        self.reaction_writer = await self.get_reaction_writer()
+        
         # 接続確認メッセージ
         await self.send(text_data=json.dumps({
             'type': 'connection_status',
@@ -32,6 +36,10 @@ class StreamReactionConsumer(AsyncWebsocketConsumer):
         }))
 
     async def disconnect(self, close_code):
+        # 未保存のリアクションを書き出す
+        if getattr(self, 'reaction_writer', None):
+            await self.flush_reactions()
+        
         # グループから退出
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -70,20 +78,26 @@ class StreamReactionConsumer(AsyncWebsocketConsumer):
             return
             
         stamp_id = data.get('stamp_id')
-        stamp_name = data.get('stamp_name')
-        stamp_image_url = data.get('stamp_image_url')
-        stream_id = data.get('stream_id')
         
-        if not all([stamp_id, stream_id]):
+        if not stamp_id:
             await self.send(text_data=json.dumps({
                 'type': 'error',
                 'message': 'Required fields missing'
             }))
             return
         
+        # スタンプはテナント単位のキャッシュから取得
+        stamp = await self.get_stamp(stamp_id)
+        if not stamp:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Stamp not found'
+            }))
+            return
+        
         # データベースにリアクションを保存（統計用）
         try:
-            await self.save_stream_reaction(user.id, stream_id, stamp_id)
+            await self.save_stream_reaction(user.id, stamp['id'], user.username)
         except Exception as e:
             print(f"Failed to save reaction: {e}")
         
@@ -92,9 +106,9 @@ class StreamReactionConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             {
                 'type': 'reaction_message',
-                'stamp_id': stamp_id,
-                'stamp_name': stamp_name,
-                'stamp_image_url': stamp_image_url,
+                'stamp_id': stamp['id'],
+                'stamp_name': stamp['name'],
+                'stamp_image_url': stamp['image_url'],
                 'username': user.username,
                 'user_id': user.id,
             }
@@ -114,30 +128,110 @@ class StreamReactionConsumer(AsyncWebsocketConsumer):
         }))
 
     @database_sync_to_async
-    def save_stream_reaction(self, user_id, stream_id, stamp_id):
+    def get_reaction_writer(self):
+        """
+        配信の主キーを解決してリアクション保存用ライターを作成
+        """
+        from apps.streaming.services import StreamReactionWriter, resolve_stream_pk
+        
+        return StreamReactionWriter(resolve_stream_pk(self.stream_id), self.scope.get('schema_name'))
+
+    @database_sync_to_async
+    def get_stamp(self, stamp_id):
+        """
+        アクティブなスタンプをキャッシュから取得
+        """
+        from apps.chat.services import stamp_cache
+        
+        return stamp_cache.get(stamp_id, self.scope.get('schema_name'))
+
+    @database_sync_to_async
+    def save_stream_reaction(self, user_id, stamp_id, username=None):
         """
         配信リアクションをデータベースに保存（統計・分析用）
         """
-        from apps.streaming.models import Stream
-        from apps.chat.models import ChatStamp
-        from apps.streaming.models import StreamReaction
-        from django.contrib.auth import get_user_model
+        return self.reaction_writer.record(user_id, stamp_id, username)
+
+    @database_sync_to_async
+    def flush_reactions(self):
+        """
+        バッファ済みのリアクションを保存
+        """
+        return self.reaction_writer.flush()
+
+
+
+class ReactionLeaderboardConsumer(AsyncWebsocketConsumer):
+    """
+    リアクションランキング（配信者ダッシュボード用）
+    Redis のランキングを一定間隔で読み出し、変化があれば配信する
+    """
+    
+    async def connect(self):
+        self.stream_id = self.scope['url_route']['kwargs']['stream_id']
+        self.push_task = None
+        
+        user = self.scope.get('user')
+        if not user or not getattr(user, 'is_authenticated', False):
+            await self.close()
+            return
+        
+        # 配信者本人のみ閲覧可能
+        self.stream_pk = await self.get_owned_stream_pk(user.id)
+        if not self.stream_pk:
+            await self.close()
+            return
         
-        User = get_user_model()
+        await self.accept()
+        self.push_task = asyncio.create_task(self.push_leaderboard())
+
+    async def disconnect(self, close_code):
+        if getattr(self, 'push_task', None):
+            self.push_task.cancel()
+
+    async def push_leaderboard(self):
+        """
+        ランキングを定期的に送信（リアクション数に関係なく一定負荷）
+        """
+        from apps.streaming.services import get_streaming_setting
         
+        interval = get_streaming_setting('LEADERBOARD_PUSH_INTERVAL', 2)
+        last_data = None
         try:
-            user = User.objects.get(id=user_id)
-            stream = Stream.objects.get(stream_id=stream_id)
-            stamp = ChatStamp.objects.get(id=stamp_id)
-            
-            # StreamReactionレコードを作成
-            reaction = StreamReaction.objects.create(
-                stream=stream,
-                user=user,
-                stamp=stamp
-            )
-            
-            return reaction
-            
-        except (User.DoesNotExist, Stream.DoesNotExist, ChatStamp.DoesNotExist) as e:
-            raise Exception(f"Record not found: {e}")
\ No newline at end of file
+            while True:
+                try:
+                    data = await self.get_leaderboard()
+                    if data != last_data:
+                        await self.send(text_data=json.dumps({
+                            'type': 'leaderboard',
+                            **data
+                        }))
+                        last_data = data
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Failed to push leaderboard: {e}")
+                await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            pass
+
+    @database_sync_to_async
+    def get_owned_stream_pk(self, user_id):
+        """
+        ログインユーザーが配信者である配信の主キーを取得
+        """
+        from apps.streaming.models import Stream
+        
+        return Stream.objects.filter(
+            stream_id=self.stream_id,
+            streamer_id=user_id
+        ).values_list('pk', flat=True).first()
+
+    @database_sync_to_async
+    def get_leaderboard(self):
+        """
+        Redis から現在のランキングを取得
+        """
+        from apps.streaming.services import ReactionLeaderboard
+        
+        return ReactionLeaderboard(self.stream_pk, self.scope.get('schema_name')).top()
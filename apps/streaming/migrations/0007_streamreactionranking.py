@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 03:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatreactioncount'),
+        ('streaming', '0006_remove_stream_obs_overlay_enabled'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamReactionRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ranking_type', models.CharField(choices=[('stamp', 'スタンプ'), ('user', 'リアクションユーザー')], max_length=10)),
+                ('rank', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('stamp', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='chat.chatstamp')),
+                ('stream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reaction_rankings', to='streaming.stream')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['ranking_type', 'rank'],
+                'unique_together': {('stream', 'ranking_type', 'rank')},
+            },
+        ),
+    ]
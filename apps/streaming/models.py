@@ -161,6 +161,10 @@ class Stream(models.Model):
             self.ended_at = timezone.now()
             self.save()
             
+            # Save the live reaction leaderboard
+            from .services import snapshot_reaction_leaderboard
+            snapshot_reaction_leaderboard(self.pk)
+            
             return True
             
         except Exception as e:
@@ -264,4 +268,28 @@ class StreamReaction(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.user.username} reacted {self.stamp.name} on {self.stream.title}"
\ No newline at end of file
+        return f"{self.user.username} reacted {self.stamp.name} on {self.stream.title}"
+
+class StreamReactionRanking(models.Model):
+    """配信終了時のリアクションランキング（Redisランキングのスナップショット）"""
+    
+    RANKING_TYPES = [
+        ('stamp', 'スタンプ'),
+        ('user', 'リアクションユーザー'),
+    ]
+    
+    stream = models.ForeignKey(Stream, on_delete=models.CASCADE, related_name='reaction_rankings')
+    ranking_type = models.CharField(max_length=10, choices=RANKING_TYPES)
+    rank = models.IntegerField()
+    stamp = models.ForeignKey('chat.ChatStamp', on_delete=models.SET_NULL, null=True, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['ranking_type', 'rank']
+        unique_together = ('stream', 'ranking_type', 'rank')
+    
+    def __str__(self):
+        target = self.stamp.name if self.stamp else (self.user.username if self.user else '-')
+        return f"#{self.rank} {target} ({self.count}) on {self.stream.title}"
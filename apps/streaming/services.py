@@ -5,8 +5,13 @@ Handles integration with various streaming providers.
 
 import uuid
 import random
+import logging
 from datetime import datetime
 from django.conf import settings
+from django.db import connection
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
 
 
 class StreamingService:
@@ -186,4 +191,194 @@ def validate_stream_settings(quality, bitrate, framerate):
     if framerate not in valid_framerates:
         return False, f"Framerate must be one of: {valid_framerates}"
     
-    return True, "Valid settings"
\ No newline at end of file
+    return True, "Valid settings"
+
+def resolve_stream_pk(stream_id):
+    """Resolve a stream_id (or 'stream_<id>' room name) to the Stream primary key."""
+    from .models import Stream
+
+    if stream_id and stream_id.startswith('stream_'):
+        stream_id = stream_id[len('stream_'):]
+    return Stream.objects.filter(stream_id=stream_id).values_list('pk', flat=True).first()
+
+
+class StreamReactionWriter:
+    """
+    配信リアクションの保存処理（統計・分析用）
+    stream の主キーは接続時に一度だけ解決し、ユーザーは scope から受け取るため
+    保存は INSERT 1回のみ。'buffered' モードではまとめて bulk_create する。
+    """
+
+    def __init__(self, stream_pk, schema_name=None):
+        from apps.chat.services import get_chat_setting
+
+        self.stream_pk = stream_pk
+        self.mode = get_chat_setting('REACTION_PERSIST_MODE', 'immediate')
+        self.batch_size = get_chat_setting('REACTION_BATCH_SIZE', 50)
+        self.leaderboard = ReactionLeaderboard(stream_pk, schema_name) if stream_pk else None
+        self._buffer = []
+
+    def record(self, user_id, stamp_id, username=None):
+        """Record a reaction. Must be called from a sync (DB) context."""
+        from .models import StreamReaction
+
+        if not self.stream_pk or not user_id:
+            return None
+
+        # ライブランキングを更新（Redis障害時も保存処理は継続）
+        try:
+            self.leaderboard.record(user_id, stamp_id, username)
+        except Exception as e:
+            logger.warning(f"Failed to update reaction leaderboard: {e}")
+
+        reaction = StreamReaction(stream_id=self.stream_pk, user_id=user_id, stamp_id=stamp_id)
+        if self.mode != 'buffered':
+            reaction.save()
+            return reaction
+
+        self._buffer.append(reaction)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        return reaction
+
+    def flush(self):
+        """Write buffered reactions in a single query."""
+        from .models import StreamReaction
+
+        if not self._buffer:
+            return 0
+        reactions, self._buffer = self._buffer, []
+        StreamReaction.objects.bulk_create(reactions)
+        return len(reactions)
+
+
+def get_streaming_setting(name, default=None):
+    """Get a value from STREAMING_SETTINGS."""
+    return getattr(settings, 'STREAMING_SETTINGS', {}).get(name, default)
+
+
+class ReactionLeaderboard:
+    """
+    配信ごとのリアクションランキング
+    Redis のソート済みセットで「よく使われたスタンプ」「よくリアクションしたユーザー」を
+    リアルタイムに集計し、配信終了時に StreamReactionRanking へ保存する。
+    """
+
+    def __init__(self, stream_pk, schema_name=None):
+        self.stream_pk = stream_pk
+        self.schema_name = schema_name or connection.schema_name
+        base_key = f'leaderboard:{self.schema_name}:{stream_pk}'
+        self.stamps_key = f'{base_key}:stamps'
+        self.reactors_key = f'{base_key}:reactors'
+        self.names_key = f'{base_key}:names'
+
+    @property
+    def redis(self):
+        return get_redis_connection('default')
+
+    def record(self, user_id, stamp_id, username=None):
+        """Increment stamp and reactor scores for one reaction."""
+        ttl = get_streaming_setting('LEADERBOARD_TTL', 60 * 60 * 24)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zincrby(self.stamps_key, 1, stamp_id)
+        pipe.zincrby(self.reactors_key, 1, user_id)
+        if username:
+            pipe.hset(self.names_key, user_id, username)
+        for key in (self.stamps_key, self.reactors_key, self.names_key):
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+    def _ranges(self, limit):
+        end = -1 if limit is None else limit - 1
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrevrange(self.stamps_key, 0, end, withscores=True)
+        pipe.zrevrange(self.reactors_key, 0, end, withscores=True)
+        stamps, reactors = pipe.execute()
+        return (
+            [(int(member), int(score)) for member, score in stamps],
+            [(int(member), int(score)) for member, score in reactors],
+        )
+
+    def top(self, limit=None):
+        """Get the current top stamps and reactors."""
+        from apps.chat.services import stamp_cache
+
+        limit = limit or get_streaming_setting('LEADERBOARD_SIZE', 10)
+        stamps, reactors = self._ranges(limit)
+
+        names = []
+        if reactors:
+            names = self.redis.hmget(self.names_key, [user_id for user_id, _ in reactors])
+        stamp_data = stamp_cache.get_stamps(self.schema_name)
+
+        return {
+            'stamps': [
+                {
+                    'stamp_id': stamp_id,
+                    'name': stamp_data.get(stamp_id, {}).get('name'),
+                    'image_url': stamp_data.get(stamp_id, {}).get('image_url'),
+                    'count': count,
+                }
+                for stamp_id, count in stamps
+            ],
+            'reactors': [
+                {
+                    'user_id': user_id,
+                    'username': name.decode() if name else None,
+                    'count': count,
+                }
+                for (user_id, count), name in zip(reactors, names)
+            ],
+        }
+
+    def snapshot(self):
+        """
+        ランキングを StreamReactionRanking に保存して Redis のキーを削除
+        Must be called inside the tenant schema.
+        """
+        from django.contrib.auth import get_user_model
+        from django.db import transaction
+        from apps.chat.models import ChatStamp
+        from .models import StreamReactionRanking
+
+        stamps, reactors = self._ranges(get_streaming_setting('LEADERBOARD_SNAPSHOT_SIZE', 100))
+
+        # 削除済みのスタンプ/ユーザーは除外
+        stamp_ids = set(ChatStamp.objects.filter(
+            id__in=[stamp_id for stamp_id, _ in stamps]
+        ).values_list('id', flat=True))
+        user_ids = set(get_user_model().objects.filter(
+            id__in=[user_id for user_id, _ in reactors]
+        ).values_list('id', flat=True))
+
+        rankings = [
+            StreamReactionRanking(stream_id=self.stream_pk, ranking_type='stamp', rank=rank, stamp_id=stamp_id, count=count)
+            for rank, (stamp_id, count) in enumerate(
+                [entry for entry in stamps if entry[0] in stamp_ids], start=1
+            )
+        ] + [
+            StreamReactionRanking(stream_id=self.stream_pk, ranking_type='user', rank=rank, user_id=user_id, count=count)
+            for rank, (user_id, count) in enumerate(
+                [entry for entry in reactors if entry[0] in user_ids], start=1
+            )
+        ]
+
+        with transaction.atomic():
+            StreamReactionRanking.objects.filter(stream_id=self.stream_pk).delete()
+            StreamReactionRanking.objects.bulk_create(rankings)
+
+        self.clear()
+        return rankings
+
+    def clear(self):
+        """Delete the live leaderboard keys."""
+        self.redis.delete(self.stamps_key, self.reactors_key, self.names_key)
+
+
+def snapshot_reaction_leaderboard(stream_pk):
+    """Snapshot a stream's live leaderboard to the DB (called when the stream ends)."""
+    try:
+        return ReactionLeaderboard(stream_pk).snapshot()
+    except Exception as e:
+        logger.error(f"Failed to snapshot reaction leaderboard for stream {stream_pk}: {e}")
+        return []
@@ -0,0 +1,22 @@
+"""
+Signal handlers for streaming models.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.fragment_cache import invalidate_fragments
+
+from .models import Stream
+
+# Fields that decide whether/how a stream is listed on the home and live pages
+LISTING_FIELDS = {'status', 'privacy', 'title', 'thumbnail_url', 'category'}
+
+
+@receiver(post_save, sender=Stream)
+@receiver(post_delete, sender=Stream)
+def invalidate_stream_fragments(sender, instance, update_fields=None, **kwargs):
+    """Drop cached live stream lists when a stream goes live/ends or its listing changes."""
+    if update_fields and not LISTING_FIELDS & set(update_fields):
+        return  # e.g. viewer counts; refreshed by the short fragment TTL
+    invalidate_fragments('home_live', 'live')
@@ -24,6 +24,7 @@ urlpatterns = [
     # API
     path('api/stream/', views.StreamAPIView.as_view(), name='stream_api'),
     path('api/stream/<str:stream_id>/status/', views.stream_status_api, name='stream_status_api'),
+    path('api/stream/<str:stream_id>/leaderboard/', views.reaction_leaderboard_api, name='reaction_leaderboard_api'),
     path('debug/auth/', views.debug_user_auth, name='debug_auth'),
     
     # OBS Overlay
@@ -9,31 +9,58 @@ from django.core.paginator import Paginator
 from django.db.models import Q
 from django.contrib import messages
 from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
 
 from apps.accounts.permissions import streaming_permission_required
+from apps.core.fragment_cache import fragment, invalidate_fragments
 from .models import Stream, StreamCategory
-from .services import StreamingService, validate_stream_settings
+from .services import (
+    ReactionLeaderboard, StreamingService, resolve_stream_pk,
+    snapshot_reaction_leaderboard, validate_stream_settings,
+)
 from apps.content.models import Video
+from apps.analytics.services import order_by_trending
+from apps.content.recommendations import get_cached_recommendations
 import json
 import uuid
 
 
 def home(request):
     """Homepage with live streams and recent videos."""
+    # Shared sections are rendered from the fragment cache; the querysets below are
+    # lazy and only hit the database when a fragment has to be re-rendered.
+    fragments = {
+        'live': fragment('home_live'),
+        'trending': fragment('home_trending'),
+        'recent': fragment('home_recent'),
+    }
+    
     # Get live streams
-    live_streams = Stream.objects.filter(status='live', privacy='public')[:10]
+    live_streams = SimpleLazyObject(
+        lambda: list(Stream.objects.filter(status='live', privacy='public').select_related('streamer')[:10])
+    )
     
-    # Get trending videos
-    trending_videos = Video.objects.filter(
-        status='ready',
-        privacy__in=['public', 'unlisted']
-    ).order_by('-view_count')[:10]
+    # Polling from the page only needs the live section
+    if request.GET.get('section') == 'live':
+        return render(request, 'partials/live_streams_section.html', {
+            'live_streams': live_streams,
+            'fragments': fragments,
+        })
+    
+    # Get trending videos (precomputed scores, see update_trending)
+    trending_videos = SimpleLazyObject(lambda: list(order_by_trending(
+        Video.objects.filter(
+            status='ready',
+            privacy__in=['public', 'unlisted']
+        ).select_related('uploader'),
+        limit=10
+    )))
     
     # Get recent videos
-    recent_videos = Video.objects.filter(
+    recent_videos = SimpleLazyObject(lambda: list(Video.objects.filter(
         status='ready',
         privacy__in=['public', 'unlisted']
-    ).order_by('-published_at')[:10]
+    ).select_related('uploader').order_by('-published_at')[:10]))
     
     # Get subscription videos for authenticated users
     subscription_videos = []
@@ -51,7 +78,7 @@ def home(request):
         status='ready',
         privacy__in=['public', 'unlisted']
     )
-    recommended_videos = get_recommended_videos(request.user, videos_base)[:10]
+    recommended_videos = get_recommended_videos(request.user, videos_base, limit=10)
     
     context = {
         'live_streams': live_streams,
@@ -59,51 +86,42 @@ def home(request):
         'recent_videos': recent_videos,
         'subscription_videos': subscription_videos,
         'recommended_videos': recommended_videos,
+        'fragments': fragments,
     }
     return render(request, 'streaming/home.html', context)
 
 
-def get_recommended_videos(user, videos_base):
-    """Get recommended videos based on user preferences and viewing history."""
+def get_recommended_videos(user, videos_base, limit=10):
+    """
+    Get recommended videos for the home page.
+    ログインユーザーは Redis にキャッシュされた推薦リスト（build_recommendations）を使い、
+    未作成の場合やゲストはトレンドを返す。
+    """
     if not user.is_authenticated:
-        # For anonymous users, return popular videos from different categories
-        return videos_base.order_by('-view_count', '-like_count')
-    
-    # For authenticated users, use simple recommendation logic
-    recommended = videos_base.exclude(uploader=user)
-    
-    # Get user's liked video categories
-    from apps.content.models import VideoLike
-    liked_categories = VideoLike.objects.filter(
-        user=user, 
-        is_like=True
-    ).values_list('video__category', flat=True).distinct()
-    
-    if liked_categories:
-        # Prioritize videos from liked categories
-        category_videos = recommended.filter(category__in=liked_categories)
-        other_videos = recommended.exclude(category__in=liked_categories)
-        
-        # Mix category-based and popular videos
-        recommended_list = list(category_videos.order_by('-view_count')[:6])
-        recommended_list.extend(list(other_videos.order_by('-view_count')[:4]))
-        
-        return recommended_list
-    else:
-        # Fallback to popular videos
-        return recommended.order_by('-view_count', '-like_count')
+        return order_by_trending(videos_base, limit=limit)
+    
+    videos_base = videos_base.exclude(uploader=user)
+    video_ids = get_cached_recommendations(user.id)
+    if video_ids:
+        video_ids = video_ids[:limit]
+        position = {video_id: index for index, video_id in enumerate(video_ids)}
+        recommended = sorted(videos_base.filter(id__in=video_ids), key=lambda video: position[video.id])
+        if recommended:
+            return recommended
+    
+    return order_by_trending(videos_base, limit=limit)
 
 
 def live_streams(request):
     """Live streams page."""
-    streams = Stream.objects.filter(status='live', privacy='public').order_by('-started_at')
-    
+    streams = Stream.objects.filter(status='live', privacy='public').select_related('streamer').order_by('-started_at')
     paginator = Paginator(streams, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # ページ番号の確定は COUNT のみ。一覧はキャッシュされた断片がない場合にだけ読み込まれる
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
         'streams': page_obj,
+        'fragments': {'live': fragment('live')},
     }
     return render(request, 'streaming/live.html', context)
 
@@ -279,6 +297,8 @@ class StreamAPIView(View):
                     status='live',
                     viewer_count=result.get('viewer_count', 0)
                 )
+                # update() は post_save を送らないため、一覧の断片キャッシュはここで破棄する
+                invalidate_fragments('home_live', 'live')
             return JsonResponse(result)
         
         elif action == 'stop':
@@ -291,6 +311,10 @@ class StreamAPIView(View):
                     status='ended',
                     ended_at=timezone.now()
                 )
+                invalidate_fragments('home_live', 'live')
+                stream_pk = resolve_stream_pk(stream_id)
+                if stream_pk:
+                    snapshot_reaction_leaderboard(stream_pk)
             return JsonResponse(result)
         
         return JsonResponse({'error': 'Invalid action'}, status=400)
@@ -438,6 +462,35 @@ def update_stream_settings(request, stream_id):
     return redirect('streaming:stream_dashboard', stream_id=stream_id)
 
 
+@streaming_permission_required
+@require_http_methods(["GET"])
+def reaction_leaderboard_api(request, stream_id):
+    """API endpoint for the reaction leaderboard (live from Redis, snapshot after the stream ends)."""
+    stream = get_object_or_404(Stream, stream_id=stream_id, streamer=request.user)
+    
+    if stream.status != 'ended':
+        return JsonResponse({'stream_id': stream.stream_id, 'live': True, **ReactionLeaderboard(stream.pk).top()})
+    
+    stamps = []
+    reactors = []
+    for ranking in stream.reaction_rankings.select_related('stamp', 'user'):
+        if ranking.ranking_type == 'stamp' and ranking.stamp:
+            stamps.append({
+                'stamp_id': ranking.stamp_id,
+                'name': ranking.stamp.name,
+                'image_url': ranking.stamp.image.url if ranking.stamp.image else None,
+                'count': ranking.count,
+            })
+        elif ranking.ranking_type == 'user' and ranking.user:
+            reactors.append({
+                'user_id': ranking.user_id,
+                'username': ranking.user.username,
+                'count': ranking.count,
+            })
+    
+    return JsonResponse({'stream_id': stream.stream_id, 'live': False, 'stamps': stamps, 'reactors': reactors})
+
+
 @require_http_methods(["GET"])
 def stream_status_api(request, stream_id):
     """API endpoint to get stream status."""
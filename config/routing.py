@@ -5,6 +5,7 @@ WebSocket routing for video streaming platform.
 from django.urls import path
 from apps.chat import consumers
 from apps.streaming import consumers as streaming_consumers
+from apps.content import consumers as content_consumers
 import traceback
 
 print("🔧 ROUTING: Loading WebSocket consumers...")
@@ -15,6 +16,8 @@ try:
     chat_consumer = consumers.ChatConsumer.as_asgi()
     viewer_consumer = consumers.ViewerCountConsumer.as_asgi()
     reaction_consumer = streaming_consumers.StreamReactionConsumer.as_asgi()
+    leaderboard_consumer = streaming_consumers.ReactionLeaderboardConsumer.as_asgi()
+    processing_consumer = content_consumers.VideoProcessingConsumer.as_asgi()
 
     print("🔧 ROUTING: All consumers loaded successfully")
     print(f"🔧 ROUTING: TestConsumer: {test_consumer}")
@@ -22,6 +25,8 @@ try:
     print(f"🔧 ROUTING: ChatConsumer: {chat_consumer}")
     print(f"🔧 ROUTING: ViewerCountConsumer: {viewer_consumer}")
     print(f"🔧 ROUTING: StreamReactionConsumer: {reaction_consumer}")
+    print(f"🔧 ROUTING: ReactionLeaderboardConsumer: {leaderboard_consumer}")
+    print(f"🔧 ROUTING: VideoProcessingConsumer: {processing_consumer}")
 
 except Exception as e:
     print(f"🔧 ROUTING: ERROR loading consumers: {e}")
@@ -33,6 +38,8 @@ websocket_urlpatterns = [
     path('ws/chat/<str:room_name>/', chat_consumer),
     path('ws/viewers/<str:stream_id>/', viewer_consumer),
     path('ws/reactions/<str:stream_id>/', reaction_consumer),
+    path('ws/leaderboard/<str:stream_id>/', leaderboard_consumer),
+    path('ws/videos/processing/', processing_consumer),
 ]
 
 print("🔧 ROUTING: WebSocket URL patterns created")
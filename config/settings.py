@@ -4,7 +4,7 @@ Django settings for video streaming platform.
 
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -14,6 +14,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-_olkq7riw=0zamdv(hgrvsoyfij@vgke90++#qnv!^mrjgb9ki')
 DEBUG = config('DEBUG', default=True, cast=bool)
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0']
+# Reverse proxies whose X-Forwarded-For header is trusted (IP addresses or CIDR ranges, comma-separated)
+TRUSTED_PROXIES = config('TRUSTED_PROXIES', default='', cast=Csv())
 
 # Tenant configuration
 SHARED_APPS = [
@@ -26,6 +28,7 @@ SHARED_APPS = [
     'django.contrib.admin',
     'django.contrib.staticfiles',
     'django.contrib.humanize',
+    'django.contrib.postgres',
     'rest_framework',
     'channels',
     'corsheaders',
@@ -130,6 +133,15 @@ CACHES = {
     }
 }
 
+# Rendered template fragments (seconds), see apps.core.fragment_cache
+FRAGMENT_CACHE_TIMEOUTS = {
+    'home_live': 15,
+    'home_trending': 60,
+    'home_recent': 60,
+    'trending': 60,
+    'live': 15,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -212,9 +224,81 @@ LOGGING = {
 # Video streaming settings
 VIDEO_SETTINGS = {
     'MOCK_MODE': True,
-    'SUPPORTED_FORMATS': ['mp4', 'webm', 'ogg'],
+    'SUPPORTED_FORMATS': ['mp4', 'webm', 'ogg', 'mov', 'mkv'],
     'MAX_FILE_SIZE': 500 * 1024 * 1024,  # 500MB
-    'THUMBNAIL_SIZE': (320, 240),
+    'UPLOAD_CHUNK_SIZE': 8 * 1024 * 1024,  # max bytes per PATCH of the resumable upload API
+    'UPLOAD_EXPIRY_HOURS': 24,  # unfinished uploads idle this long are removed
+    'PROCESSING_WORKERS': 2,  # processes in the process_videos worker pool
+    'MEDIA_MAX_AGE': 60 * 60,  # seconds browsers may reuse a video file (revalidated by ETag)
+    'MEDIA_ACCEL_REDIRECT': None,  # e.g. '/protected-media/' (nginx internal location aliased to MEDIA_ROOT)
+    'HLS_SEGMENT_SECONDS': 6,
+    'HLS_LADDER': [  # renditions taller than the source are skipped; bitrates in kbps
+        {'name': '1080p', 'height': 1080, 'video_bitrate': 5000, 'audio_bitrate': 192},
+        {'name': '720p', 'height': 720, 'video_bitrate': 2800, 'audio_bitrate': 128},
+        {'name': '480p', 'height': 480, 'video_bitrate': 1400, 'audio_bitrate': 128},
+        {'name': '360p', 'height': 360, 'video_bitrate': 800, 'audio_bitrate': 96},
+    ],
+    'HLS_MANIFEST_CACHE_TIMEOUT': 60 * 60,  # seconds (keyed by the index file, so repackaging refreshes it)
+    'THUMBNAIL_SIZE': (1280, 720),  # frame grabbed by the processing worker (derivatives: THUMBNAIL_SETTINGS)
+    'VIEW_DEDUP_WINDOW': 30 * 60,  # seconds before the same viewer is counted again
+    'WATCH_PROGRESS_INTERVAL': 15,  # seconds between player progress beacons
+    'WATCH_COMPLETE_RATIO': 0.9,  # watched ratio treated as completed
+    'WATCH_PROGRESS_BATCH_SIZE': 500,
+    'HISTORY_PAGE_SIZE': 24,
+    'AUTOCOMPLETE_LIMIT': 5,  # suggestions per group
+    'AUTOCOMPLETE_CACHE_TIMEOUT': 60,  # seconds, per prefix
+    'FACET_CACHE_TIMEOUT': 300,  # seconds (also dropped when counts change)
+    'RELATED_VIDEOS_COUNT': 10,  # neighbours stored per video
+    'RELATED_COVIEW_WEIGHT': 1.0,
+    'RELATED_TAG_WEIGHT': 0.5,
+    'RELATED_CATEGORY_WEIGHT': 0.2,
+    'RECOMMENDATION_COUNT': 30,  # video ids cached per user
+    'RECOMMENDATION_TTL': 6 * 60 * 60,  # seconds
+    'PLAYLIST_RANK_GAP': 1024,  # spacing between sparse playlist ranks
+    'PLAYLIST_PREVIEW_COUNT': 4,  # thumbnails per playlist card
+    'VIEWER_STATE_TTL': 60,  # seconds, per user and video (dropped on follow/like/favorite)
+}
+
+# Thumbnail derivatives (apps.core.thumbnails)
+THUMBNAIL_SETTINGS = {
+    'SIZES': {  # preset: (width, height), cropped to fill
+        'card': (320, 180),
+        'watch': (1280, 720),
+        'avatar_sm': (64, 64),
+        'avatar': (128, 128),
+        'avatar_lg': (256, 256),
+    },
+    'QUALITY': 80,
+    'CACHE_DIR': 'thumbs',  # under MEDIA_ROOT, named by content hash
+    'WORKERS': 2,  # generation processes per server process
+}
+
+# Analytics settings
+ANALYTICS_SETTINGS = {
+    'TRENDING_HALF_LIFE_HOURS': 24,  # score of an event halves every N hours
+    'TRENDING_LIKE_WEIGHT': 5.0,  # one like counts as N views
+    'TRENDING_COMMENT_WEIGHT': 3.0,  # one comment counts as N views
+    'TRENDING_SIZE': 500,  # videos kept in PopularContent
+}
+
+# Live streaming settings
+STREAMING_SETTINGS = {
+    'LEADERBOARD_SIZE': 10,  # entries pushed to the dashboard
+    'LEADERBOARD_SNAPSHOT_SIZE': 100,  # entries saved when a stream ends
+    'LEADERBOARD_PUSH_INTERVAL': 2,  # seconds
+    'LEADERBOARD_TTL': 60 * 60 * 24,  # seconds
+}
+
+# Chat settings
+CHAT_SETTINGS = {
+    'STAMP_CACHE_TTL': 60,  # seconds
+    'STAMP_CATALOG_CACHE_TIMEOUT': 86400,  # seconds (rebuilt on ChatStamp change)
+    'STAMP_CATALOG_MAX_AGE': 300,  # browser Cache-Control max-age
+    'STAMP_SPRITE_AUTO_BUILD': True,  # rebuild sprite sheet on the first catalog read after a ChatStamp change
+    'STAMP_SPRITE_CELL_SIZE': 64,  # px
+    'STAMP_SPRITE_COLUMNS': 8,
+    'REACTION_PERSIST_MODE': 'immediate',  # 'immediate' or 'buffered'
+    'REACTION_BATCH_SIZE': 50,
 }
 
 # X-Frame-Options for iframe embedding
@@ -6,6 +6,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import render
+from apps.core import views as core_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -26,6 +27,9 @@ urlpatterns = [
     path('accounts/', include('apps.accounts.urls')),
     path('notifications/', include('apps.notifications.urls')),
     path('legal/', include('apps.legal.urls')),
+    
+    # Resized thumbnails / avatars (content-hashed, cached forever by browsers)
+    path('thumbs/<str:name>', core_views.serve_thumbnail, name='thumbnail'),
 ]
 
 # Serve media files in development